@@ -1,13 +1,19 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import requests
+import plotly.io as pio
 from datetime import datetime, timedelta
-import numpy as np
-import io
-import zipfile
+import os
+
+from commodity_charter import metrics, prices, signals
+from commodity_charter.analysis import merchant_hit_rate
+from commodity_charter.dataservice import default_data_service
+from commodity_charter.derived import DerivedStore
+from commodity_charter.ingest import ingest_cot_history
+from commodity_charter.markets import MERCHANT_COLUMNS, TRADER_CATEGORIES, MarketIndex, commodity_symbols
+from commodity_charter.screener import commodity_closes, screen_markets
+from commodity_charter.signals import ThresholdTable, category_statistics, get_position_signal
+from commodity_charter.store import COTStore
+from commodity_charter.views import chart_figure_json, chart_view, signals_version, view_key
 
 # Set page config
 st.set_page_config(layout="wide", page_title="Commodity Charter Pro")
@@ -133,202 +139,53 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# Cached loaders count hits and misses and time their misses (see the Debug metrics panel).
+# Large frames go through the process-wide data service: one load serves every
+# session waiting for it, and all sessions share the same read-only frames
+data_service = default_data_service()
+
 # Load COT signal configurations
-@st.cache_data
+@metrics.instrument_cache('load_cot_signals', st.cache_data)
 def load_cot_signals():
-    signals_df = pd.read_csv('cot_signals.csv')
-    # Process ranges into min-max values
-    signals_df[['Bearish_Min', 'Bearish_Max']] = signals_df['Bearish_Range'].str.split('-', expand=True).astype(float)
-    signals_df[['Bullish_Min', 'Bullish_Max']] = signals_df['Bullish_Range'].str.split('-', expand=True).astype(float)
-    return signals_df
+    return signals.load_cot_signals()
 
 # Function to get CFTC data
-@st.cache_data
+@data_service.cached('get_cftc_data', ttl=3600)
 def get_cftc_data():
-    # URL for the CFTC Commitments of Traders data
-    url = "https://www.cftc.gov/files/dea/history/fut_disagg_txt_2024.zip"
-    
+    # Reports are served from the local Parquet store; missing years are
+    # backfilled and new weeks appended once CFTC publishes a newer report.
+    # A refresh error is returned with the data so every session shows it
+    store = COTStore()
+    error = None
+
     try:
-        response = requests.get(url)
-        z = zipfile.ZipFile(io.BytesIO(response.content))
-        
-        # Read all files in the zip and concatenate
-        dfs = []
-        for filename in z.namelist():
-            if filename.endswith('.txt'):
-                df = pd.read_csv(z.open(filename), on_bad_lines='skip')
-                dfs.append(df)
-        
-        if dfs:
-            cot_df = pd.concat(dfs, ignore_index=True)
-            # Process the data
-            cot_df['Date'] = pd.to_datetime(cot_df['Report_Date_as_YYYY-MM-DD'])
-            return cot_df
-        return pd.DataFrame()
+        # With the refresh worker running (REFRESH_IN_APP=0) pages only read
+        if os.environ.get('REFRESH_IN_APP', '1') == '1' and store.needs_refresh():
+            ingest_cot_history(store)
     except Exception as e:
-        st.error(f"Error fetching CFTC data: {str(e)}")
-        return pd.DataFrame()
+        error = str(e)
 
-def get_merchant_positions(cot_data, commodity):
-    # Filter for the specific commodity
-    commodity_data = cot_data[cot_data['Market_and_Exchange_Names'].str.contains(commodity, case=False, na=False)]
-    
-    if not commodity_data.empty:
-        # Get merchant positions as percentages directly from CFTC data
-        merchant_long_pct = commodity_data['Pct_of_OI_Prod_Merc_Long_All']
-        merchant_short_pct = commodity_data['Pct_of_OI_Prod_Merc_Short_All']
-        
-        # Get absolute positions and Open Interest
-        merchant_long = commodity_data['Prod_Merc_Positions_Long_All']
-        merchant_short = commodity_data['Prod_Merc_Positions_Short_All']
-        open_interest = commodity_data['Open_Interest_All']
-        
-        result_df = pd.DataFrame({
-            'Date': commodity_data['Date'],
-            'Merchant_Long': merchant_long,
-            'Merchant_Short': merchant_short,
-            'Merchant_Long_Pct': merchant_long_pct,
-            'Merchant_Short_Pct': merchant_short_pct,
-            'Open_Interest': open_interest
-        })
-        return result_df.sort_values('Date')
-    return pd.DataFrame()
+    return store.read(), error
 
-def get_position_signal(short_pct, long_pct, signals_df, commodity):
-    commodity_signals = signals_df[signals_df['Commodity'] == commodity]
-    if commodity_signals.empty:
-        return 'NEUTRAL', []
-    
-    signal = 'NEUTRAL'
-    reasons = []
-    
-    # Check for bullish signal (based on short percentage)
-    if (short_pct >= commodity_signals['Bullish_Min'].iloc[0] and 
-        short_pct <= commodity_signals['Bullish_Max'].iloc[0]):
-        signal = 'BULLISH'
-        reasons.append(f'Short {short_pct:.1f}% in bullish range')
-    
-    # Check for bearish signal (based on long percentage)
-    if (long_pct >= commodity_signals['Bearish_Min'].iloc[0] and 
-        long_pct <= commodity_signals['Bearish_Max'].iloc[0]):
-        signal = 'BEARISH'
-        reasons.append(f'Long {long_pct:.1f}% in bearish range')
-    
-    return signal, reasons
-
-def analyze_trend_changes(price_data, open_interest_data, dates, window=50):
-    """Analyze trend changes near Open Interest peaks with 50-day window"""
-    # Create DataFrame with dates as index
-    oi_df = pd.DataFrame({
-        'Open_Interest': open_interest_data,
-        'Date': pd.to_datetime(dates)
-    }).set_index('Date')
-    
-    # Resample both datasets to daily frequency and align them
-    price_daily = price_data.resample('D').last()
-    oi_daily = oi_df.resample('D').last()
-    
-    # Forward fill missing values
-    price_daily = price_daily.fillna(method='ffill')
-    oi_daily = oi_daily.fillna(method='ffill')
-    
-    # Calculate price moving average for trend determination
-    price_daily['MA'] = price_daily['Close'].rolling(window=window).mean()
-    price_daily['Trend'] = np.where(price_daily['Close'] > price_daily['MA'], 'Up', 'Down')
-    
-    return price_daily, oi_daily
-
-def analyze_merchant_behavior(price_data, merchant_positions, lookback_days=365):
-    """Analyze merchant positioning relative to price trends"""
-    # Ensure we're only looking at the specified lookback period
-    cutoff_date = pd.Timestamp.now(tz='America/New_York') - pd.Timedelta(days=lookback_days)
-    
-    # Convert price data index to same timezone
-    price_data = price_data.copy()
-    price_data.index = price_data.index.tz_convert('America/New_York')
-    
-    # Filter data
-    price_data = price_data[price_data.index >= cutoff_date]
-    merchant_positions = merchant_positions[
-        pd.to_datetime(merchant_positions['Date']).dt.tz_localize('America/New_York') >= cutoff_date
-    ]
-    
-    if price_data.empty or merchant_positions.empty:
-        return pd.DataFrame()
-    
-    # Calculate weekly price changes
-    price_weekly = price_data['Close'].resample('W').last()
-    price_weekly_pct = price_weekly.pct_change()
-    
-    # Align merchant positions with price changes
-    merchant_positions['Date'] = pd.to_datetime(merchant_positions['Date']).dt.tz_localize('America/New_York')
-    merchant_weekly = merchant_positions.set_index('Date').resample('W').last()
-    
-    # Analyze correlation between price changes and merchant positioning
-    correct_positions = []
-    for date in merchant_weekly.index:
-        if date in price_weekly_pct.index:
-            price_change = price_weekly_pct[date]
-            merchant_short_pct = merchant_weekly.loc[date, 'Merchant_Short_Pct']
-            merchant_long_pct = merchant_weekly.loc[date, 'Merchant_Long_Pct']
-            
-            # Check if merchants were correctly positioned
-            if price_change < 0 and merchant_short_pct > merchant_long_pct:
-                correct_positions.append({
-                    'Date': date,
-                    'Price_Change': price_change * 100,
-                    'Position': 'Short',
-                    'Short_Pct': merchant_short_pct,
-                    'Long_Pct': merchant_long_pct
-                })
-            elif price_change > 0 and merchant_long_pct > merchant_short_pct:
-                correct_positions.append({
-                    'Date': date,
-                    'Price_Change': price_change * 100,
-                    'Position': 'Long',
-                    'Short_Pct': merchant_short_pct,
-                    'Long_Pct': merchant_long_pct
-                })
-    
-    return pd.DataFrame(correct_positions)
-
-def maintain_signal_history(merchant_positions, signals_df, selected_commodity):
-    """Maintain a history of weekly signals"""
-    weekly_positions = merchant_positions.set_index('Date').resample('W').last()
-    signal_history = []
-    
-    for date, row in weekly_positions.iterrows():
-        signal, reasons = get_position_signal(
-            row['Merchant_Short_Pct'],
-            row['Merchant_Long_Pct'],
-            signals_df,
-            selected_commodity
-        )
-        signal_history.append({
-            'Date': date,
-            'Signal': signal,
-            'Short_Pct': row['Merchant_Short_Pct'],
-            'Long_Pct': row['Merchant_Long_Pct'],
-            'Reasons': ', '.join(reasons) if reasons else 'No specific trigger'
-        })
-    
-    return pd.DataFrame(signal_history)
+@data_service.cached('get_market_index', ttl=3600)
+def get_market_index(data_version):
+    # Built once per COT load and shared by every rerun/session; data_version
+    # (the latest report date) stands in for hashing the whole frame, and
+    # superseded versions age out of the data service budget. The trader
+    # category table is cached with the COT store across processes
+    cot_data, _ = get_cftc_data()
+    return MarketIndex(cot_data, positions=COTStore().category_positions())
 
 # Sidebar for controls
 st.sidebar.header("Controls")
 
-# Commodity selection
-commodity_symbols = {
-    "Crude Oil": "CL=F",
-    "Natural Gas": "NG=F",
-    "Gold": "GC=F",
-    "Silver": "SI=F",
-    "Copper": "HG=F",
-    "Corn": "ZC=F",
-    "Soybeans": "ZS=F",
-    "Wheat": "ZW=F"
-}
+# Single-commodity chart or all-market screener
+view = st.sidebar.radio(
+    "View",
+    ["Chart", "Screener"]
+)
 
+# Commodity selection
 selected_commodity = st.sidebar.selectbox(
     "Select Commodity",
     list(commodity_symbols.keys())
@@ -350,121 +207,119 @@ chart_type = st.sidebar.radio(
     ["Candlestick", "Line"]
 )
 
-# Fetch price data
-@st.cache_data
+# WebGL mode downsamples long ranges; narrow the date range for full detail
+render_mode = st.sidebar.radio(
+    "Rendering",
+    ["webgl", "full"],
+    format_func=lambda mode: "Fast (WebGL, downsampled)" if mode == "webgl" else "Full resolution"
+)
+
+# Fetch price data through the process-wide on-disk OHLCV cache
+@data_service.cached('get_price_data', ttl=900)
 def get_price_data(symbol, start_date, end_date):
-    ticker = yf.Ticker(symbol)
-    df = ticker.history(start=start_date, end=end_date)
-    return df
+    return prices.get_price_data(symbol, start_date, end_date)
+
+# Fetch prices for many symbols in one batched request
+@data_service.cached('get_price_data_batch', ttl=900)
+def get_price_data_batch(symbols, start_date, end_date):
+    return prices.get_price_data_batch(symbols, start_date, end_date)
+
+@data_service.cached('get_screener_table', ttl=900)
+def get_screener_table(data_version, signals_key):
+    # Prefer the table precomputed by the refresh worker for this COT version;
+    # data_version (the latest report date) and signals_key (a hash of the
+    # signal ranges) stand in for hashing the frames themselves
+    screener = DerivedStore().read('screener', data_version)
+    if screener is not None:
+        return screener
+
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=365)
+    symbol_prices = get_price_data_batch(tuple(commodity_symbols.values()), start_date, end_date)
+    cot_data, _ = get_cftc_data()
+    return screen_markets(cot_data, ThresholdTable(load_cot_signals()), commodity_closes(symbol_prices))
+
+def render_debug_panel():
+    # Process-wide stage timings, cache counters and payload sizes since the server started
+    with st.sidebar.expander("Debug metrics"):
+        stats = metrics.snapshot()
+        st.caption("Stage timings")
+        st.dataframe(pd.DataFrame(stats['spans']).round(2), hide_index=True)
+        st.caption("Caches")
+        st.dataframe(pd.DataFrame(stats['caches']).round(1), hide_index=True)
+        st.caption("Payload sizes (bytes)")
+        st.dataframe(pd.DataFrame(stats['payloads']), hide_index=True)
+        st.download_button("Export (Prometheus)", metrics.prometheus_text(),
+                           file_name="commodity_charter_metrics.prom", mime="text/plain")
 
 # Load data
-price_data = get_price_data(commodity_symbols[selected_commodity], date_range[0], date_range[1])
-cot_data = get_cftc_data()
+cot_data, cftc_error = get_cftc_data()
+if cftc_error:
+    # Fall back to the last stored snapshot when the download fails
+    if not cot_data.empty:
+        st.warning(f"Could not refresh CFTC data, showing the last stored reports: {cftc_error}")
+    else:
+        st.error(f"Error fetching CFTC data: {cftc_error}")
 signals_df = load_cot_signals()
-merchant_positions = get_merchant_positions(cot_data, selected_commodity)
+data_version = cot_data['Date'].max().strftime('%Y-%m-%d') if not cot_data.empty else None
+
+if view == "Screener":
+    st.subheader("Commodity Screener")
+    screener = get_screener_table(data_version, signals_version(signals_df))
+    st.dataframe(screener.style.format({
+        'Date': lambda x: x.strftime('%Y-%m-%d'),
+        'Merchant_Long_Pct': '{:.2f}%',
+        'Merchant_Short_Pct': '{:.2f}%',
+        'Open_Interest': '{:,.0f}',
+        'OI_Change': '{:+,.0f}',
+        'OI_Change_Pct': '{:+.2f}%',
+        'Hit_Rate': '{:.1f}%'
+    }, na_rep='-'), use_container_width=True)
+    render_debug_panel()
+    st.stop()
+
+price_data = get_price_data(commodity_symbols[selected_commodity], date_range[0], date_range[1])
+market_index = get_market_index(data_version)
+merchant_positions = market_index.positions(selected_commodity)
 
 if not merchant_positions.empty:
-    # Current signal
-    latest_short_pct = merchant_positions['Merchant_Short_Pct'].iloc[-1]
-    latest_long_pct = merchant_positions['Merchant_Long_Pct'].iloc[-1]
+    # Current signal, read from the trader category its ranges are configured for
+    thresholds = ThresholdTable(signals_df)
+    signal_category = thresholds.category(selected_commodity)
+    category_label = TRADER_CATEGORIES[signal_category]['label']
+    latest_short_pct = merchant_positions[f'{signal_category}_Short_Pct'].iloc[-1]
+    latest_long_pct = merchant_positions[f'{signal_category}_Long_Pct'].iloc[-1]
+    latest_cot_index, latest_z_score = category_statistics(merchant_positions.iloc[-1:], thresholds, selected_commodity)
     latest_signal, signal_reasons = get_position_signal(
-        latest_short_pct, latest_long_pct, signals_df, selected_commodity
+        latest_short_pct, latest_long_pct, signals_df, selected_commodity, latest_cot_index[0], latest_z_score[0]
     )
     
+    # Derived frames are memoized per commodity, date range, signal ranges and
+    # data version, so reruns triggered by other widgets reuse them
+    key = view_key(selected_commodity, date_range, data_version, price_data, signals_df)
+    chart_data = chart_view(key, price_data, merchant_positions, signals_df)
+
     # Signal history
-    signal_history = maintain_signal_history(merchant_positions, signals_df, selected_commodity)
-    
+    signal_history = chart_data['signal_history']
+
     # Merchant behavior analysis
-    merchant_analysis = analyze_merchant_behavior(price_data, merchant_positions)
+    merchant_alignment = chart_data['merchant_alignment']
+    merchant_analysis = chart_data['merchant_analysis']
     
     # Display metrics in Bloomberg style
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Merchant Short %", f"{latest_short_pct:.2f}%")
+        st.metric(f"{category_label} Short %", f"{latest_short_pct:.2f}%")
     with col2:
-        st.metric("Merchant Long %", f"{latest_long_pct:.2f}%")
+        st.metric(f"{category_label} Long %", f"{latest_long_pct:.2f}%")
     with col3:
         st.metric("Current Signal", latest_signal,
                  delta=", ".join(signal_reasons) if signal_reasons else None)
     with col4:
         st.metric("Open Interest", f"{merchant_positions['Open_Interest'].iloc[-1]:,.0f}")
 
-    # Create main chart
-    price_daily, oi_daily = analyze_trend_changes(
-        price_data, 
-        merchant_positions['Open_Interest'],
-        merchant_positions['Date']
-    )
-    
-    fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
-                        vertical_spacing=0.05,
-                        row_heights=[0.7, 0.3])
-
-    # Add price chart with Bloomberg-style colors
-    if chart_type == "Candlestick":
-        fig.add_trace(
-            go.Candlestick(
-                x=price_data.index,
-                open=price_data['Open'],
-                high=price_data['High'],
-                low=price_data['Low'],
-                close=price_data['Close'],
-                name="Price",
-                increasing_line_color='#00B8E6',
-                decreasing_line_color='#FF3366'
-            ),
-            row=1, col=1
-        )
-    else:
-        fig.add_trace(
-            go.Scatter(
-                x=price_data.index,
-                y=price_data['Close'],
-                name="Price",
-                line=dict(color='#00B8E6')
-            ),
-            row=1, col=1
-        )
-
-    # Add 50-day moving average
-    fig.add_trace(
-        go.Scatter(
-            x=price_daily.index,
-            y=price_daily['MA'],
-            name="50-day MA",
-            line=dict(color='#FFB000', dash='dash')
-        ),
-        row=1, col=1
-    )
-
-    # Add Open Interest
-    fig.add_trace(
-        go.Scatter(
-            x=oi_daily.index,
-            y=oi_daily['Open_Interest'],
-            name="Open Interest",
-            line=dict(color='#00FF00')
-        ),
-        row=2, col=1
-    )
-
-    # Update layout with Bloomberg-style colors
-    fig.update_layout(
-        template="plotly_dark",
-        paper_bgcolor='#001133',
-        plot_bgcolor='#001133',
-        title=dict(
-            text=f"{selected_commodity} Analysis",
-            font=dict(color='#FFFFFF')
-        ),
-        xaxis_title="Date",
-        yaxis_title="Price",
-        yaxis2_title="Open Interest",
-        height=800,
-        showlegend=True,
-        xaxis_rangeslider_visible=False,
-        font=dict(color='#FFFFFF')
-    )
+    # Create main chart; the figure is cached per chart type and rendering mode
+    fig = pio.from_json(chart_figure_json(key, chart_data, price_data, chart_type, render_mode))
 
     # Display the chart
     st.plotly_chart(fig, use_container_width=True)
@@ -475,8 +330,10 @@ if not merchant_positions.empty:
         signal_history.sort_values('Date', ascending=False).style.format({
             'Date': lambda x: x.strftime('%Y-%m-%d'),
             'Short_Pct': '{:.2f}%',
-            'Long_Pct': '{:.2f}%'
-        })
+            'Long_Pct': '{:.2f}%',
+            'COT_Index': '{:.0f}',
+            'Z_Score': '{:+.2f}'
+        }, na_rep='-')
     )
 
     # Display merchant behavior analysis
@@ -491,8 +348,8 @@ if not merchant_positions.empty:
             })
         )
         
-        # Calculate success rate
-        success_rate = len(merchant_analysis) / len(merchant_positions) * 100
+        # Calculate success rate over the weeks that could be scored
+        success_rate = merchant_hit_rate(merchant_alignment) * 100
         st.info(f"Merchants correctly positioned {success_rate:.1f}% of the time in the last year")
     else:
         st.info("No clear positioning patterns found in the last year")
@@ -518,7 +375,7 @@ if not merchant_positions.empty:
     with col1:
         st.subheader("Merchant Positions")
         if not merchant_positions.empty:
-            st.dataframe(merchant_positions.style.format({
+            st.dataframe(merchant_positions[MERCHANT_COLUMNS].style.format({
                 'Merchant_Long_Pct': '{:.2f}%',
                 'Merchant_Short_Pct': '{:.2f}%',
                 'Merchant_Long': '{:,.0f}',
@@ -530,7 +387,28 @@ if not merchant_positions.empty:
         if not signals_df[signals_df['Commodity'] == selected_commodity].empty:
             signal_info = signals_df[signals_df['Commodity'] == selected_commodity].iloc[0]
             st.info(f"""
-            Signal Ranges for {selected_commodity}:
+            Signal Ranges for {selected_commodity} ({category_label} positions):
             - Bullish when Short % is between {signal_info['Bullish_Min']}% and {signal_info['Bullish_Max']}%
             - Bearish when Long % is between {signal_info['Bearish_Min']}% and {signal_info['Bearish_Max']}%
             """)
+
+    # Latest report across every trader category
+    st.subheader("Trader Categories (Latest Report)")
+    latest_report = merchant_positions.iloc[-1]
+    categories = pd.DataFrame([{
+        'Category': info['label'],
+        'Long_Pct': latest_report[f'{category}_Long_Pct'],
+        'Short_Pct': latest_report[f'{category}_Short_Pct'],
+        'Net': latest_report[f'{category}_Net'],
+        'Net_Change': latest_report[f'{category}_Net_Change'],
+        'COT_Index': latest_report[f'{category}_COT_Index'],
+    } for category, info in TRADER_CATEGORIES.items()])
+    st.dataframe(categories.style.format({
+        'Long_Pct': '{:.2f}%',
+        'Short_Pct': '{:.2f}%',
+        'Net': '{:+,.0f}',
+        'Net_Change': '{:+,.0f}',
+        'COT_Index': '{:.0f}'
+    }, na_rep='-'), hide_index=True)
+
+render_debug_panel()
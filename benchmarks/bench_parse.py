@@ -0,0 +1,155 @@
+"""Benchmark parsing a CFTC-sized yearly archive: legacy read vs typed loader.
+
+Generates a synthetic disaggregated report with the real file's width
+(~190 columns) and parses it with the original untyped ``pd.read_csv`` call
+and with the schema-driven loader on both engines. Each variant runs in a
+fresh process so the reported peak RSS is not polluted by the others.
+
+    python benchmarks/bench_parse.py --rows 20000
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import traceback
+import zipfile
+from queue import Empty
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.cftc import COT_SCHEMA, parse_cot_archive  # noqa: E402
+
+TOTAL_COLUMNS = 190
+
+
+def make_archive(rows, markets=300, seed=0):
+    """Zip a synthetic report with the schema columns plus unused filler columns"""
+    rng = np.random.RandomState(seed)
+    codes = [f'{i:06d}' for i in rng.choice(999999, markets, replace=False)]
+    market_ids = np.arange(rows) % markets
+    dates = pd.Timestamp('2024-01-02') + pd.to_timedelta((np.arange(rows) // markets) % 52 * 7, unit='D')
+    open_interest = rng.randint(1000, 2000000, rows)
+
+    columns = {
+        'Market_and_Exchange_Names': [f'MARKET {code} - SOME EXCHANGE' for code in np.array(codes)[market_ids]],
+        'As_of_Date_In_Form_YYMMDD': dates.strftime('%y%m%d'),
+        'Report_Date_as_YYYY-MM-DD': dates.strftime('%Y-%m-%d'),
+        'CFTC_Contract_Market_Code': np.array(codes)[market_ids],
+        'Open_Interest_All': open_interest,
+    }
+    # Every other schema column: trader category positions and percentages of open interest
+    for column, dtype in COT_SCHEMA.items():
+        if column in columns:
+            continue
+        if dtype == 'float32':
+            columns[column] = rng.uniform(0, 60, rows).round(1)
+        else:
+            columns[column] = (open_interest * rng.uniform(0, 0.6, rows)).astype(int)
+    for i in range(TOTAL_COLUMNS - len(columns)):
+        if i % 3 == 0:
+            columns[f'Pct_of_OI_Filler_{i}'] = rng.uniform(0, 100, rows).round(1)
+        else:
+            columns[f'Positions_Filler_{i}'] = rng.randint(0, 500000, rows)
+
+    buffer = io.StringIO()
+    pd.DataFrame(columns).to_csv(buffer, index=False)
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('f_year.txt', buffer.getvalue())
+    return out.getvalue()
+
+
+def parse_legacy(content):
+    # The original get_cftc_data() parse: every column, inferred dtypes
+    z = zipfile.ZipFile(io.BytesIO(content))
+    dfs = [pd.read_csv(z.open(name), on_bad_lines='skip') for name in z.namelist() if name.endswith('.txt')]
+    cot_df = pd.concat(dfs, ignore_index=True)
+    cot_df['Date'] = pd.to_datetime(cot_df['Report_Date_as_YYYY-MM-DD'])
+    return cot_df
+
+
+VARIANTS = {
+    'legacy (all columns, inferred)': parse_legacy,
+    'typed, c engine': lambda content: parse_cot_archive(content, engine='c'),
+    'typed, pyarrow engine': lambda content: parse_cot_archive(content, engine='pyarrow'),
+}
+
+
+def _resident_mb():
+    # Current resident set size (Linux)
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def _run_variant(name, content, queue):
+    rss_before = _resident_mb()
+    start = time.perf_counter()
+    try:
+        cot_df = VARIANTS[name](content)
+    except Exception:
+        # Reported to the parent, which would otherwise wait for a result forever
+        queue.put({'variant': name, 'error': traceback.format_exc()})
+        return
+    elapsed = time.perf_counter() - start
+    rss_after = _resident_mb()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        'variant': name,
+        'columns': cot_df.shape[1],
+        'parse_s': elapsed,
+        'frame_mb': cot_df.memory_usage(deep=True).sum() / 2**20,
+        # Resident memory added while the parsed frame is alive
+        'rss_growth_mb': rss_after - rss_before,
+        # Includes the interpreter and imports; ru_maxrss is KiB on Linux
+        'peak_rss_mb': peak_rss / 2**10,
+    })
+
+
+def _wait_for_result(process, queue, poll=1.0):
+    """The variant's result, or None if its process died without sending one"""
+    while True:
+        try:
+            return queue.get(timeout=poll)
+        except Empty:
+            if not process.is_alive():
+                # A result put just before exiting may still be in flight
+                try:
+                    return queue.get(timeout=poll)
+                except Empty:
+                    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000, help='report rows (~300 markets x 52 weeks per year)')
+    args = parser.parse_args(argv)
+
+    content = make_archive(args.rows)
+    print(f"Synthetic archive: {args.rows} rows x {TOTAL_COLUMNS} columns, "
+          f"{len(content) / 2**20:.1f} MiB zipped; typed loader keeps {len(COT_SCHEMA)} columns\n")
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for name in VARIANTS:
+        queue = ctx.Queue()
+        process = ctx.Process(target=_run_variant, args=(name, content, queue))
+        process.start()
+        result = _wait_for_result(process, queue)
+        process.join()
+        if result is None:
+            parser.exit(1, f"{name}: worker exited with code {process.exitcode} without a result\n")
+        if 'error' in result:
+            parser.exit(1, f"{name} failed:\n{result['error']}")
+        results.append(result)
+
+    print(pd.DataFrame(results).set_index('variant').round(3).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Benchmark the data and analytics hot paths on synthetic history.
+
+Generates COT reports and daily OHLCV bars for 1-20 years and 1-50 markets
+(no CFTC or Yahoo access) and times each stage the app runs on a page load:
+
+    cot_store_read         COTStore.read(), behind get_cftc_data()
+    merchant_positions     MarketIndex build + positions for every market
+    signal_history         maintain_signal_history for every market
+    merchant_behavior      analyze_merchant_behavior for every market
+    trend_changes          analyze_trend_changes for every market
+
+Wall time is the best of --repeat runs; peak memory is measured by
+tracemalloc in a separate run (slower than the timed runs; the full grid takes
+several minutes). With --check the results are compared with
+benchmarks/baseline.json and the process exits non-zero when a stage is
+slower or larger than the allowed factor. Timings are scaled by a fixed
+calibration workload so baselines carry across machines.
+
+    python benchmarks/bench_pipeline.py                      # full grid, print results
+    python benchmarks/bench_pipeline.py --quick --check      # CI grid against the baseline
+    python benchmarks/bench_pipeline.py --quick --update-baseline
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.analysis import analyze_merchant_behavior, analyze_trend_changes  # noqa: E402
+from commodity_charter.cftc import COT_SCHEMA, DATE_COLUMN, MARKET_CODE_COLUMN  # noqa: E402
+from commodity_charter.markets import TRADER_CATEGORIES, MarketIndex, commodity_market_codes  # noqa: E402
+from commodity_charter.signals import BOUND_COLUMNS, maintain_signal_history  # noqa: E402
+from commodity_charter.store import COTStore  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+FULL_GRID = {'years': [1, 5, 10, 20], 'markets': [1, 10, 50]}
+QUICK_GRID = {'years': [1, 20], 'markets': [1, 10]}
+
+# Allowed growth over the baseline before --check fails
+TIME_FACTOR = 2.0
+MEMORY_FACTOR = 1.25
+# Differences below these are noise at the smallest sizes
+MIN_SECONDS = 0.02
+MIN_MEMORY_MB = 2.0
+
+
+def synthetic_markets(markets):
+    """Market codes for n markets: the charted ones first, then made-up codes"""
+    codes = {commodity: codes[:1] for commodity, codes in list(commodity_market_codes.items())[:markets]}
+    for i in range(len(codes), markets):
+        codes[f'Synthetic {i}'] = [f'9{i:05d}']
+    return codes
+
+
+def make_cot_history(years, market_codes, seed=0):
+    """Weekly reports shaped like COTStore.read() output"""
+    rng = np.random.RandomState(seed)
+    dates = pd.date_range(end='2024-12-31', periods=52 * years, freq='W-TUE')
+    frames = []
+    for commodity, codes in market_codes.items():
+        open_interest = rng.randint(50000, 1500000, len(dates))
+        report = {
+            'Market_and_Exchange_Names': f'{commodity.upper()} - SYNTHETIC EXCHANGE',
+            DATE_COLUMN: dates.strftime('%Y-%m-%d'),
+            MARKET_CODE_COLUMN: codes[0],
+            'Open_Interest_All': open_interest,
+        }
+        for info in TRADER_CATEGORIES.values():
+            for side in ('long', 'short', 'spread'):
+                if info[side]:
+                    pct = rng.uniform(2, 60, len(dates)).round(1)
+                    report[info[side]] = (open_interest * pct / 100).astype(int)
+                    if f'{side}_pct' in info:
+                        report[info[f'{side}_pct']] = pct
+        frames.append(pd.DataFrame(report))
+    cot_data = pd.concat(frames, ignore_index=True).astype(COT_SCHEMA)
+    cot_data['Date'] = pd.to_datetime(cot_data[DATE_COLUMN])
+    return cot_data
+
+
+def make_prices(years, market_codes, seed=1):
+    """Daily OHLCV random walks per market, tz-aware like the price cache"""
+    rng = np.random.RandomState(seed)
+    index = pd.bdate_range(end='2024-12-31', periods=261 * years, tz='America/New_York')
+    prices = {}
+    for commodity in market_codes:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+        prices[commodity] = pd.DataFrame({
+            'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+            'Volume': rng.randint(1000, 100000, len(index))
+        }, index=index)
+    return prices
+
+
+def make_signals(market_codes, seed=2):
+    rng = np.random.RandomState(seed)
+    low = rng.uniform(10, 40, (len(market_codes), 2))
+    bounds = np.column_stack([low[:, 0], low[:, 0] + 10, low[:, 1] + 20, low[:, 1] + 30])
+    return pd.DataFrame(bounds, columns=BOUND_COLUMNS).assign(Commodity=list(market_codes))
+
+
+def build_stages(years, markets, store_root):
+    """Stage name -> zero-argument callable, with all inputs prepared up front"""
+    market_codes = synthetic_markets(markets)
+    cot_data = make_cot_history(years, market_codes)
+    prices = make_prices(years, market_codes)
+    signals_df = make_signals(market_codes)
+    store = COTStore(root=store_root)
+    store.write(cot_data)
+
+    market_index = MarketIndex(cot_data, market_codes)
+    positions = {commodity: market_index.positions(commodity) for commodity in market_codes}
+
+    def merchant_positions():
+        index = MarketIndex(cot_data, market_codes)
+        return [index.positions(commodity) for commodity in market_codes]
+
+    stages = {
+        'cot_store_read': store.read,
+        'merchant_positions': merchant_positions,
+        'signal_history': lambda: [
+            maintain_signal_history(positions[c], signals_df, c) for c in market_codes
+        ],
+        'merchant_behavior': lambda: [
+            analyze_merchant_behavior(prices[c], positions[c], lookback_days=None) for c in market_codes
+        ],
+        'trend_changes': lambda: [
+            analyze_trend_changes(prices[c], positions[c]['Open_Interest'], positions[c]['Date'])
+            for c in market_codes
+        ],
+    }
+    return stages, len(cot_data)
+
+
+def measure(stage, repeat):
+    """Best wall time over repeat runs and tracemalloc peak of one more run"""
+    stage()  # warm-up
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    stage()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(seconds), peak / 2**20
+
+
+def calibrate(repeat=5):
+    """Seconds for a fixed NumPy/pandas workload; used to normalise timings between machines"""
+    rng = np.random.RandomState(0)
+    values = pd.Series(rng.normal(size=500000))
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        values.rolling(50).mean().sum()
+        np.sort(values.to_numpy())
+        values.groupby(np.arange(len(values)) % 100).mean()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def run(grid, repeat=3):
+    rows = []
+    for years in grid['years']:
+        for markets in grid['markets']:
+            with tempfile.TemporaryDirectory(prefix='bench-store-') as store_root:
+                stages, report_rows = build_stages(years, markets, store_root)
+                for name, stage in stages.items():
+                    seconds, peak_mb = measure(stage, repeat)
+                    rows.append({'stage': name, 'years': years, 'markets': markets, 'rows': report_rows,
+                                 'seconds': seconds, 'peak_mb': peak_mb})
+    return pd.DataFrame(rows)
+
+
+def _key(row):
+    return f"{row['stage']}|{row['years']}|{row['markets']}"
+
+
+def check(results, baseline, calibration, time_factor=TIME_FACTOR, memory_factor=MEMORY_FACTOR):
+    """Regression messages for stages past the allowed factors; empty when all pass"""
+    speed = calibration / baseline['calibration_s']
+    failures = []
+    for row in results.to_dict('records'):
+        base = baseline['results'].get(_key(row))
+        if base is None:
+            continue
+        time_limit = max(base['seconds'] * speed * time_factor, base['seconds'] * speed + MIN_SECONDS)
+        memory_limit = max(base['peak_mb'] * memory_factor, base['peak_mb'] + MIN_MEMORY_MB)
+        if row['seconds'] > time_limit:
+            failures.append(f"{_key(row)}: {row['seconds']:.3f}s > {time_limit:.3f}s allowed")
+        if row['peak_mb'] > memory_limit:
+            failures.append(f"{_key(row)}: {row['peak_mb']:.1f}MB > {memory_limit:.1f}MB allowed")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help=f'CI grid {QUICK_GRID} instead of {FULL_GRID}')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage (best is kept)')
+    parser.add_argument('--check', action='store_true', help='fail on regressions against the baseline')
+    parser.add_argument('--update-baseline', action='store_true', help='record these results as the baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--time-factor', type=float, default=TIME_FACTOR)
+    parser.add_argument('--memory-factor', type=float, default=MEMORY_FACTOR)
+    args = parser.parse_args(argv)
+
+    calibration = calibrate()
+    results = run(QUICK_GRID if args.quick else FULL_GRID, repeat=args.repeat)
+    print(f"Calibration workload: {calibration:.4f}s\n")
+    print(results.round({'seconds': 4, 'peak_mb': 2}).to_string(index=False))
+
+    if args.update_baseline:
+        baseline = {
+            'calibration_s': calibration,
+            'results': {_key(row): {'seconds': row['seconds'], 'peak_mb': row['peak_mb']}
+                        for row in results.to_dict('records')},
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = check(results, baseline, calibration, args.time_factor, args.memory_factor)
+        if failures:
+            print("\nRegressions:\n  " + "\n  ".join(failures))
+            return 1
+        print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
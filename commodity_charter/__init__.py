@@ -0,0 +1 @@
+"""Data and analytics core for Commodity Charter Pro."""
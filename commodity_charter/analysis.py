@@ -0,0 +1,165 @@
+"""Price and COT position analyses shared by the dashboard and batch jobs."""
+import numbers
+
+import numpy as np
+import pandas as pd
+
+from commodity_charter.metrics import timed
+
+MARKET_TZ = 'America/New_York'
+
+
+def to_market_tz(index):
+    """DatetimeIndex in exchange time; naive timestamps are taken as exchange time"""
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize(MARKET_TZ) if index.tz is None else index.tz_convert(MARKET_TZ)
+
+
+def lookback_cutoff(lookback, now=None):
+    """Start of a lookback window given in days or as a Timedelta; None means no cutoff"""
+    if lookback is None:
+        return None
+    lookback = pd.Timedelta(days=lookback) if isinstance(lookback, numbers.Number) else pd.Timedelta(lookback)
+    now = pd.Timestamp.now(tz=MARKET_TZ) if now is None else pd.Timestamp(now)
+    now = now.tz_localize(MARKET_TZ) if now.tzinfo is None else now.tz_convert(MARKET_TZ)
+    return now - lookback
+
+
+@timed()
+def align_positions_with_returns(price_data, merchant_positions, lookback=None, freq='W', now=None):
+    """Join period price changes with merchant positioning and score each period.
+
+    lookback limits the analysis to recent history (days or a Timedelta;
+    None keeps everything) and freq is any pandas resampling rule. Each
+    period gets the merchants' dominant side and whether price moved their way:
+    net short into a falling period, or net long into a rising one.
+    """
+    columns = ['Price_Change', 'Short_Pct', 'Long_Pct', 'Position', 'Correct']
+    if price_data.empty or merchant_positions.empty:
+        return pd.DataFrame(columns=columns)
+
+    close = pd.Series(price_data['Close'].to_numpy(), index=to_market_tz(price_data.index))
+    positions = merchant_positions.set_index(to_market_tz(merchant_positions['Date']))
+    positions = positions[['Merchant_Short_Pct', 'Merchant_Long_Pct']]
+
+    cutoff = lookback_cutoff(lookback, now)
+    if cutoff is not None:
+        close = close[close.index >= cutoff]
+        positions = positions[positions.index >= cutoff]
+    if close.empty or positions.empty:
+        return pd.DataFrame(columns=columns)
+
+    price_change = close.resample(freq).last().pct_change()
+    aligned = positions.resample(freq).last().join(price_change.rename('Price_Change'), how='inner')
+
+    short_pct = aligned['Merchant_Short_Pct'].to_numpy(dtype=float)
+    long_pct = aligned['Merchant_Long_Pct'].to_numpy(dtype=float)
+    change = aligned['Price_Change'].to_numpy(dtype=float)
+
+    net_short = short_pct > long_pct
+    net_long = long_pct > short_pct
+    result = pd.DataFrame({
+        'Price_Change': change * 100,
+        'Short_Pct': short_pct,
+        'Long_Pct': long_pct,
+        'Position': np.select([net_short, net_long], ['Short', 'Long'], default=None),
+        'Correct': ((change < 0) & net_short) | ((change > 0) & net_long),
+    }, index=aligned.index.rename('Date'))
+
+    # Periods without a price change or a report can't be scored
+    return result[~np.isnan(change) & ~np.isnan(short_pct) & ~np.isnan(long_pct)]
+
+
+def merchant_hit_rate(aligned):
+    """Share of scored periods in which merchants were positioned correctly"""
+    if aligned.empty:
+        return np.nan
+    return aligned['Correct'].mean()
+
+
+def correct_positions(aligned):
+    """Periods in which merchants were positioned correctly"""
+    correct = aligned[aligned['Correct'].astype(bool)]
+    if correct.empty:
+        return pd.DataFrame()
+    return correct[['Price_Change', 'Position', 'Short_Pct', 'Long_Pct']].reset_index()
+
+
+def calendar_moving_average(close, window=50):
+    """Mean of the last `window` calendar days of closes, evaluated only on trading days.
+
+    Equivalent to forward-filling the closes to every calendar day and taking
+    a `window`-day rolling mean, without materialising the weekend rows: each
+    bar's close is counted once for every calendar day it stays the latest one.
+    """
+    close = close.dropna()
+    close = close[~close.index.duplicated(keep='last')]
+    if close.empty:
+        return pd.Series(dtype=float, index=close.index)
+
+    index = pd.DatetimeIndex(close.index)
+    days = (index.tz_localize(None) if index.tz is not None else index).normalize()
+    days = ((days - days[0]) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+    values = close.to_numpy(dtype=float)
+
+    # cumulative[i]: sum of the filled daily closes from the first bar through bar i's day
+    steps = np.empty(len(values))
+    steps[0] = values[0]
+    steps[1:] = (np.diff(days) - 1) * values[:-1] + values[1:]
+    cumulative = np.cumsum(steps)
+
+    # Same sum up to the day before the window starts, via an as-of lookup
+    window_start = days - window
+    prior = np.searchsorted(days, window_start, side='right') - 1
+    before = np.where(
+        prior >= 0,
+        cumulative[np.maximum(prior, 0)] + (window_start - days[np.maximum(prior, 0)]) * values[np.maximum(prior, 0)],
+        0.0
+    )
+    moving_average = (cumulative - before) / window
+    # A full window is needed, as with rolling(window)
+    moving_average[days < window - 1] = np.nan
+    return pd.Series(moving_average, index=close.index)
+
+
+def attach_open_interest(price_trend, oi_weekly):
+    """Latest reported open interest as of each trading day, via an as-of join"""
+    prices = price_trend.reset_index(names='_Bar')
+    prices['_Time'] = to_market_tz(prices['_Bar'])
+    reports = pd.DataFrame({
+        '_Time': to_market_tz(oi_weekly.index),
+        'Open_Interest': oi_weekly['Open_Interest'].to_numpy(),
+    }).sort_values('_Time')
+    aligned = pd.merge_asof(prices.sort_values('_Time'), reports, on='_Time', direction='backward')
+    return aligned.drop(columns='_Time').set_index('_Bar').rename_axis(price_trend.index.name)
+
+
+@timed()
+def analyze_trend_changes(price_data, open_interest_data, dates, window=50):
+    """Analyze trend changes near Open Interest peaks with 50-day window.
+
+    Returns the price bars with MA, Trend and the as-of open interest on
+    trading days only, and open interest at its native weekly cadence.
+    """
+    oi_weekly = pd.DataFrame({
+        'Open_Interest': np.asarray(open_interest_data),
+        'Date': pd.to_datetime(np.asarray(dates))
+    }).dropna().drop_duplicates('Date', keep='last').set_index('Date').sort_index()
+
+    # Calculate price moving average for trend determination
+    price_trend = price_data.sort_index().copy()
+    price_trend['MA'] = calendar_moving_average(price_trend['Close'], window)
+    price_trend['Trend'] = np.where(price_trend['Close'] > price_trend['MA'], 'Up', 'Down')
+
+    if not price_trend.empty and not oi_weekly.empty:
+        price_trend = attach_open_interest(price_trend, oi_weekly)
+    else:
+        price_trend['Open_Interest'] = np.nan
+    return price_trend, oi_weekly
+
+
+@timed()
+def analyze_merchant_behavior(price_data, merchant_positions, lookback_days=365, freq='W'):
+    """Analyze merchant positioning relative to price trends"""
+    aligned = align_positions_with_returns(price_data, merchant_positions, lookback=lookback_days, freq=freq)
+    return correct_positions(aligned)
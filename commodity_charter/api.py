@@ -0,0 +1,228 @@
+"""Read-only JSON API over the cached COT store and the derived signal tables.
+
+A plain WSGI application, so it needs no web framework and tests can call it
+in-process. Every response body is built once per COT data version from the
+precomputed screener and signal history tables, and is served with an ETag,
+conditional GET support and optional gzip.
+
+    GET /commodities                       latest signal for every market
+    GET /commodities/<name>/signal         latest signal for one market
+    GET /commodities/<name>/history        weekly signal history
+    GET /commodities/<name>/positions      positions of every trader category and open interest
+    GET /health
+    GET /metrics                           stage timings and cache counters (Prometheus text)
+
+<name> is a commodity name, alias or Yahoo symbol, e.g. gold, crude-oil or CL=F.
+
+    python -m commodity_charter.api --port 8000
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from socketserver import ThreadingMixIn
+from urllib.parse import unquote
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import pandas as pd
+
+from commodity_charter.derived import DerivedStore
+from commodity_charter.markets import MarketIndex, canonical_commodity, commodity_symbols
+from commodity_charter.metrics import count_cache, prometheus_text, timed
+from commodity_charter.prices import PriceCache
+from commodity_charter.signals import DEFAULT_SIGNALS_PATH, load_cot_signals
+from commodity_charter.store import COTStore
+from commodity_charter.worker import HISTORY_DAYS, build_derived_tables
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_BYTES = 512
+RECHECK_SECONDS = 30
+
+
+class Response:
+    """A prebuilt JSON body with its gzip variant and ETag"""
+
+    def __init__(self, payload, status='200 OK'):
+        self.status = status
+        self.body = json.dumps(payload, separators=(',', ':'), allow_nan=False).encode()
+        self.gzipped = gzip.compress(self.body, mtime=0) if len(self.body) >= GZIP_MIN_BYTES else None
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+
+
+def _records(df):
+    """JSON-ready records with ISO dates and NaN as null"""
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime('%Y-%m-%d')
+    return json.loads(df.to_json(orient='records', double_precision=4))
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+def _accepts_gzip(header):
+    for encoding in (header or '').split(','):
+        name, _, params = encoding.strip().partition(';')
+        if name.strip() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0')
+    return False
+
+
+def resolve_commodity(name):
+    """Canonical commodity for a URL segment such as 'crude-oil', 'Gold' or 'CL%3DF'"""
+    name = unquote(name)
+    return canonical_commodity(name) or canonical_commodity(name.replace('-', ' ').replace('_', ' '))
+
+
+class SignalAPI:
+    """WSGI app serving prebuilt responses for the latest COT data version"""
+
+    def __init__(self, store=None, derived=None, prices=None, signals_path=DEFAULT_SIGNALS_PATH,
+                 max_age=60, recheck_seconds=RECHECK_SECONDS):
+        self.store = store or COTStore()
+        self.derived = derived or DerivedStore()
+        self.prices = prices or PriceCache()
+        self.signals_path = signals_path
+        self.max_age = max_age
+        self.recheck_seconds = recheck_seconds
+        self.version = None
+        self._responses = {}
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def _tables(self, cot_data, version):
+        tables = {name: self.derived.read(name, version) for name in ('screener', 'signal_history')}
+        if any(table is None for table in tables.values()):
+            # No worker output for this version yet; derive the tables here
+            now = pd.Timestamp.now(tz='America/New_York')
+            price_frames = self.prices.get_many(list(commodity_symbols.values()),
+                                                now - pd.Timedelta(days=HISTORY_DAYS), now, now=now)
+            tables = build_derived_tables(cot_data, load_cot_signals(self.signals_path), price_frames, now=now,
+                                          positions=self.store.category_positions())
+        return tables['screener'], tables['signal_history']
+
+    @timed('api_build_responses')
+    def build_responses(self):
+        """Every endpoint's response for the stored COT version"""
+        latest = self.store.latest_report()
+        version = latest.strftime('%Y-%m-%d') if latest is not None else None
+        responses = {'/health': Response({'status': 'ok', 'data_version': version})}
+        if version is None:
+            return version, responses
+
+        cot_data = self.store.read()
+        screener, signal_history = self._tables(cot_data, version)
+        market_index = MarketIndex(cot_data, positions=self.store.category_positions())
+
+        rows = _records(screener)
+        responses['/commodities'] = Response({'data_version': version, 'commodities': rows})
+        for row in rows:
+            commodity = row['Commodity']
+            history = signal_history[signal_history['Commodity'] == commodity].drop(columns='Commodity')
+            responses[f'/commodities/{commodity}/signal'] = Response({'data_version': version, **row})
+            responses[f'/commodities/{commodity}/history'] = Response(
+                {'data_version': version, 'commodity': commodity, 'history': _records(history)}
+            )
+            responses[f'/commodities/{commodity}/positions'] = Response(
+                {'data_version': version, 'commodity': commodity,
+                 'positions': _records(market_index.positions(commodity))}
+            )
+        return version, responses
+
+    def refresh(self, force=False):
+        """Rebuild the responses when the store holds a newer report"""
+        now = time.monotonic()
+        if not force and self._checked is not None and now - self._checked < self.recheck_seconds:
+            return
+        with self._lock:
+            latest = self.store.latest_report()
+            version = latest.strftime('%Y-%m-%d') if latest is not None else None
+            if force or not self._responses or version != self.version:
+                self.version, self._responses = self.build_responses()
+                logger.info("API responses built for COT version %s", self.version)
+            self._checked = now
+
+    def lookup(self, path):
+        path = '/' + path.strip('/')
+        key = path
+        parts = path.split('/')
+        if len(parts) == 4 and parts[1] == 'commodities':
+            commodity = resolve_commodity(parts[2])
+            key = f'/commodities/{commodity}/{parts[3]}' if commodity else None
+        response = self._responses.get(key)
+        if response is None:
+            return Response({'error': 'not found', 'path': path}, status='404 Not Found')
+        return response
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [('Allow', 'GET, HEAD')])
+            return [b'']
+
+        self.refresh()
+        if environ.get('PATH_INFO', '/').rstrip('/') == '/metrics':
+            body = prometheus_text().encode()
+            start_response('200 OK', [('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+                                      ('Cache-Control', 'no-store'), ('Content-Length', str(len(body)))])
+            return [b''] if environ['REQUEST_METHOD'] == 'HEAD' else [body]
+
+        response = self.lookup(environ.get('PATH_INFO', '/'))
+        headers = [
+            ('Content-Type', 'application/json'),
+            ('ETag', response.etag),
+            ('Cache-Control', f'max-age={self.max_age}'),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        if _etag_matches(environ.get('HTTP_IF_NONE_MATCH'), response.etag):
+            count_cache('api_conditional', hit=True)
+            start_response('304 Not Modified', headers)
+            return [b'']
+
+        count_cache('api_conditional', hit=False)
+        body = response.body
+        if response.gzipped is not None and _accepts_gzip(environ.get('HTTP_ACCEPT_ENCODING')):
+            body = response.gzipped
+            headers.append(('Content-Encoding', 'gzip'))
+        headers.append(('Content-Length', str(len(body))))
+        start_response(response.status, headers)
+        return [b''] if environ['REQUEST_METHOD'] == 'HEAD' else [body]
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve COT signals and positions as JSON")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--signals', default=DEFAULT_SIGNALS_PATH, help='signal range file')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    app = SignalAPI(signals_path=args.signals)
+    app.refresh(force=True)
+    with make_server(args.host, args.port, app, server_class=ThreadingWSGIServer,
+                     handler_class=QuietHandler) as server:
+        logger.info("Serving on http://%s:%d", args.host, args.port)
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
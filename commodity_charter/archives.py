@@ -0,0 +1,205 @@
+"""Local copies of the yearly CFTC archives, kept fresh with conditional requests.
+
+Archives are named by report year, or by cftc.HISTORY_ARCHIVE for the
+combined file holding the years before yearly archives were published.
+
+Archives are streamed to disk in chunks and only replace the local copy once
+complete, so a failed or truncated download never clobbers the last good
+snapshot. Later checks send If-None-Match/If-Modified-Since, and an archive
+the server reports unchanged is neither downloaded nor parsed again.
+Timeouts, connection errors and 429/5xx responses are retried with
+exponential backoff; when they persist the local copy is used if there is one.
+
+The HTTP transport is injectable: anything with a requests-style
+``get(url, headers=, stream=, timeout=)`` works, and the archive URL template
+can point at a local server.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zipfile
+
+import pandas as pd
+
+from commodity_charter.cftc import ARCHIVE_URL, CSV_ENGINE, parse_cot_archive
+from commodity_charter.metrics import record_size, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = os.path.join('data', 'cot_archives')
+METADATA_FILE = '_archives.json'
+
+# (connect, read) timeouts in seconds; the read timeout applies per chunk
+TIMEOUT = (10, 60)
+CHUNK_SIZE = 1 << 20
+RETRIES = 3
+BACKOFF_SECONDS = 2.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ArchiveFetchError(OSError):
+    """An archive could not be downloaded and no local copy exists"""
+
+
+def http_session(pool_size=4):
+    """Pooled requests session for the CFTC downloads"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ArchiveFetcher:
+    """Downloads yearly archives into a local directory and parses new ones"""
+
+    def __init__(self, root=None, session=None, url_template=ARCHIVE_URL, timeout=TIMEOUT,
+                 retries=RETRIES, backoff=BACKOFF_SECONDS, chunk_size=CHUNK_SIZE,
+                 engine=CSV_ENGINE, sleep=time.sleep):
+        self.root = root or os.environ.get('COT_ARCHIVE_DIR', DEFAULT_ARCHIVE_DIR)
+        self.url_template = url_template
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self.engine = engine
+        self.sleep = sleep
+        self._session = session
+        self._served = set()
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = http_session()
+        return self._session
+
+    def path(self, year):
+        return os.path.join(self.root, f'fut_disagg_txt_{year}.zip')
+
+    @property
+    def metadata_path(self):
+        return os.path.join(self.root, METADATA_FILE)
+
+    def metadata(self):
+        try:
+            with open(self.metadata_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record(self, year, **entry):
+        with self._lock:
+            metadata = self.metadata()
+            metadata[str(year)] = entry
+            fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.root)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(metadata, f, indent=2)
+            os.replace(tmp_path, self.metadata_path)
+
+    def _validators(self, year):
+        """Conditional request headers for the local copy of a year's archive"""
+        if not os.path.exists(self.path(year)):
+            return {}
+        entry = self.metadata().get(str(year), {})
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _download(self, year):
+        """One attempt; True when a new archive was stored, False when the server says unchanged"""
+        url = self.url_template.format(year=year)
+        response = self.session.get(url, headers=self._validators(year), stream=True, timeout=self.timeout)
+        try:
+            if response.status_code == 304:
+                return False
+            if response.status_code in RETRY_STATUSES:
+                raise ArchiveFetchError(f"HTTP {response.status_code} for {url}")
+            response.raise_for_status()
+
+            os.makedirs(self.root, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.zip', dir=self.root)
+            try:
+                size = 0
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(self.chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+                expected = response.headers.get('Content-Length')
+                if expected is not None and 'Content-Encoding' not in response.headers and int(expected) != size:
+                    raise ArchiveFetchError(f"truncated download of {url}: {size} of {expected} bytes")
+                if not zipfile.is_zipfile(tmp_path):
+                    raise ArchiveFetchError(f"{url} is not a zip archive")
+                os.replace(tmp_path, self.path(year))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        finally:
+            response.close()
+
+        self._record(year, etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'),
+                     bytes=size, fetched_at=pd.Timestamp.now(tz='UTC').isoformat())
+        record_size('cftc_archive', size)
+        return True
+
+    def fetch(self, year):
+        """Path of the local archive for year and whether it changed on this fetch.
+
+        Falls back to the existing local copy (reported unchanged) when the
+        download keeps failing; raises ArchiveFetchError when there is none.
+        """
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                with span('cftc_download'):
+                    return self.path(year), self._download(year)
+            except OSError as e:
+                # requests' exceptions are OSErrors; client errors such as 404 aren't worth retrying
+                error = e
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if (status is not None and status not in RETRY_STATUSES) or attempt == self.retries:
+                    break
+                delay = self.backoff * 2 ** attempt
+                logger.warning("Downloading the %s COT archive failed (%s); retrying in %.0fs", year, e, delay)
+                self.sleep(delay)
+
+        if os.path.exists(self.path(year)):
+            logger.warning("Using the local %s COT archive after download failures: %s", year, error)
+            return self.path(year), False
+        raise ArchiveFetchError(f"could not download the {year} COT archive: {error}") from error
+
+    def __call__(self, year):
+        """Parsed archive for ingest_cot_history; empty when unchanged since this fetcher last parsed it"""
+        path, changed = self.fetch(year)
+        if not changed and year in self._served:
+            return pd.DataFrame()
+        self._served.add(year)
+        return parse_cot_archive(path, engine=self.engine)
+
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+
+def default_archive_fetcher():
+    """Process-wide archive fetcher, created on first use"""
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = ArchiveFetcher()
+        return _default_fetcher
+
+
+def fetch_cot_archive(year):
+    """Parsed archive for one report year from the shared fetcher; empty when unchanged"""
+    return default_archive_fetcher()(year)
@@ -0,0 +1,197 @@
+"""Replay weekly COT signals against forward price returns.
+
+Signals are evaluated on a (weeks x commodities) panel of merchant
+positioning. A BULLISH week is scored as a long position, a BEARISH week as
+a short, each held for `horizon` weeks. A report describes Tuesday's
+positions but is only published on Friday afternoon, after that week's close,
+so its signal is entered at the close of the following week. Threshold
+grids are evaluated for every commodity at once by broadcasting a
+(combinations x commodities x 4) bounds array over the panel.
+
+    python -m commodity_charter.backtest --years 10 --horizon 4
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from commodity_charter.analysis import to_market_tz
+from commodity_charter.markets import COT_INDEX_WEEKS, category_positions, commodity_market_codes, commodity_symbols
+from commodity_charter.prices import default_price_cache
+from commodity_charter.screener import commodity_closes
+from commodity_charter.signals import (
+    BOUND_COLUMNS, COT_STATISTICS, DEFAULT_CATEGORY, DEFAULT_SIGNALS_PATH, ThresholdTable, load_cot_signals,
+    statistic_filter
+)
+from commodity_charter.store import COTStore
+
+HORIZON_WEEKS = 4
+# Combinations scored per NumPy batch; bounds the (combos x weeks x commodities) temporaries
+GRID_CHUNK = 256
+
+METRIC_COLUMNS = ['Signals', 'Hit_Rate', 'Avg_Return', 'Max_Drawdown']
+POSITION_FIELDS = ('Short_Pct', 'Long_Pct')
+
+
+def position_panel(cot_data, market_codes=commodity_market_codes, freq='W', categories=DEFAULT_CATEGORY,
+                   fields=POSITION_FIELDS, window=None):
+    """Wide (periods x commodities) frames of short and long percentages of open interest.
+
+    Each period holds the report published in the period before it, the
+    first one whose close a trade on that report could have used.
+
+    categories is the trader category read for every commodity, or a
+    mapping of commodity to category (others read DEFAULT_CATEGORY).
+    fields picks other per-category columns, one frame each; the COT_Index
+    and Z_Score statistics need a window (see markets.category_positions).
+    """
+    positions = category_positions(cot_data, market_codes, window=window)
+    if isinstance(categories, str):
+        categories = dict.fromkeys(market_codes, categories)
+    used = sorted(set(categories.values()) | {DEFAULT_CATEGORY})
+    wide = positions.assign(Date=to_market_tz(positions['Date'])).pivot_table(
+        index='Date', columns='Commodity', aggfunc='last', observed=True, dropna=False,
+        values=[f'{category}_{field}' for category in used for field in fields]
+    ).resample(freq).last().shift(1)
+
+    def panel(field):
+        return pd.DataFrame({
+            commodity: wide[(f'{categories.get(commodity, DEFAULT_CATEGORY)}_{field}', commodity)]
+            for commodity in wide.columns.unique(level='Commodity')
+        }, index=wide.index).rename_axis(columns='Commodity')
+    return tuple(panel(field) for field in fields)
+
+
+def forward_returns(closes, horizon=HORIZON_WEEKS, freq='W'):
+    """Return from each period's close to the close `horizon` periods later"""
+    closes = closes.resample(freq).last()
+    return closes.shift(-horizon) / closes - 1
+
+
+def signal_directions(short_pct, long_pct, bounds, bullish_ok=True, bearish_ok=True):
+    """+1 (bullish), -1 (bearish) or 0 for each period and commodity.
+
+    short_pct/long_pct are (periods x commodities); bounds has shape
+    (..., commodities, 4) in BOUND_COLUMNS order and the result gains its
+    leading dimensions. bullish_ok/bearish_ok (see signals.statistic_filter)
+    mask out hits. As in evaluate_signals, bearish wins when both hit.
+    """
+    bounds = np.expand_dims(np.asarray(bounds, dtype=float), -3)
+    bullish = (short_pct >= bounds[..., 0]) & (short_pct <= bounds[..., 1]) & bullish_ok
+    bearish = (long_pct >= bounds[..., 2]) & (long_pct <= bounds[..., 3]) & bearish_ok
+    return np.where(bearish, -1, np.where(bullish, 1, 0)).astype(np.int8)
+
+
+def score_directions(directions, returns):
+    """Signal count, hit rate, mean return and max drawdown along the period axis"""
+    valid = (directions != 0) & ~np.isnan(returns)
+    trade_returns = np.where(valid, directions * np.nan_to_num(returns), 0.0)
+
+    signals = valid.sum(axis=-2)
+    hits = (valid & (trade_returns > 0)).sum(axis=-2)
+    # Drawdown of the cumulative (non-compounded) signal returns from their running peak
+    equity = np.cumsum(trade_returns, axis=-2)
+    peak = np.maximum.accumulate(np.maximum(equity, 0), axis=-2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'Signals': signals,
+            'Hit_Rate': hits / signals * 100,
+            'Avg_Return': trade_returns.sum(axis=-2) / signals * 100,
+            'Max_Drawdown': (peak - equity).max(axis=-2) * 100,
+        }
+
+
+def aligned_panel(cot_data, closes, horizon=HORIZON_WEEKS, freq='W', market_codes=commodity_market_codes,
+                  categories=DEFAULT_CATEGORY, statistics=False):
+    """Commodities and matching (periods x commodities) short, long and forward return arrays.
+
+    With statistics, COT index and z-score arrays follow the returns.
+    """
+    fields = POSITION_FIELDS + (tuple(COT_STATISTICS) if statistics else ())
+    panels = position_panel(cot_data, market_codes, freq, categories, fields,
+                            window=COT_INDEX_WEEKS if statistics else None)
+    returns = forward_returns(closes, horizon, freq)
+    commodities = panels[0].columns.intersection(returns.columns)
+    periods = panels[0].index.intersection(returns.index)
+
+    def aligned(frame):
+        return frame.loc[periods, commodities].to_numpy(dtype=float)
+    short_pct, long_pct, *rest = (aligned(panel) for panel in panels)
+    return (list(commodities), short_pct, long_pct, aligned(returns), *rest)
+
+
+def backtest_signals(cot_data, signals_df, closes, horizon=HORIZON_WEEKS, freq='W',
+                     market_codes=commodity_market_codes):
+    """Per-commodity performance of the configured signal ranges, each on its configured trader category.
+
+    COT index/z-score ranges in signals_df gate the signals as in evaluate_signals.
+    """
+    thresholds = ThresholdTable(signals_df)
+    categories = {commodity: thresholds.category(commodity) for commodity in market_codes}
+    commodities, short_pct, long_pct, returns, *statistics = aligned_panel(
+        cot_data, closes, horizon, freq, market_codes, categories, statistics=thresholds.uses_statistics
+    )
+    if not commodities:
+        return pd.DataFrame(columns=['Commodity'] + METRIC_COLUMNS)
+
+    bounds = thresholds.bounds[thresholds.rows(commodities)]
+    allowed = statistic_filter(thresholds, commodities, *statistics) if statistics else (True, True)
+    metrics = score_directions(signal_directions(short_pct, long_pct, bounds, *allowed), returns)
+    return pd.DataFrame({'Commodity': commodities, **metrics})
+
+
+def threshold_grid(bullish_min, bullish_max, bearish_min, bearish_max):
+    """Every combination of candidate bounds, dropping empty (min > max) ranges"""
+    mesh = np.meshgrid(bullish_min, bullish_max, bearish_min, bearish_max, indexing='ij')
+    grid = np.stack([axis.ravel() for axis in mesh], axis=1).astype(float)
+    grid = grid[(grid[:, 0] <= grid[:, 1]) & (grid[:, 2] <= grid[:, 3])]
+    return pd.DataFrame(grid, columns=BOUND_COLUMNS)
+
+
+def backtest_grid(cot_data, closes, grid, horizon=HORIZON_WEEKS, freq='W',
+                  market_codes=commodity_market_codes, chunk_size=GRID_CHUNK):
+    """Metrics of every threshold combination in grid for every commodity.
+
+    Returns one row per (combination, commodity) with the combination's
+    bounds, its row number in grid as Combination, and the metrics.
+    """
+    grid = grid[BOUND_COLUMNS].to_numpy(dtype=float) if isinstance(grid, pd.DataFrame) else np.asarray(grid, float)
+    commodities, short_pct, long_pct, returns = aligned_panel(cot_data, closes, horizon, freq, market_codes)
+
+    chunks = []
+    for start in range(0, len(grid), chunk_size):
+        # (combos, 1, 4) broadcasts the same bounds to every commodity
+        bounds = grid[start:start + chunk_size, None, :]
+        chunks.append(score_directions(signal_directions(short_pct, long_pct, bounds), returns))
+
+    combos = len(grid)
+    result = pd.DataFrame({
+        'Combination': np.repeat(np.arange(combos), len(commodities)),
+        'Commodity': np.tile(commodities, combos),
+    })
+    for i, column in enumerate(BOUND_COLUMNS):
+        result[column] = np.repeat(grid[:, i], len(commodities))
+    for column in METRIC_COLUMNS:
+        values = [chunk[column].ravel() for chunk in chunks]
+        result[column] = np.concatenate(values) if values else np.array([])
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the COT signal ranges against forward returns")
+    parser.add_argument('--years', type=int, default=10, help='years of history to replay')
+    parser.add_argument('--horizon', type=int, default=HORIZON_WEEKS, help='holding period in weeks')
+    parser.add_argument('--signals', default=DEFAULT_SIGNALS_PATH, help='signal range file')
+    args = parser.parse_args(argv)
+
+    end = pd.Timestamp.now(tz='America/New_York')
+    start = end - pd.DateOffset(years=args.years)
+    cot_data = COTStore().read(years=range(start.year, end.year + 1))
+    symbol_prices = default_price_cache().get_many(list(commodity_symbols.values()), start, end)
+    report = backtest_signals(cot_data, load_cot_signals(args.signals), commodity_closes(symbol_prices),
+                              horizon=args.horizon)
+    print(report.to_string(index=False, float_format='{:.2f}'.format))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Parse the CFTC disaggregated futures-only COT archives."""
+import io
+import os
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from commodity_charter.metrics import timed
+
+ARCHIVE_URL = "https://www.cftc.gov/files/dea/history/fut_disagg_txt_{year}.zip"
+
+# CFTC ships yearly archives from 2017 on; the years before are only in one
+# combined history archive, which is fetched under this name in place of a year
+FIRST_YEARLY_ARCHIVE = 2017
+HISTORY_ARCHIVE = 'hist_2006_2016'
+
+# Column names used throughout the app
+DATE_COLUMN = 'Report_Date_as_YYYY-MM-DD'
+MARKET_CODE_COLUMN = 'CFTC_Contract_Market_Code'
+
+# The yearly files carry ~190 columns; only these are parsed, with compact
+# dtypes (positions fit in int32, percentages are published to one decimal)
+COT_SCHEMA = {
+    'Market_and_Exchange_Names': 'category',
+    DATE_COLUMN: 'string',
+    MARKET_CODE_COLUMN: 'category',
+    'Open_Interest_All': 'int32',
+    'Prod_Merc_Positions_Long_All': 'int32',
+    'Prod_Merc_Positions_Short_All': 'int32',
+    'Swap_Positions_Long_All': 'int32',
+    'Swap__Positions_Short_All': 'int32',
+    'Swap__Positions_Spread_All': 'int32',
+    'M_Money_Positions_Long_All': 'int32',
+    'M_Money_Positions_Short_All': 'int32',
+    'M_Money_Positions_Spread_All': 'int32',
+    'Other_Rept_Positions_Long_All': 'int32',
+    'Other_Rept_Positions_Short_All': 'int32',
+    'Other_Rept_Positions_Spread_All': 'int32',
+    'NonRept_Positions_Long_All': 'int32',
+    'NonRept_Positions_Short_All': 'int32',
+    'Pct_of_OI_Prod_Merc_Long_All': 'float32',
+    'Pct_of_OI_Prod_Merc_Short_All': 'float32',
+}
+
+CSV_ENGINE = os.environ.get('COT_CSV_ENGINE', 'c')
+
+
+def archive_url(year):
+    return ARCHIVE_URL.format(year=year)
+
+
+def _read_csv_pyarrow(source, schema):
+    # Text columns are pinned to strings so market codes keep leading zeros
+    column_types = {
+        column: pa.string() for column, dtype in schema.items()
+        if dtype in ('category', 'string')
+    }
+    table = pv.read_csv(
+        source,
+        parse_options=pv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+        convert_options=pv.ConvertOptions(include_columns=list(schema), column_types=column_types)
+    )
+    return table.to_pandas().astype(schema)
+
+
+def read_cot_report(source, engine=CSV_ENGINE, schema=COT_SCHEMA):
+    """Parse one COT text report, keeping only the schema columns"""
+    if engine == 'pyarrow':
+        df = _read_csv_pyarrow(source, schema)
+    else:
+        df = pd.read_csv(source, usecols=list(schema), dtype=schema,
+                         on_bad_lines='skip', engine=engine)
+
+    df['Date'] = pd.to_datetime(df[DATE_COLUMN])
+    return df
+
+
+@timed('cot_parse')
+def parse_cot_archive(content, engine=CSV_ENGINE, schema=COT_SCHEMA):
+    """Parse every .txt report inside a yearly zip archive, given as bytes or a path"""
+    z = zipfile.ZipFile(io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content)
+
+    dfs = []
+    for filename in z.namelist():
+        if filename.endswith('.txt'):
+            with z.open(filename) as f:
+                dfs.append(read_cot_report(f, engine=engine, schema=schema))
+
+    if not dfs:
+        return pd.DataFrame()
+    if len(dfs) == 1:
+        return dfs[0]
+
+    # Concatenating differing categoricals falls back to object; restore them
+    cot_df = pd.concat(dfs, ignore_index=True)
+    categorical = [column for column, dtype in schema.items() if dtype == 'category']
+    return cot_df.astype({column: 'category' for column in categorical})
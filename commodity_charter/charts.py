@@ -0,0 +1,257 @@
+"""Plotly figures for the price / open interest view; plotly is imported on first use.
+
+Long histories are rendered in 'webgl' mode by default: line traces become
+Scattergl and are reduced to about one point per horizontal pixel, and
+candles are aggregated to weekly or monthly bars once a range holds more of
+them than fit on screen. Narrow date ranges fall under the limits and are
+drawn at full resolution, so the payload stays bounded as history grows.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Bloomberg-style palette shared with the Streamlit theme
+BACKGROUND = '#001133'
+TEXT = '#FFFFFF'
+UP = '#00B8E6'
+DOWN = '#FF3366'
+MOVING_AVERAGE = '#FFB000'
+OPEN_INTEREST = '#00FF00'
+COT_INDEX = '#CC66FF'
+Z_SCORE = '#66CCFF'
+
+# Roughly the plot width in pixels of a wide layout
+MAX_POINTS = 1500
+# Candles narrower than ~3px are unreadable
+MAX_CANDLES = 500
+# Finest first; the first rule that fits within MAX_CANDLES wins
+CANDLE_RULES = ['W-FRI', 'M']
+RENDER_MODES = ['webgl', 'full']
+
+OHLC_AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+_plotly_lock = threading.Lock()
+_plotly_ready = threading.Event()
+
+
+def _plotly():
+    # plotly resolves its submodules (and its JSON encoder) lazily, which is
+    # not safe when several threads build their first figure at once; load
+    # them under a lock
+    with _plotly_lock:
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
+        if not _plotly_ready.is_set():
+            go.Candlestick, go.Scatter, go.Scattergl
+            go.Figure().to_json()
+            _plotly_ready.set()
+    return go, make_subplots
+
+
+def _numeric_x(x):
+    if isinstance(x, pd.DatetimeIndex):
+        return x.asi8.astype(float)
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb_indices(x, y, threshold):
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling to threshold points"""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = _numeric_x(x)
+    y = np.asarray(y, dtype=float)
+    # First and last points are fixed; the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+
+    selected = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third vertex
+        if i + 2 < len(edges):
+            next_x = x[stop:edges[i + 2]].mean()
+            next_y = y[stop:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        area = np.abs(
+            (x[selected] - next_x) * (y[start:stop] - y[selected])
+            - (x[selected] - x[start:stop]) * (next_y - y[selected])
+        )
+        selected = start + int(np.argmax(area))
+        keep[i + 1] = selected
+    return keep
+
+
+def minmax_indices(y, threshold):
+    """Indices of each bucket's minimum and maximum, about threshold points in total"""
+    n = len(y)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    edges = np.unique(np.linspace(0, n, threshold // 2 + 1).astype(int))
+    buckets = list(zip(edges[:-1], edges[1:]))
+    lows = [start + np.argmin(y[start:stop]) for start, stop in buckets]
+    highs = [start + np.argmax(y[start:stop]) for start, stop in buckets]
+    return np.unique(np.concatenate([[0, n - 1], lows, highs]))
+
+
+def downsample(series, max_points=MAX_POINTS, method='lttb'):
+    """Series reduced to at most about max_points, keeping its visual shape"""
+    series = series.dropna()
+    if max_points is None or len(series) <= max_points:
+        return series
+    if method == 'minmax':
+        keep = minmax_indices(series.to_numpy(), max_points)
+    else:
+        keep = lttb_indices(series.index, series.to_numpy(), max_points)
+    return series.iloc[keep]
+
+
+def candle_rule(price_data, max_candles=MAX_CANDLES):
+    """Resampling rule needed to fit the bars into max_candles, or None to keep them"""
+    if len(price_data) <= max_candles:
+        return None
+    for rule in CANDLE_RULES:
+        if len(price_data.resample(rule).size()) <= max_candles:
+            return rule
+    return CANDLE_RULES[-1]
+
+
+def aggregate_ohlc(price_data, rule):
+    """OHLCV bars aggregated to a coarser period, labelled by the period's first bar"""
+    aggregation = {column: how for column, how in OHLC_AGGREGATION.items() if column in price_data}
+    bars = price_data.resample(rule).agg(aggregation).dropna(subset=['Close'])
+    # Plot each bar at its first trading day rather than the period end label
+    first_day = pd.Series(price_data.index, index=price_data.index).resample(rule).first()
+    bars.index = pd.DatetimeIndex(first_day.loc[bars.index])
+    return bars
+
+
+def build_price_figure(price_data, price_trend, oi_weekly, commodity, chart_type='Candlestick',
+                       render_mode='webgl', max_points=MAX_POINTS, max_candles=MAX_CANDLES,
+                       reducer='lttb', cot_stats=None, cot_label='Merchant'):
+    """Price (candles or line) with its moving average above open interest.
+
+    render_mode 'full' sends every point as SVG traces; in 'webgl' mode full
+    detail comes from narrowing the date range until it fits the limits.
+    cot_stats (COT_Index and Z_Score by report date) adds a third panel for
+    the trader category named by cot_label.
+    """
+    go, make_subplots = _plotly()
+
+    webgl = render_mode == 'webgl'
+    line_trace = go.Scattergl if webgl else go.Scatter
+    if cot_stats is not None and cot_stats[['COT_Index', 'Z_Score']].isna().all().all():
+        cot_stats = None
+
+    def line(series):
+        return downsample(series, max_points, reducer) if webgl else series
+
+    if cot_stats is None:
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
+                            vertical_spacing=0.05,
+                            row_heights=[0.7, 0.3])
+    else:
+        fig = make_subplots(rows=3, cols=1, shared_xaxes=True,
+                            vertical_spacing=0.05,
+                            row_heights=[0.6, 0.2, 0.2],
+                            specs=[[{}], [{}], [{'secondary_y': True}]])
+
+    # Add price chart with Bloomberg-style colors
+    if chart_type == "Candlestick":
+        rule = candle_rule(price_data, max_candles) if webgl else None
+        candles = aggregate_ohlc(price_data, rule) if rule else price_data
+        fig.add_trace(
+            go.Candlestick(
+                x=candles.index,
+                open=candles['Open'],
+                high=candles['High'],
+                low=candles['Low'],
+                close=candles['Close'],
+                name="Price" if rule is None else f"Price ({'Monthly' if rule == 'M' else 'Weekly'})",
+                increasing_line_color=UP,
+                decreasing_line_color=DOWN
+            ),
+            row=1, col=1
+        )
+    else:
+        close = line(price_data['Close'])
+        fig.add_trace(
+            line_trace(
+                x=close.index,
+                y=close,
+                name="Price",
+                line=dict(color=UP)
+            ),
+            row=1, col=1
+        )
+
+    # Add 50-day moving average
+    moving_average = line(price_trend['MA'])
+    fig.add_trace(
+        line_trace(
+            x=moving_average.index,
+            y=moving_average,
+            name="50-day MA",
+            line=dict(color=MOVING_AVERAGE, dash='dash')
+        ),
+        row=1, col=1
+    )
+
+    # Add Open Interest, held flat between weekly reports
+    open_interest = line(oi_weekly['Open_Interest'])
+    fig.add_trace(
+        line_trace(
+            x=open_interest.index,
+            y=open_interest,
+            name="Open Interest",
+            line=dict(color=OPEN_INTEREST, shape='hv')
+        ),
+        row=2, col=1
+    )
+
+    # COT index (0-100) and z-score of the net position, one point per report
+    if cot_stats is not None:
+        for column, name, color, secondary_y in [('COT_Index', f"{cot_label} COT Index", COT_INDEX, False),
+                                                 ('Z_Score', f"{cot_label} Z-Score", Z_SCORE, True)]:
+            values = line(cot_stats[column])
+            fig.add_trace(
+                line_trace(
+                    x=values.index,
+                    y=values,
+                    name=name,
+                    line=dict(color=color, shape='hv', dash='dot' if secondary_y else None)
+                ),
+                row=3, col=1, secondary_y=secondary_y
+            )
+        fig.update_yaxes(title_text="COT Index", range=[0, 100], row=3, col=1, secondary_y=False)
+        fig.update_yaxes(title_text="Z-Score", row=3, col=1, secondary_y=True)
+
+    # Update layout with Bloomberg-style colors
+    fig.update_layout(
+        template="plotly_dark",
+        paper_bgcolor=BACKGROUND,
+        plot_bgcolor=BACKGROUND,
+        title=dict(
+            text=f"{commodity} Analysis",
+            font=dict(color=TEXT)
+        ),
+        xaxis_title="Date",
+        yaxis_title="Price",
+        yaxis2_title="Open Interest",
+        height=800,
+        showlegend=True,
+        xaxis_rangeslider_visible=False,
+        font=dict(color=TEXT)
+    )
+    return fig
@@ -0,0 +1,177 @@
+"""Process-wide loader cache shared by every app session.
+
+st.cache_data hands each caller its own unpickled copy of a cached frame, so
+every session holding the COT history or a price series pays for it again,
+and its cache is bounded by entry count rather than memory. DataService keeps
+one instance of each loaded result for the whole process: concurrent misses
+of a key are coalesced into a single load whose result every waiting session
+receives, later callers get that same object, and the least recently used
+entries are evicted once the results held exceed a memory budget.
+
+Results are shared, not copied, so callers must treat them as read-only.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from commodity_charter.metrics import count_cache, payload_bytes, record_size, register_cache, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_MB = 1024
+
+
+class _Entry:
+    __slots__ = ('value', 'nbytes', 'expires')
+
+    def __init__(self, value, nbytes, expires):
+        self.value = value
+        self.nbytes = nbytes
+        self.expires = expires
+
+
+class _Flight:
+    """A load in progress that other callers of the same key wait for"""
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class DataService:
+    """Shared, single-flight results kept under a memory budget with LRU eviction"""
+
+    def __init__(self, budget_bytes=None, clock=time.monotonic):
+        if budget_bytes is None:
+            budget_bytes = int(float(os.environ.get('DATA_SERVICE_MB', DEFAULT_BUDGET_MB)) * 2 ** 20)
+        self.budget_bytes = budget_bytes
+        self.clock = clock
+        # hits include callers that waited for another caller's load (coalesced)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.resident_bytes = 0
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, load, ttl=None):
+        """Shared result for key, calling load() once however many callers miss at the same time.
+
+        ttl is in seconds. A failed load raises in every waiting caller and
+        is not cached, so the next call retries.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.expires is None or entry.expires > self.clock()):
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = load()
+            self._store(key, flight.value, ttl)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _store(self, key, value, ttl):
+        nbytes = payload_bytes(value) or 0
+        expires = None if ttl is None else self.clock() + ttl
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.resident_bytes -= previous.nbytes
+            if nbytes > self.budget_bytes:
+                # Served to the callers that asked for it, but never held
+                logger.warning("%r is %.0f MB, over the whole data service budget; not cached",
+                               key, nbytes / 2 ** 20)
+            else:
+                self._entries[key] = _Entry(value, nbytes, expires)
+                self.resident_bytes += nbytes
+                while self.resident_bytes > self.budget_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.resident_bytes -= evicted.nbytes
+                    self.evictions += 1
+            resident = self.resident_bytes
+        record_size('data_service_resident', resident)
+
+    def cached(self, name, ttl=None):
+        """Decorator serving a loader through the service, keyed on name and its (hashable) arguments.
+
+        Like metrics.instrument_cache, calls are counted as hits or misses
+        under name and loads are timed and sized.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                loaded = []
+
+                def load():
+                    loaded.append(True)
+                    with span(name):
+                        result = fn(*args, **kwargs)
+                    record_size(name, payload_bytes(result))
+                    return result
+
+                try:
+                    return self.get((name, args, tuple(sorted(kwargs.items()))), load, ttl)
+                finally:
+                    count_cache(name, hit=not loaded)
+
+            wrapper.clear = functools.partial(self.clear, name)
+            return wrapper
+        return decorator
+
+    def clear(self, name=None):
+        """Drop every entry, or only those of one cached loader"""
+        with self._lock:
+            keys = [key for key in self._entries
+                    if name is None or (isinstance(key, tuple) and key[0] == name)]
+            for key in keys:
+                self.resident_bytes -= self._entries.pop(key).nbytes
+
+
+_default_service = None
+_default_service_lock = threading.Lock()
+
+
+def default_data_service():
+    """Process-wide data service, created on first use"""
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            _default_service = DataService()
+            register_cache('data_service', _default_service)
+        return _default_service
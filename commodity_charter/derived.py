@@ -0,0 +1,49 @@
+"""Precomputed tables (screener, signal history) shared between worker and UI."""
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+DEFAULT_DERIVED_DIR = os.path.join('data', 'derived')
+VERSIONS_FILE = '_versions.json'
+
+
+class DerivedStore:
+    """Named Parquet tables, each tagged with the COT data version it was built from"""
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get('DERIVED_DIR', DEFAULT_DERIVED_DIR)
+
+    def _path(self, name):
+        return os.path.join(self.root, f'{name}.parquet')
+
+    def versions(self):
+        try:
+            with open(os.path.join(self.root, VERSIONS_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write(self, name, df, version):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.parquet', dir=self.root)
+        os.close(fd)
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, self._path(name))
+
+        versions = self.versions()
+        versions[name] = str(version)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(versions, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.root, VERSIONS_FILE))
+
+    def read(self, name, version=None):
+        """The stored table, or None if missing or built from another data version"""
+        if version is not None and self.versions().get(name) != str(version):
+            return None
+        try:
+            return pd.read_parquet(self._path(name))
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,82 @@
+"""Backfill and incremental refresh of the COT store from the yearly CFTC archives."""
+import logging
+import os
+
+from commodity_charter.archives import ArchiveFetchError, fetch_cot_archive
+from commodity_charter.cftc import FIRST_YEARLY_ARCHIVE, HISTORY_ARCHIVE
+from commodity_charter.store import latest_published_report
+
+logger = logging.getLogger(__name__)
+
+# First report year backfilled; years before cftc.FIRST_YEARLY_ARCHIVE come
+# from the combined history archive
+FIRST_ARCHIVE_YEAR = int(os.environ.get('COT_FIRST_YEAR', 2010))
+
+
+def ingest_cot_history(store, fetch_archive=fetch_cot_archive,
+                       first_year=FIRST_ARCHIVE_YEAR, now=None):
+    """Bring the store up to date with the CFTC archives.
+
+    Years missing from the store are backfilled one archive at a time, so only
+    a single year is ever held in memory. For the year already in the store,
+    only report weeks newer than the latest stored report are appended; an
+    empty frame from fetch_archive (an unchanged archive) adds nothing.
+
+    Years before FIRST_YEARLY_ARCHIVE are only published inside the
+    combined history archive, which is fetched once for all of them.
+
+    An archive that can't be fetched is logged and skipped, and the missing
+    backfill years are retried on the next refresh. Only a failure of the
+    current year is raised, after the other years were stored.
+    Returns the number of report rows added.
+    """
+    last_year = latest_published_report(now).year
+    stored_years = set(store.years())
+    latest_report = store.latest_report()
+    added = 0
+    current_error = None
+
+    history_years = [year for year in range(first_year, min(FIRST_YEARLY_ARCHIVE, last_year + 1))
+                     if year not in stored_years]
+    if history_years:
+        try:
+            history_df = fetch_archive(HISTORY_ARCHIVE)
+        except OSError as e:
+            logger.warning("Skipping the %s COT archive: %s", HISTORY_ARCHIVE, e)
+        else:
+            if not history_df.empty:
+                history_df = history_df[history_df['Date'].dt.year.isin(history_years)]
+                store.write(history_df, now)
+                added += len(history_df)
+            del history_df
+
+    for year in range(max(first_year, FIRST_YEARLY_ARCHIVE), last_year + 1):
+        if year in stored_years and (latest_report is None or year < latest_report.year):
+            continue
+
+        try:
+            year_df = fetch_archive(year)
+        except OSError as e:
+            # ArchiveFetchError and the requests exceptions are OSErrors
+            logger.warning("Skipping the %d COT archive: %s", year, e)
+            if year == last_year:
+                current_error = e
+            continue
+        if year_df.empty:
+            continue
+
+        if year in stored_years:
+            new_weeks = year_df[year_df['Date'] > latest_report]
+            store.append(new_weeks, now)
+            added += len(new_weeks)
+        else:
+            store.write(year_df, now)
+            added += len(year_df)
+
+        # Release the parsed archive before fetching the next one
+        del year_df
+
+    store.mark_checked(now)
+    if current_error is not None:
+        raise ArchiveFetchError(f"could not refresh the {last_year} COT reports: {current_error}") from current_error
+    return added
@@ -0,0 +1,277 @@
+"""Commodity to CFTC market mapping, trader category positions and the pre-built market index."""
+import numpy as np
+import pandas as pd
+
+from commodity_charter.cftc import MARKET_CODE_COLUMN
+
+# Yahoo Finance futures symbols for the charted commodities
+commodity_symbols = {
+    "Crude Oil": "CL=F",
+    "Natural Gas": "NG=F",
+    "Gold": "GC=F",
+    "Silver": "SI=F",
+    "Copper": "HG=F",
+    "Corn": "ZC=F",
+    "Soybeans": "ZS=F",
+    "Wheat": "ZW=F",
+    "Lean Hogs": "HE=F",
+    "Oats": "ZO=F",
+    "Rough Rice": "ZR=F",
+    "Cotton": "CT=F",
+    "Sugar No. 11": "SB=F",
+    "Soybean Meal": "ZM=F",
+    "Coffee": "KC=F",
+    "Cocoa": "CC=F",
+    "Orange Juice": "OJ=F",
+    "Palladium": "PA=F"
+}
+
+# CFTC contract market codes per commodity. Codes are stable while the
+# published market names change (e.g. "CRUDE OIL, LIGHT SWEET" became
+# "WTI-PHYSICAL"), and an exact code match keeps "Gold" from also picking up
+# "MICRO GOLD" and friends.
+commodity_market_codes = {
+    "Crude Oil": ["067651"],      # WTI-PHYSICAL - NYMEX
+    "Natural Gas": ["023651"],    # NAT GAS NYME - NYMEX
+    "Gold": ["088691"],           # GOLD - COMEX
+    "Silver": ["084691"],         # SILVER - COMEX
+    "Copper": ["085692"],         # COPPER- #1 - COMEX
+    "Corn": ["002602"],           # CORN - CBOT
+    "Soybeans": ["005602"],       # SOYBEANS - CBOT
+    "Wheat": ["001602"],          # WHEAT-SRW - CBOT
+    "Lean Hogs": ["054642"],      # LEAN HOGS - CME
+    "Oats": ["004603"],           # OATS - CBOT
+    "Rough Rice": ["039601"],     # ROUGH RICE - CBOT
+    "Cotton": ["033661"],         # COTTON NO. 2 - ICE US
+    "Sugar No. 11": ["080732"],   # SUGAR NO. 11 - ICE US
+    "Soybean Meal": ["026603"],   # SOYBEAN MEAL - CBOT
+    "Coffee": ["083731"],         # COFFEE C - ICE US
+    "Cocoa": ["073732"],          # COCOA - ICE US
+    "Orange Juice": ["040701"],   # FRZN CONCENTRATED ORANGE JUICE - ICE US
+    "Palladium": ["075651"],      # PALLADIUM - NYMEX
+}
+
+# Other names the markets go by in signal files (including the German and
+# misspelt ones in cot_signals.csv); Yahoo symbols are accepted as well
+commodity_aliases = {
+    "Baumwolle": "Cotton",
+    "Sugar N0.11": "Sugar No. 11",
+    "Sugar No.11": "Sugar No. 11",
+    "Sugar": "Sugar No. 11",
+    "Soymeal": "Soybean Meal",
+    "WTI": "Crude Oil",
+}
+
+# Dense market IDs in commodity_symbols order, used to index threshold arrays
+market_ids = {commodity: i for i, commodity in enumerate(commodity_symbols)}
+
+
+def _name_key(name):
+    return ' '.join(str(name).split()).casefold()
+
+
+_canonical_names = {
+    _name_key(name): commodity
+    for commodity, symbol in commodity_symbols.items() for name in (commodity, symbol)
+}
+_canonical_names.update({_name_key(alias): commodity for alias, commodity in commodity_aliases.items()})
+
+
+def canonical_commodity(name):
+    """Canonical commodity for a name, alias or Yahoo symbol (case-insensitive), or None"""
+    return _canonical_names.get(_name_key(name))
+
+
+# Trader categories of the disaggregated report. Column names are the CFTC's
+# (two swap dealer columns have a double underscore); only merchants have
+# reported %-of-OI columns parsed, the other percentages are derived from OI.
+TRADER_CATEGORIES = {
+    'Merchant': {
+        'label': 'Producer/Merchant',
+        'long': 'Prod_Merc_Positions_Long_All', 'short': 'Prod_Merc_Positions_Short_All', 'spread': None,
+        'long_pct': 'Pct_of_OI_Prod_Merc_Long_All', 'short_pct': 'Pct_of_OI_Prod_Merc_Short_All',
+    },
+    'Swap': {
+        'label': 'Swap Dealer',
+        'long': 'Swap_Positions_Long_All', 'short': 'Swap__Positions_Short_All',
+        'spread': 'Swap__Positions_Spread_All',
+    },
+    'Managed_Money': {
+        'label': 'Managed Money',
+        'long': 'M_Money_Positions_Long_All', 'short': 'M_Money_Positions_Short_All',
+        'spread': 'M_Money_Positions_Spread_All',
+    },
+    'Other_Reportable': {
+        'label': 'Other Reportable',
+        'long': 'Other_Rept_Positions_Long_All', 'short': 'Other_Rept_Positions_Short_All',
+        'spread': 'Other_Rept_Positions_Spread_All',
+    },
+    'Non_Reportable': {
+        'label': 'Non-Reportable',
+        'long': 'NonRept_Positions_Long_All', 'short': 'NonRept_Positions_Short_All', 'spread': None,
+    },
+}
+
+# Other spellings accepted for categories in signal files
+category_aliases = {
+    'Producer/Merchant': 'Merchant',
+    'Prod_Merc': 'Merchant',
+    'Swap Dealer': 'Swap',
+    'M_Money': 'Managed_Money',
+    'Other_Rept': 'Other_Reportable',
+    'NonRept': 'Non_Reportable',
+}
+
+# Reports a COT index and z-score compare the current net position against
+# (three years), and the fewest they need before they are reported
+COT_INDEX_WEEKS = 156
+COT_INDEX_MIN_WEEKS = 52
+
+
+def _category_key(name):
+    return ''.join(ch for ch in str(name).casefold() if ch.isalnum())
+
+
+_canonical_categories = {_category_key(category): category for category in TRADER_CATEGORIES}
+_canonical_categories.update({_category_key(info['label']): category for category, info in TRADER_CATEGORIES.items()})
+_canonical_categories.update({_category_key(alias): category for alias, category in category_aliases.items()})
+
+
+def canonical_category(name):
+    """Trader category for a name such as 'Managed Money' or 'm_money', or None"""
+    return _canonical_categories.get(_category_key(name))
+
+
+def category_positions(cot_data, market_codes=commodity_market_codes, window=COT_INDEX_WEEKS):
+    """Positions of every trader category for every mapped market, sorted by commodity and date.
+
+    Per category: long, short and spread contracts, long/short % of open
+    interest, net position (long - short), its week-over-week change and,
+    unless window is None, its COT index: the percentile rank (0-100) of the
+    net position among the market's last `window` reports, i.e. the share of
+    those reports with a net position at or below the current one, and its
+    z-score against the mean and standard deviation of the same reports.
+    rolling.RollingStats extends the table a week at a time with the same
+    statistics.
+    """
+    code_to_commodity = {code: commodity for commodity, codes in market_codes.items() for code in codes}
+    if cot_data.empty:
+        return pd.DataFrame()
+    # Categorical codes map once per category rather than once per row
+    commodity = cot_data[MARKET_CODE_COLUMN].map(code_to_commodity).astype(object)
+    mapped = commodity.notna().to_numpy()
+    reports = cot_data[mapped]
+    order = np.lexsort((reports['Date'].to_numpy(), commodity[mapped].to_numpy().astype(str)))
+    reports = reports.iloc[order]
+
+    open_interest = reports['Open_Interest_All'].to_numpy(dtype=float)
+    columns = {
+        'Commodity': commodity[mapped].to_numpy()[order],
+        'Date': reports['Date'].to_numpy(),
+        'Open_Interest': open_interest,
+    }
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for category, info in TRADER_CATEGORIES.items():
+            long = reports[info['long']].to_numpy(dtype=float)
+            short = reports[info['short']].to_numpy(dtype=float)
+            columns[f'{category}_Long'] = long
+            columns[f'{category}_Short'] = short
+            if info['spread']:
+                columns[f'{category}_Spread'] = reports[info['spread']].to_numpy(dtype=float)
+            columns[f'{category}_Long_Pct'] = (
+                reports[info['long_pct']].to_numpy(dtype=float) if 'long_pct' in info else long / open_interest * 100
+            )
+            columns[f'{category}_Short_Pct'] = (
+                reports[info['short_pct']].to_numpy(dtype=float) if 'short_pct' in info else short / open_interest * 100
+            )
+            columns[f'{category}_Net'] = long - short
+    positions = pd.DataFrame(columns)
+
+    # Differences and rolling ranks never cross from one market into the next
+    net_columns = [f'{category}_Net' for category in TRADER_CATEGORIES]
+    first_report = positions['Commodity'].ne(positions['Commodity'].shift()).to_numpy()
+    changes = positions[net_columns].diff().to_numpy()
+    changes[first_report] = np.nan
+    for category, change in zip(TRADER_CATEGORIES, changes.T):
+        positions[f'{category}_Net_Change'] = change
+
+    if window is not None:
+        rolling = positions.groupby('Commodity', sort=False)[net_columns].rolling(
+            window, min_periods=min(window, COT_INDEX_MIN_WEEKS)
+        )
+        ranks = rolling.rank(method='max', pct=True).droplevel(0).reindex(positions.index)
+        means = rolling.mean().droplevel(0).reindex(positions.index)
+        stds = rolling.std().droplevel(0).reindex(positions.index)
+        for category, column in zip(TRADER_CATEGORIES, net_columns):
+            positions[f'{category}_COT_Index'] = ranks[column].to_numpy() * 100
+            std = stds[column].to_numpy()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                positions[f'{category}_Z_Score'] = np.where(
+                    std > 0, (positions[column].to_numpy() - means[column].to_numpy()) / std, np.nan
+                )
+    return positions
+
+
+def merchant_positions_frame(commodity_data):
+    """Producer/merchant positions and open interest for one market's reports"""
+    if commodity_data.empty:
+        return pd.DataFrame()
+
+    result_df = pd.DataFrame({
+        'Date': commodity_data['Date'],
+        'Merchant_Long': commodity_data['Prod_Merc_Positions_Long_All'],
+        'Merchant_Short': commodity_data['Prod_Merc_Positions_Short_All'],
+        'Merchant_Long_Pct': commodity_data['Pct_of_OI_Prod_Merc_Long_All'],
+        'Merchant_Short_Pct': commodity_data['Pct_of_OI_Prod_Merc_Short_All'],
+        'Open_Interest': commodity_data['Open_Interest_All']
+    })
+    return result_df.sort_values('Date').reset_index(drop=True)
+
+
+def get_merchant_positions(cot_data, commodity):
+    """Merchant positions for one commodity, matched exactly on its market codes"""
+    codes = commodity_market_codes.get(commodity, [])
+    commodity_data = cot_data[cot_data[MARKET_CODE_COLUMN].isin(codes)]
+    return merchant_positions_frame(commodity_data)
+
+
+# Leading columns of MarketIndex.positions, as merchant_positions_frame returns them
+MERCHANT_COLUMNS = ['Date', 'Merchant_Long', 'Merchant_Short', 'Merchant_Long_Pct', 'Merchant_Short_Pct',
+                    'Open_Interest']
+
+
+class MarketIndex:
+    """Date-sorted trader category position frames per commodity, built once per COT load.
+
+    Frames start with the merchant columns of merchant_positions_frame,
+    followed by every other category_positions column. Pass positions (e.g.
+    COTStore.category_positions()) to reuse an already computed table.
+    """
+
+    def __init__(self, cot_data, market_codes=commodity_market_codes, positions=None):
+        self.market_codes = market_codes
+        self._frames = {}
+        if positions is None:
+            positions = category_positions(cot_data, market_codes)
+        if positions.empty:
+            return
+
+        columns = MERCHANT_COLUMNS + [column for column in positions.columns
+                                      if column not in MERCHANT_COLUMNS and column != 'Commodity']
+        # The table is sorted by commodity, so each market is one contiguous slice
+        for commodity, rows in positions.groupby('Commodity', sort=False).indices.items():
+            self._frames[commodity] = positions.iloc[rows][columns].reset_index(drop=True)
+
+    def __contains__(self, commodity):
+        return commodity in self._frames
+
+    def commodities(self):
+        return list(self._frames)
+
+    def positions(self, commodity):
+        """Category positions for a commodity, or an empty frame if it has no reports"""
+        return self._frames.get(commodity, pd.DataFrame())
+
+    def memory_usage(self, deep=True):
+        """Bytes held by all frames, so caches can size the index like a frame"""
+        return int(sum(frame.memory_usage(deep=deep).sum() for frame in self._frames.values()))
@@ -0,0 +1,206 @@
+"""Process-wide timing spans, cache counters and payload sizes.
+
+Loaders and analysis functions record how long each call took, cached
+functions count hits and misses, and serialized payloads record their size.
+The app shows a snapshot in its sidebar debug panel and the JSON API serves
+the same numbers in the Prometheus text format at /metrics.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = 'commodity_charter'
+
+
+def payload_bytes(value):
+    """Approximate size of a result: frames by deep memory usage, strings by length"""
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        sizes = [payload_bytes(item) for item in value]
+        return sum(size for size in sizes if size is not None) if any(s is not None for s in sizes) else None
+    return None
+
+
+def _label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _sample(value):
+    # Counters and byte sizes stay exact; floats keep every significant digit
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+class Metrics:
+    """Thread-safe registry of stage timings, cache counters and payload sizes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._caches = {}
+        self._cache_sources = {}
+        self._payloads = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            span = self._spans.setdefault(stage, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            span['calls'] += 1
+            span['seconds'] += seconds
+            span['max_seconds'] = max(span['max_seconds'], seconds)
+            span['last_seconds'] = seconds
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block under stage, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage=None):
+        """Decorator recording every call of a function as a span (named after it by default)"""
+        def decorator(fn):
+            name = stage or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count_cache(self, cache, hit):
+        with self._lock:
+            counts = self._caches.setdefault(cache, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def register_cache(self, cache, source):
+        """Export the hits/misses attributes of an existing cache such as an LRUCache"""
+        with self._lock:
+            self._cache_sources[cache] = source
+
+    def instrument_cache(self, cache, cache_decorator):
+        """Wrap a function in cache_decorator, counting hits and misses and timing the misses.
+
+        The inner function only runs when cache_decorator misses, so every
+        call that doesn't reach it is a hit. functools.wraps keeps the
+        original name, signature and source visible to the decorator, which
+        is what st.cache_data keys its cache on.
+        """
+        def decorator(fn):
+            local = threading.local()
+
+            @functools.wraps(fn)
+            def compute(*args, **kwargs):
+                local.missed = True
+                with self.span(cache):
+                    result = fn(*args, **kwargs)
+                self.record_size(cache, payload_bytes(result))
+                return result
+
+            cached = cache_decorator(compute)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                local.missed = False
+                try:
+                    return cached(*args, **kwargs)
+                finally:
+                    self.count_cache(cache, hit=not local.missed)
+
+            wrapper.clear = getattr(cached, 'clear', None)
+            return wrapper
+        return decorator
+
+    def record_size(self, payload, nbytes):
+        if nbytes is None:
+            return
+        with self._lock:
+            self._payloads[payload] = {'bytes': int(nbytes), 'max_bytes': max(
+                int(nbytes), self._payloads.get(payload, {}).get('max_bytes', 0)
+            )}
+
+    def reset(self):
+        """Clear recorded spans, counters and sizes; caches added with register_cache stay registered"""
+        with self._lock:
+            self._spans.clear()
+            self._caches.clear()
+            self._payloads.clear()
+
+    def snapshot(self):
+        """Rows of span, cache and payload statistics, for tables or JSON"""
+        with self._lock:
+            spans = [
+                {'Stage': stage, 'Calls': span['calls'], 'Total_s': span['seconds'],
+                 'Mean_ms': span['seconds'] / span['calls'] * 1000, 'Max_ms': span['max_seconds'] * 1000,
+                 'Last_ms': span['last_seconds'] * 1000}
+                for stage, span in sorted(self._spans.items())
+            ]
+            counts = {cache: dict(counts) for cache, counts in self._caches.items()}
+            for cache, source in self._cache_sources.items():
+                counts[cache] = {'hits': source.hits, 'misses': source.misses}
+            payloads = [
+                {'Payload': payload, 'Bytes': sizes['bytes'], 'Max_Bytes': sizes['max_bytes']}
+                for payload, sizes in sorted(self._payloads.items())
+            ]
+        caches = []
+        for cache, counts in sorted(counts.items()):
+            total = counts['hits'] + counts['misses']
+            caches.append({'Cache': cache, 'Hits': counts['hits'], 'Misses': counts['misses'],
+                           'Hit_Rate': counts['hits'] / total * 100 if total else None})
+        return {'spans': spans, 'caches': caches, 'payloads': payloads}
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+                lines.append(f'{PREFIX}_{name}{suffix}{{{label_text}}} {_sample(value)}')
+
+        family('stage_seconds', 'summary', 'Time spent in instrumented loaders and analysis stages', [
+            sample for span in snapshot['spans'] for sample in (
+                ('_sum', {'stage': span['Stage']}, span['Total_s']),
+                ('_count', {'stage': span['Stage']}, span['Calls']),
+            )
+        ])
+        family('stage_seconds_max', 'gauge', 'Slowest call of each stage since start', [
+            ('', {'stage': span['Stage']}, span['Max_ms'] / 1000) for span in snapshot['spans']
+        ])
+        family('cache_requests_total', 'counter', 'Cache lookups by result', [
+            sample for cache in snapshot['caches'] for sample in (
+                ('', {'cache': cache['Cache'], 'result': 'hit'}, cache['Hits']),
+                ('', {'cache': cache['Cache'], 'result': 'miss'}, cache['Misses']),
+            )
+        ])
+        family('payload_bytes', 'gauge', 'Size of the most recent payload', [
+            ('', {'payload': payload['Payload']}, payload['Bytes']) for payload in snapshot['payloads']
+        ])
+        family('payload_bytes_max', 'gauge', 'Largest payload since start', [
+            ('', {'payload': payload['Payload']}, payload['Max_Bytes']) for payload in snapshot['payloads']
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+# The registry shared by the whole process
+METRICS = Metrics()
+
+span = METRICS.span
+timed = METRICS.timed
+count_cache = METRICS.count_cache
+register_cache = METRICS.register_cache
+instrument_cache = METRICS.instrument_cache
+record_size = METRICS.record_size
+snapshot = METRICS.snapshot
+prometheus_text = METRICS.prometheus_text
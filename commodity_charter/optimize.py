@@ -0,0 +1,149 @@
+"""Offline search for per-commodity signal ranges across worker processes.
+
+The weekly positioning and forward-return panel is written once as .npy files
+and every worker maps it read-only, so tasks only carry a commodity column
+and a slice of the threshold grid. Each commodity's best combination is
+written out in the cot_signals.csv format with its backtest scores.
+
+    python -m commodity_charter.optimize --years 15 --workers 8 --output cot_signals.candidate.csv
+"""
+import argparse
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from commodity_charter.backtest import (
+    GRID_CHUNK, HORIZON_WEEKS, METRIC_COLUMNS, aligned_panel, score_directions, signal_directions,
+    threshold_grid
+)
+from commodity_charter.markets import TRADER_CATEGORIES, commodity_symbols
+from commodity_charter.prices import default_price_cache
+from commodity_charter.screener import commodity_closes
+from commodity_charter.signals import BOUND_COLUMNS, DEFAULT_CATEGORY
+from commodity_charter.store import COTStore
+
+SHARED_ARRAYS = ['short_pct', 'long_pct', 'returns', 'grid']
+OBJECTIVES = ['Hit_Rate', 'Avg_Return']
+# Fewer signals than this over the whole history is treated as noise
+MIN_SIGNALS = 10
+
+# Read-only views onto the shared panel, opened once per worker process
+_shared = {}
+
+
+def default_grid(step=5):
+    """Every min/max pair on a step-percent lattice for both ranges"""
+    lower = np.arange(0, 100, step)
+    upper = np.arange(step, 100 + step, step)
+    return threshold_grid(lower, upper, lower, upper)
+
+
+def _open_shared(directory):
+    for name in SHARED_ARRAYS:
+        _shared[name] = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+
+
+def _score_task(task):
+    column, start, stop = task
+    short_pct = _shared['short_pct'][:, column:column + 1]
+    long_pct = _shared['long_pct'][:, column:column + 1]
+    returns = _shared['returns'][:, column:column + 1]
+    bounds = _shared['grid'][start:stop, None, :]
+    metrics = score_directions(signal_directions(short_pct, long_pct, bounds), returns)
+    return column, start, {name: values[:, 0] for name, values in metrics.items()}
+
+
+def _tasks(commodities, combos, chunk_size):
+    return [(column, start, min(start + chunk_size, combos))
+            for column in range(commodities) for start in range(0, combos, chunk_size)]
+
+
+def _collect(results, metrics):
+    for column, start, chunk in results:
+        for name, values in chunk.items():
+            metrics[name][start:start + len(values), column] = values
+
+
+def optimize_ranges(cot_data, closes, grid=None, horizon=HORIZON_WEEKS, freq='W', workers=None,
+                    objective='Hit_Rate', min_signals=MIN_SIGNALS, chunk_size=GRID_CHUNK, category=DEFAULT_CATEGORY):
+    """Best grid combination per commodity for one trader category, scored by objective over at least min_signals signals"""
+    grid = default_grid() if grid is None else grid
+    grid = grid[BOUND_COLUMNS].to_numpy(dtype=float) if isinstance(grid, pd.DataFrame) else np.asarray(grid, float)
+    commodities, short_pct, long_pct, returns = aligned_panel(cot_data, closes, horizon, freq, categories=category)
+    metrics = {name: np.full((len(grid), len(commodities)), np.nan) for name in METRIC_COLUMNS}
+    tasks = _tasks(len(commodities), len(grid), chunk_size)
+
+    with tempfile.TemporaryDirectory(prefix='cot-optimize-') as directory:
+        for name, values in zip(SHARED_ARRAYS, [short_pct, long_pct, returns, grid]):
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(values))
+
+        if workers == 1:
+            _open_shared(directory)
+            _collect(map(_score_task, tasks), metrics)
+            _shared.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_open_shared,
+                                     initargs=(directory,)) as pool:
+                _collect(pool.map(_score_task, tasks), metrics)
+
+    rows = []
+    for column, commodity in enumerate(commodities):
+        scores = pd.DataFrame({name: values[:, column] for name, values in metrics.items()})
+        scores = scores[scores['Signals'] >= min_signals]
+        if scores.empty:
+            continue
+        best = scores.sort_values([objective, 'Signals'], ascending=False, kind='stable').index[0]
+        rows.append({'Commodity': commodity,
+                     'Category': category,
+                     **dict(zip(BOUND_COLUMNS, grid[best])),
+                     **scores.loc[best].to_dict()})
+    return pd.DataFrame(rows, columns=['Commodity', 'Category'] + BOUND_COLUMNS + METRIC_COLUMNS)
+
+
+def format_signal_ranges(optimized):
+    """Optimiser results in the cot_signals.csv layout, scores kept as extra columns"""
+    def span(low, high):
+        return f'{low:g}-{high:g}'
+
+    return pd.DataFrame({
+        'Commodity': optimized['Commodity'],
+        'Category': optimized['Category'],
+        'Bearish_Range': [span(*bounds) for bounds in optimized[['Bearish_Min', 'Bearish_Max']].to_numpy()],
+        'Bullish_Range': [span(*bounds) for bounds in optimized[['Bullish_Min', 'Bullish_Max']].to_numpy()],
+        'Signals': optimized['Signals'].astype(int),
+        'Hit_Rate': optimized['Hit_Rate'].round(1),
+        'Avg_Return': optimized['Avg_Return'].round(2),
+        'Max_Drawdown': optimized['Max_Drawdown'].round(2),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search COT signal ranges per commodity")
+    parser.add_argument('--years', type=int, default=15, help='years of history to optimise over')
+    parser.add_argument('--horizon', type=int, default=HORIZON_WEEKS, help='holding period in weeks')
+    parser.add_argument('--step', type=float, default=5, help='grid spacing in percent of open interest')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--objective', choices=OBJECTIVES, default='Hit_Rate')
+    parser.add_argument('--min-signals', type=int, default=MIN_SIGNALS)
+    parser.add_argument('--category', choices=list(TRADER_CATEGORIES), default=DEFAULT_CATEGORY,
+                        help='trader category whose positioning the ranges apply to')
+    parser.add_argument('--output', default='cot_signals.candidate.csv', help='candidate signal range file')
+    args = parser.parse_args(argv)
+
+    end = pd.Timestamp.now(tz='America/New_York')
+    start = end - pd.DateOffset(years=args.years)
+    cot_data = COTStore().read(years=range(start.year, end.year + 1))
+    symbol_prices = default_price_cache().get_many(list(commodity_symbols.values()), start, end)
+
+    optimized = optimize_ranges(cot_data, commodity_closes(symbol_prices), default_grid(args.step),
+                                horizon=args.horizon, workers=args.workers, objective=args.objective,
+                                min_signals=args.min_signals, category=args.category)
+    format_signal_ranges(optimized).to_csv(args.output, index=False)
+    print(f"Wrote {len(optimized)} commodities to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""Local OHLCV cache that only asks the price provider for missing trading days.
+
+Bars are persisted per symbol as Parquet together with the calendar ranges
+already requested, so weekends and holidays are not mistaken for gaps. The
+current (still trading) day is refetched at most once per refresh interval.
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+
+from commodity_charter.analysis import MARKET_TZ, to_market_tz
+from commodity_charter.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join('data', 'price_cache')
+COVERAGE_FILE = '_coverage.json'
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class YahooProvider:
+    """Batched Yahoo Finance downloads through yfinance"""
+
+    @timed('yahoo_fetch')
+    def fetch(self, symbols, start, end, interval='1d'):
+        import yfinance as yf
+
+        df = yf.download(list(symbols), start=start, end=end, interval=interval,
+                         group_by='ticker', progress=False, threads=True)
+        if df.empty:
+            return {}
+        if not isinstance(df.columns, pd.MultiIndex):
+            return {symbols[0]: df}
+        return {
+            symbol: df[symbol].dropna(how='all')
+            for symbol in symbols if symbol in df.columns.get_level_values(0)
+        }
+
+
+def _market_time(value):
+    value = pd.Timestamp(value)
+    return value.tz_localize(MARKET_TZ) if value.tzinfo is None else value.tz_convert(MARKET_TZ)
+
+
+def _day(value):
+    """Calendar day in exchange time as a naive midnight Timestamp"""
+    return _market_time(value).tz_localize(None).normalize()
+
+
+def _file_version(path):
+    """(mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def missing_ranges(covered, start, end):
+    """Sub-ranges of [start, end) not inside any of the covered [start, end) ranges"""
+    gaps = []
+    cursor = start
+    for range_start, range_end in sorted(covered):
+        if range_end <= cursor:
+            continue
+        if range_start >= end:
+            break
+        if range_start > cursor:
+            gaps.append((cursor, range_start))
+        cursor = max(cursor, range_end)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def merge_ranges(ranges):
+    merged = []
+    for range_start, range_end in sorted(ranges):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+        else:
+            merged.append((range_start, range_end))
+    return merged
+
+
+class PriceCache:
+    """Per-symbol OHLCV bars keyed by trading day, filled from a pluggable provider"""
+
+    def __init__(self, root=None, provider=None, interval='1d',
+                 refresh_interval=timedelta(minutes=15), max_workers=4):
+        self.root = root or os.environ.get('PRICE_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.provider = provider or YahooProvider()
+        self.interval = interval
+        self.refresh_interval = refresh_interval
+        self.max_workers = max_workers
+        self._lock = threading.RLock()
+        # symbol -> (parquet file version, bars); the worker, app and API share root
+        self._frames = {}
+        # (symbol, gap) -> Event set once the caller fetching it has stored the result
+        self._fetching = {}
+
+    def _path(self, symbol):
+        safe = re.sub(r'[^A-Za-z0-9_.-]', '_', symbol)
+        return os.path.join(self.root, f'{safe}_{self.interval}.parquet')
+
+    @property
+    def _coverage_path(self):
+        return os.path.join(self.root, f'{self.interval}{COVERAGE_FILE}')
+
+    def _load_coverage(self):
+        try:
+            with open(self._coverage_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_coverage(self, coverage):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(coverage, f, indent=2)
+        os.replace(tmp_path, self._coverage_path)
+
+    def _load_frame(self, symbol):
+        """Bars of symbol, re-read when another process has rewritten its file"""
+        path = self._path(symbol)
+        version = _file_version(path)
+        cached = self._frames.get(symbol)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        try:
+            frame = pd.read_parquet(path)
+        except (OSError, ValueError):
+            frame = pd.DataFrame(columns=PRICE_COLUMNS, index=pd.DatetimeIndex([], tz=MARKET_TZ))
+        self._frames[symbol] = (version, frame)
+        return frame
+
+    def _store_frame(self, symbol, bars):
+        existing = self._load_frame(symbol)
+        bars = bars[[column for column in PRICE_COLUMNS if column in bars]].copy()
+        bars.index = to_market_tz(bars.index)
+        combined = pd.concat([existing, bars]) if not existing.empty else bars
+        combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.parquet', dir=self.root)
+        os.close(fd)
+        combined.to_parquet(tmp_path)
+        os.replace(tmp_path, self._path(symbol))
+        self._frames[symbol] = (_file_version(self._path(symbol)), combined)
+
+    def _gaps(self, entry, start, end, now):
+        today = _day(now)
+        covered = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in entry.get('ranges', [])]
+
+        # The live day counts as covered for refresh_interval after a fetch
+        live_checked = entry.get('live_checked')
+        if live_checked and now - pd.Timestamp(live_checked) < self.refresh_interval:
+            covered.append((today, today + pd.Timedelta(days=1)))
+        return missing_ranges(covered, start, end)
+
+    def get_many(self, symbols, start, end, now=None):
+        """Bars in [start, end) for each symbol, fetching only the uncovered days"""
+        lower, upper = _market_time(start), _market_time(end)
+        start, end = _day(start), _day(end)
+        if upper > end.tz_localize(MARKET_TZ):
+            end += pd.Timedelta(days=1)
+        now = pd.Timestamp.now(tz=MARKET_TZ) if now is None else _market_time(now)
+        today = _day(now)
+        # Nothing to fetch beyond the current trading day
+        end = min(end, today + pd.Timedelta(days=1))
+
+        # The lock only guards the coverage file and frames; downloads run
+        # without it so unrelated symbols and sessions do not queue behind them
+        with self._lock:
+            coverage = self._load_coverage()
+
+            # Symbols missing the same days share one batched provider request;
+            # a gap another caller is already fetching is waited for instead
+            batches, owned, pending = {}, [], []
+            for symbol in symbols:
+                for gap in self._gaps(coverage.get(symbol, {}), start, end, now):
+                    flight = self._fetching.get((symbol, gap))
+                    if flight is not None:
+                        pending.append(flight)
+                        continue
+                    self._fetching[(symbol, gap)] = threading.Event()
+                    owned.append((symbol, gap))
+                    batches.setdefault(gap, []).append(symbol)
+
+        def fetch(item):
+            (gap_start, gap_end), gap_symbols = item
+            return gap_start, gap_end, gap_symbols, self.provider.fetch(
+                gap_symbols, gap_start.date(), gap_end.date(), interval=self.interval
+            )
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(fetch, batches.items()))
+            if results:
+                with self._lock:
+                    self._record(results, today, now)
+        finally:
+            with self._lock:
+                for key in owned:
+                    self._fetching.pop(key).set()
+
+        for flight in pending:
+            flight.wait()
+
+        with self._lock:
+            prices = {}
+            for symbol in symbols:
+                bars = self._load_frame(symbol)
+                prices[symbol] = bars[(bars.index >= lower) & (bars.index < upper)].copy()
+            return prices
+
+    def _record(self, results, today, now):
+        """Store fetched bars and extend coverage; re-reads the coverage other processes may have saved"""
+        coverage = self._load_coverage()
+        for gap_start, gap_end, gap_symbols, fetched in results:
+            # Only completed days are final; today's bar is still moving
+            settled_end = min(gap_end, today)
+            # yfinance reports a failed download as no data rather than an
+            # error, so settled days only count as covered once bars came
+            # back, or when they hold no weekday to trade on
+            settled_weekdays = gap_start < settled_end and len(
+                pd.bdate_range(gap_start, settled_end - pd.Timedelta(days=1))) > 0
+            for symbol in gap_symbols:
+                received = symbol in fetched and not fetched[symbol].empty
+                if received:
+                    self._store_frame(symbol, fetched[symbol])
+
+                entry = coverage.setdefault(symbol, {})
+                if received or not settled_weekdays:
+                    ranges = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in entry.get('ranges', [])]
+                    if gap_start < settled_end:
+                        ranges.append((gap_start, settled_end))
+                    entry['ranges'] = [[s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d')]
+                                       for s, e in merge_ranges(ranges)]
+                else:
+                    logger.warning("No %s bars for %s between %s and %s; they are fetched again next time",
+                                   self.interval, symbol, gap_start.date(), settled_end.date())
+                if gap_end > today:
+                    entry['live_checked'] = now.isoformat()
+        self._save_coverage(coverage)
+
+    def get(self, symbol, start, end, now=None):
+        return self.get_many([symbol], start, end, now=now)[symbol]
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_price_cache():
+    """Process-wide daily price cache, created on first use"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PriceCache()
+        return _default_cache
+
+
+def get_price_data(symbol, start_date, end_date):
+    """Daily bars for one symbol from the shared cache"""
+    return default_price_cache().get(symbol, start_date, end_date)
+
+
+def get_price_data_batch(symbols, start_date, end_date):
+    """Daily bars for many symbols in one batched request"""
+    return default_price_cache().get_many(list(symbols), start_date, end_date)
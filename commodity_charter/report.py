@@ -0,0 +1,123 @@
+"""Headless export of the weekly signal tables and charts for every market.
+
+Reads the local COT store and price cache (only missing trading days are
+fetched), builds the same screener and signal history tables the refresh
+worker derives, and renders each market's chart concurrently.
+
+    python -m commodity_charter.report --output reports/latest --formats csv,parquet,html
+"""
+import argparse
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from commodity_charter.analysis import analyze_trend_changes
+from commodity_charter.charts import build_price_figure
+from commodity_charter.markets import MarketIndex, category_positions, commodity_symbols
+from commodity_charter.prices import default_price_cache
+from commodity_charter.signals import DEFAULT_SIGNALS_PATH, load_cot_signals
+from commodity_charter.store import COTStore
+from commodity_charter.worker import HISTORY_DAYS, build_derived_tables
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMATS = ['csv', 'parquet', 'html']
+CHART_DIR = 'charts'
+
+
+def _chart_filename(commodity):
+    return re.sub(r'[^A-Za-z0-9]+', '_', commodity).strip('_').lower() + '.html'
+
+
+def write_table(table, output_dir, name, formats):
+    paths = []
+    if 'csv' in formats:
+        paths.append(os.path.join(output_dir, f'{name}.csv'))
+        table.to_csv(paths[-1], index=False)
+    if 'parquet' in formats:
+        paths.append(os.path.join(output_dir, f'{name}.parquet'))
+        table.to_parquet(paths[-1], index=False)
+    return paths
+
+
+def write_chart(commodity, price_data, merchant_positions, output_dir):
+    """Standalone HTML chart for one market; plotly.js is written once next to the charts"""
+    price_trend, oi_weekly = analyze_trend_changes(
+        price_data, merchant_positions['Open_Interest'], merchant_positions['Date']
+    )
+    fig = build_price_figure(price_data, price_trend, oi_weekly, commodity, 'Candlestick')
+    path = os.path.join(output_dir, CHART_DIR, _chart_filename(commodity))
+    fig.write_html(path, include_plotlyjs='directory', full_html=True)
+    return path
+
+
+def write_reports(cot_data, signals_df, price_frames, output_dir, formats=REPORT_FORMATS,
+                  workers=4, now=None, positions=None):
+    """Write the screener, the weekly signal history and per-market charts; returns the paths.
+
+    positions is an already computed category_positions table, e.g. the one
+    cached by COTStore.category_positions(); otherwise it is computed once here.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if positions is None:
+        positions = category_positions(cot_data)
+    tables = build_derived_tables(cot_data, signals_df, price_frames, now=now, positions=positions)
+    paths = []
+    for name, table in tables.items():
+        paths += write_table(table, output_dir, name, formats)
+
+    if 'html' in formats:
+        os.makedirs(os.path.join(output_dir, CHART_DIR), exist_ok=True)
+        market_index = MarketIndex(cot_data, positions=positions)
+        charted = [
+            commodity for commodity in market_index.commodities()
+            if commodity_symbols.get(commodity) in price_frames and not price_frames[commodity_symbols[commodity]].empty
+        ]
+
+        def chart(commodity):
+            return write_chart(commodity, price_frames[commodity_symbols[commodity]],
+                               market_index.positions(commodity), output_dir)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            paths += list(pool.map(chart, charted))
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export weekly COT signals and charts for every market")
+    parser.add_argument('--output', default=os.path.join('reports', pd.Timestamp.now().strftime('%Y-%m-%d')),
+                        help='output directory')
+    parser.add_argument('--formats', default=','.join(REPORT_FORMATS),
+                        help=f"comma-separated subset of {','.join(REPORT_FORMATS)}")
+    parser.add_argument('--workers', type=int, default=4, help='markets charted concurrently')
+    parser.add_argument('--days', type=int, default=HISTORY_DAYS, help='days of price history')
+    parser.add_argument('--signals', default=DEFAULT_SIGNALS_PATH, help='signal range file')
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = set(formats) - set(REPORT_FORMATS)
+    if unknown:
+        parser.error(f"unknown formats: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    started = time.perf_counter()
+    now = pd.Timestamp.now(tz='America/New_York')
+    store = COTStore()
+    cot_data = store.read()
+    positions = store.category_positions()
+    price_frames = default_price_cache().get_many(
+        list(commodity_symbols.values()), now - pd.Timedelta(days=args.days), now, now=now
+    )
+    logger.info("Loaded inputs in %.1fs", time.perf_counter() - started)
+
+    paths = write_reports(cot_data, load_cot_signals(args.signals), price_frames, args.output,
+                          formats=formats, workers=args.workers, now=now, positions=positions)
+    logger.info("Wrote %d files to %s in %.1fs", len(paths), args.output, time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Rolling COT index and z-score state, extended one weekly report at a time.
+
+markets.category_positions computes the COT index (percentile rank of the net
+position within its trailing window) and z-score over the whole history.
+When a new weekly report arrives only its row per market is new, so
+RollingStats keeps the last `window` net positions of every market and
+category in a ring buffer together with their running sums. Adding a week
+replaces the oldest slot, adjusts the sums and ranks the new value against
+its own window: the work is per market, independent of the history length.
+
+Net positions are whole contracts, so the sums are kept as exact integers
+and the incremental statistics never drift from a full recompute. The state
+is saved as a single .npz file next to the table it extends.
+"""
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from commodity_charter.markets import COT_INDEX_MIN_WEEKS, COT_INDEX_WEEKS, TRADER_CATEGORIES
+
+STATE_FILE = 'rolling_state.npz'
+
+NET_COLUMNS = [f'{category}_Net' for category in TRADER_CATEGORIES]
+
+# Saved arrays besides the scalar window
+STATE_ARRAYS = ['commodities', 'last_date', 'head', 'buffer', 'valid', 'sums', 'squares', 'last_net']
+
+
+class RollingStats:
+    """Trailing windows of net positions per market and trader category"""
+
+    def __init__(self, window=COT_INDEX_WEEKS):
+        self.window = window
+        self.min_periods = min(window, COT_INDEX_MIN_WEEKS)
+        self.commodities = np.array([], dtype=object)
+        self.last_date = np.array([], dtype='datetime64[ns]')
+        categories = len(TRADER_CATEGORIES)
+        # buffer[market, slot, category]; head is the slot the next report overwrites
+        self.head = np.zeros(0, dtype=np.int64)
+        self.buffer = np.full((0, window, categories), np.nan)
+        self.valid = np.zeros((0, categories), dtype=np.int64)
+        self.sums = np.zeros((0, categories), dtype=np.int64)
+        self.squares = np.zeros((0, categories), dtype=np.int64)
+        self.last_net = np.full((0, categories), np.nan)
+        self._index = {}
+
+    def __len__(self):
+        return len(self.commodities)
+
+    @property
+    def latest(self):
+        """Latest report date the state has seen, or None when empty"""
+        return pd.Timestamp(self.last_date.max()) if len(self) else None
+
+    def _markets(self, commodities):
+        """State rows for commodities, adding empty windows for unseen markets"""
+        new = [commodity for commodity in pd.unique(commodities) if commodity not in self._index]
+        if new:
+            count, categories = len(new), len(TRADER_CATEGORIES)
+            self._index.update({commodity: len(self.commodities) + i for i, commodity in enumerate(new)})
+            self.commodities = np.concatenate([self.commodities, np.array(new, dtype=object)])
+            self.last_date = np.concatenate([self.last_date, np.full(count, np.datetime64('NaT'), 'datetime64[ns]')])
+            self.head = np.concatenate([self.head, np.zeros(count, dtype=np.int64)])
+            self.buffer = np.concatenate([self.buffer, np.full((count, self.window, categories), np.nan)])
+            self.valid = np.concatenate([self.valid, np.zeros((count, categories), dtype=np.int64)])
+            self.sums = np.concatenate([self.sums, np.zeros((count, categories), dtype=np.int64)])
+            self.squares = np.concatenate([self.squares, np.zeros((count, categories), dtype=np.int64)])
+            self.last_net = np.concatenate([self.last_net, np.full((count, categories), np.nan)])
+        return np.array([self._index[commodity] for commodity in commodities], dtype=np.int64)
+
+    def _push(self, rows, net):
+        """Add one report to each market in rows; returns (change, cot_index, z_score)"""
+        slots = self.head[rows]
+        old = self.buffer[rows, slots]
+        old_valid, new_valid = np.isfinite(old), np.isfinite(net)
+        old_int = np.where(old_valid, old, 0).astype(np.int64)
+        new_int = np.where(new_valid, np.rint(np.where(new_valid, net, 0)), 0).astype(np.int64)
+
+        self.valid[rows] += new_valid.astype(np.int64) - old_valid
+        self.sums[rows] += new_int - old_int
+        self.squares[rows] += new_int * new_int - old_int * old_int
+        self.buffer[rows, slots] = net
+        self.head[rows] = (slots + 1) % self.window
+
+        change = net - self.last_net[rows]
+        self.last_net[rows] = net
+
+        # Percentile rank with ties counted at or below, as in rank(method='max', pct=True)
+        count = self.valid[rows]
+        enough = new_valid & (count >= self.min_periods)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            at_or_below = (self.buffer[rows] <= net[:, None, :]).sum(axis=1)
+            cot_index = np.where(enough, at_or_below / count * 100, np.nan)
+
+            # Sample variance from exact integer sums: (n*sum(x^2) - sum(x)^2) / (n*(n-1))
+            sums = self.sums[rows]
+            spread = count * self.squares[rows] - sums * sums
+            std = np.sqrt(spread / (count * (count - 1.0)))
+            z_score = np.where(enough & (spread > 0), (net - sums / count) / std, np.nan)
+        return change, cot_index, z_score
+
+    def extend(self, positions):
+        """Fill Net_Change, COT_Index and Z_Score of new reports from the trailing windows.
+
+        positions holds only reports newer than the state for each market, as
+        markets.category_positions(..., window=None) returns them (sorted by
+        commodity and date). Returns a copy with the three columns per category
+        set, and advances the state past those reports.
+        """
+        positions = positions.copy()
+        if positions.empty:
+            return positions
+
+        rows = self._markets(positions['Commodity'].to_numpy())
+        dates = positions['Date'].to_numpy(dtype='datetime64[ns]')
+        last_date = self.last_date[rows]
+        stale = ~np.isnat(last_date) & (dates <= last_date)
+        if stale.any():
+            raise ValueError(f"{int(stale.sum())} reports are not newer than the rolling state")
+
+        net = positions[NET_COLUMNS].to_numpy(dtype=float)
+        results = {name: np.full(net.shape, np.nan) for name in ('Net_Change', 'COT_Index', 'Z_Score')}
+        # The k-th new report of every market is pushed in one vectorized step
+        step = positions.groupby('Commodity', sort=False).cumcount().to_numpy()
+        for k in range(step.max() + 1):
+            batch = np.flatnonzero(step == k)
+            for name, values in zip(results, self._push(rows[batch], net[batch])):
+                results[name][batch] = values
+            self.last_date[rows[batch]] = dates[batch]
+
+        for name, values in results.items():
+            for category, column in zip(TRADER_CATEGORIES, values.T):
+                positions[f'{category}_{name}'] = column
+        return positions
+
+    @classmethod
+    def from_positions(cls, positions, window=COT_INDEX_WEEKS):
+        """State after the reports of a category_positions table, built from each market's last window rows"""
+        state = cls(window)
+        if positions.empty:
+            return state
+
+        tail = positions.groupby('Commodity', sort=False).tail(window)
+        rows = state._markets(tail['Commodity'].to_numpy())
+        slots = tail.groupby('Commodity', sort=False).cumcount().to_numpy()
+        net = tail[NET_COLUMNS].to_numpy(dtype=float)
+        state.buffer[rows, slots] = net
+
+        filled = np.isfinite(state.buffer)
+        values = np.where(filled, state.buffer, 0).astype(np.int64)
+        state.valid = filled.sum(axis=1)
+        state.sums = values.sum(axis=1)
+        state.squares = (values * values).sum(axis=1)
+        state.head = np.bincount(rows, minlength=len(state)) % window
+
+        last = tail.groupby('Commodity', sort=False).tail(1)
+        last_rows = state._markets(last['Commodity'].to_numpy())
+        state.last_net[last_rows] = last[NET_COLUMNS].to_numpy(dtype=float)
+        state.last_date[last_rows] = last['Date'].to_numpy(dtype='datetime64[ns]')
+        return state
+
+    def save(self, path):
+        """Write the state atomically to an .npz file"""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.npz', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            arrays = {name: getattr(self, name) for name in STATE_ARRAYS}
+            arrays['commodities'] = self.commodities.astype(str)
+            np.savez(f, window=self.window, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Saved state, or None if missing or unreadable"""
+        try:
+            with np.load(path) as saved:
+                state = cls(int(saved['window']))
+                for name in STATE_ARRAYS:
+                    setattr(state, name, saved[name])
+        except (OSError, ValueError, KeyError):
+            return None
+        state.commodities = state.commodities.astype(object)
+        state._index = {commodity: i for i, commodity in enumerate(state.commodities)}
+        return state
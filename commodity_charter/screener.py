@@ -0,0 +1,93 @@
+"""Cross-commodity screener computed from the shared COT frame in one pass."""
+import numpy as np
+import pandas as pd
+
+from commodity_charter.analysis import lookback_cutoff, to_market_tz
+from commodity_charter.markets import COT_INDEX_WEEKS, category_positions, commodity_market_codes, commodity_symbols
+from commodity_charter.metrics import timed
+from commodity_charter.signals import category_percentages, category_statistics, evaluate_signals
+
+SCREENER_COLUMNS = [
+    'Commodity', 'Date', 'Merchant_Long_Pct', 'Merchant_Short_Pct', 'Signal',
+    'Open_Interest', 'OI_Change', 'OI_Change_Pct', 'Hit_Rate'
+]
+
+
+def weekly_closes(price_frames, freq='W'):
+    """Wide frame of period closes, one column per commodity"""
+    closes = {
+        commodity: pd.Series(df['Close'].to_numpy(), index=to_market_tz(df.index)).resample(freq).last()
+        for commodity, df in price_frames.items() if not df.empty
+    }
+    return pd.DataFrame(closes)
+
+
+def commodity_closes(symbol_prices, freq='W', symbols=commodity_symbols):
+    """Period closes per commodity from price frames keyed by ticker symbol"""
+    return weekly_closes({
+        commodity: symbol_prices[symbol]
+        for commodity, symbol in symbols.items() if symbol in symbol_prices
+    }, freq=freq)
+
+
+def _hit_rates(positions, closes, lookback=365, freq='W', now=None):
+    # Same scoring as analysis.align_positions_with_returns, on
+    # (periods x commodities) matrices instead of one commodity at a time
+    dates = to_market_tz(positions['Date'])
+    cutoff = lookback_cutoff(lookback, now)
+    if cutoff is not None:
+        keep = dates >= cutoff
+        positions, dates = positions[keep], dates[keep]
+        closes = closes[closes.index >= cutoff]
+    if positions.empty or closes.empty:
+        return pd.Series(dtype=float)
+
+    wide = positions.assign(Date=dates).pivot_table(
+        index='Date', columns='Commodity', aggfunc='last', observed=True,
+        values=['Merchant_Short_Pct', 'Merchant_Long_Pct']
+    ).resample(freq).last()
+
+    change = closes.resample(freq).last().pct_change()
+    commodities = wide['Merchant_Short_Pct'].columns.intersection(change.columns)
+    periods = wide.index.intersection(change.index)
+
+    short_pct = wide['Merchant_Short_Pct'].loc[periods, commodities].to_numpy(dtype=float)
+    long_pct = wide['Merchant_Long_Pct'].loc[periods, commodities].to_numpy(dtype=float)
+    change = change.loc[periods, commodities].to_numpy(dtype=float)
+
+    correct = ((change < 0) & (short_pct > long_pct)) | ((change > 0) & (long_pct > short_pct))
+    scored = ~(np.isnan(change) | np.isnan(short_pct) | np.isnan(long_pct))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = (correct & scored).sum(axis=0) / scored.sum(axis=0)
+    return pd.Series(rates, index=commodities)
+
+
+@timed()
+def screen_markets(cot_data, thresholds, closes=None, market_codes=commodity_market_codes,
+                   lookback=365, freq='W', now=None):
+    """Latest positioning, signal, OI change and merchant hit rate for every market"""
+    if cot_data.empty:
+        return pd.DataFrame(columns=SCREENER_COLUMNS)
+
+    # The COT index and z-score are only computed when signal ranges use them
+    window = COT_INDEX_WEEKS if thresholds.uses_statistics else None
+    positions = category_positions(cot_data, market_codes, window=window)
+
+    # Week-over-week OI change within each market, then keep the latest report
+    previous_oi = positions.groupby('Commodity', sort=False)['Open_Interest'].shift(1)
+    positions['OI_Change'] = positions['Open_Interest'] - previous_oi
+    positions['OI_Change_Pct'] = positions['OI_Change'] / previous_oi * 100
+    latest = positions.drop_duplicates('Commodity', keep='last').reset_index(drop=True)
+
+    commodities = latest['Commodity'].to_numpy()
+    short_pct, long_pct = category_percentages(latest, thresholds, commodities)
+    cot_index, z_score = category_statistics(latest, thresholds, commodities)
+    latest['Signal'] = evaluate_signals(short_pct, long_pct, thresholds, commodities, cot_index, z_score)[0]
+
+    if closes is not None and not closes.empty:
+        rates = _hit_rates(positions, closes, lookback=lookback, freq=freq, now=now)
+        latest['Hit_Rate'] = latest['Commodity'].map(rates) * 100
+    else:
+        latest['Hit_Rate'] = np.nan
+
+    return latest[SCREENER_COLUMNS].sort_values('Commodity').reset_index(drop=True)
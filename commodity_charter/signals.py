@@ -0,0 +1,326 @@
+"""Vectorized COT signal evaluation against per-commodity threshold ranges."""
+import os
+
+import numpy as np
+import pandas as pd
+
+from commodity_charter.markets import TRADER_CATEGORIES, canonical_category, canonical_commodity, market_ids
+from commodity_charter.metrics import timed
+
+DEFAULT_SIGNALS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cot_signals.csv')
+
+SIGNAL_LABELS = np.array(['NEUTRAL', 'BULLISH', 'BEARISH'], dtype=object)
+NO_TRIGGER = 'No specific trigger'
+
+# Column order of ThresholdTable.bounds
+BOUND_COLUMNS = ['Bullish_Min', 'Bullish_Max', 'Bearish_Min', 'Bearish_Max']
+RANGE_COLUMNS = ['Bearish_Range', 'Bullish_Range']
+# "30-24", "52-60" or a lone lower bound such as "70"
+RANGE_PATTERN = r'^\s*(\d+(?:\.\d+)?)\s*(?:-\s*(\d+(?:\.\d+)?))?\s*$'
+# Trader category whose positioning a signal reads when the file names none
+DEFAULT_CATEGORY = 'Merchant'
+# Rolling statistics of the net position carried next to each signal
+COT_STATISTICS = ['COT_Index', 'Z_Score']
+# Optional ranges of those statistics a signal must also fall in, in the
+# order of ThresholdTable.statistic_bounds; blank bounds don't restrict
+STATISTIC_COLUMNS = [
+    f'{side}_{statistic}_{bound}' for statistic in COT_STATISTICS
+    for side in ('Bullish', 'Bearish') for bound in ('Min', 'Max')
+]
+
+
+class SignalConfigError(ValueError):
+    """A signal range file that doesn't validate against either supported layout"""
+
+
+class ThresholdTable:
+    """Signal ranges compiled into a dense (markets x 4) array indexed by market ID.
+
+    Row i holds the ranges of the market with markets.market_ids value i;
+    names outside the charted markets get rows after those. Aliases and
+    Yahoo symbols resolve to their market. Markets without ranges, and
+    unknown names, map to NaN rows, which never satisfy a range check, so
+    they evaluate as NEUTRAL just like the scalar lookup did. categories
+    holds the trader category each row's ranges apply to, and
+    statistic_bounds the optional COT index/z-score ranges (NaN when unset).
+    """
+
+    def __init__(self, signals_df):
+        names = [canonical_commodity(commodity) or commodity for commodity in signals_df['Commodity']]
+        extra = [name for name in dict.fromkeys(names) if name not in market_ids]
+        self.commodities = list(market_ids) + extra
+        self.index = {commodity: i for i, commodity in enumerate(self.commodities)}
+        self.configured = set(names)
+
+        # Trailing all-NaN row serves every commodity without thresholds
+        self.bounds = np.full((len(self.commodities) + 1, len(BOUND_COLUMNS)), np.nan)
+        self.bounds[[self.index[name] for name in names]] = signals_df[BOUND_COLUMNS].to_numpy(dtype=float)
+        self.categories = np.full(len(self.commodities) + 1, DEFAULT_CATEGORY, dtype=object)
+        if 'Category' in signals_df:
+            self.categories[[self.index[name] for name in names]] = [
+                canonical_category(category) or category for category in signals_df['Category']
+            ]
+        self.statistic_bounds = np.full((len(self.commodities) + 1, len(STATISTIC_COLUMNS)), np.nan)
+        rows = [self.index[name] for name in names]
+        for i, column in enumerate(STATISTIC_COLUMNS):
+            if column in signals_df:
+                self.statistic_bounds[rows, i] = signals_df[column].to_numpy(dtype=float)
+        self.uses_statistics = bool(np.isfinite(self.statistic_bounds).any())
+
+    def __contains__(self, commodity):
+        return commodity in self.configured or canonical_commodity(commodity) in self.configured
+
+    def row(self, commodity):
+        """Row number into bounds for one commodity name, alias or symbol"""
+        row = self.index.get(commodity)
+        if row is None:
+            row = self.index.get(canonical_commodity(commodity), len(self.commodities))
+        return row
+
+    def rows(self, commodities):
+        """Row numbers into bounds for a scalar or array of commodity names or market IDs"""
+        if np.issubdtype(np.asarray(commodities).dtype, np.integer):
+            return np.asarray(commodities, dtype=np.intp)
+        if np.ndim(commodities) == 0:
+            return self.row(commodities)
+        return np.fromiter((self.row(c) for c in commodities), dtype=np.intp, count=len(commodities))
+
+    def category(self, commodity):
+        """Trader category the ranges of one commodity apply to"""
+        return self.categories[self.row(commodity)]
+
+
+def category_percentages(positions, thresholds, commodities):
+    """Short and long % of open interest for each row, read from its commodity's configured category.
+
+    positions needs <Category>_Short_Pct/<Category>_Long_Pct columns (as
+    MarketIndex and category_positions produce) for every category in use.
+    """
+    categories = np.broadcast_to(thresholds.categories[thresholds.rows(commodities)], (len(positions),))
+    short_pct = np.full(len(positions), np.nan)
+    long_pct = np.full(len(positions), np.nan)
+    for category in set(categories):
+        rows = categories == category
+        short_pct[rows] = positions[f'{category}_Short_Pct'].to_numpy(dtype=float)[rows]
+        long_pct[rows] = positions[f'{category}_Long_Pct'].to_numpy(dtype=float)[rows]
+    return short_pct, long_pct
+
+
+def category_statistics(positions, thresholds, commodities):
+    """COT index and z-score for each row, read from its commodity's configured category (NaN where absent)"""
+    categories = np.broadcast_to(thresholds.categories[thresholds.rows(commodities)], (len(positions),))
+    values = {statistic: np.full(len(positions), np.nan) for statistic in COT_STATISTICS}
+    for category in set(categories):
+        rows = categories == category
+        for statistic, column in values.items():
+            if f'{category}_{statistic}' in positions:
+                column[rows] = positions[f'{category}_{statistic}'].to_numpy(dtype=float)[rows]
+    return values['COT_Index'], values['Z_Score']
+
+
+def statistic_filter(thresholds, commodities, cot_index, z_score):
+    """Whether readings fall in their commodity's optional bullish and bearish COT index/z-score ranges.
+
+    Returns (bullish_ok, bearish_ok) shaped like cot_index, with the same
+    commodities broadcasting as evaluate_signals. Unset bounds always pass;
+    a NaN statistic (too little history) fails every bound that is set.
+    """
+    cot_index = np.asarray(cot_index, dtype=float)
+    z_score = np.asarray(z_score, dtype=float)
+    bounds = thresholds.statistic_bounds[thresholds.rows(commodities)]
+    bounds = np.broadcast_to(bounds, cot_index.shape + (len(STATISTIC_COLUMNS),))
+
+    def within(values, low, high):
+        return (np.isnan(low) | (values >= low)) & (np.isnan(high) | (values <= high))
+
+    bullish_ok = within(cot_index, bounds[..., 0], bounds[..., 1]) & within(z_score, bounds[..., 4], bounds[..., 5])
+    bearish_ok = within(cot_index, bounds[..., 2], bounds[..., 3]) & within(z_score, bounds[..., 6], bounds[..., 7])
+    return bullish_ok, bearish_ok
+
+
+def evaluate_signals(short_pct, long_pct, thresholds, commodities, cot_index=None, z_score=None):
+    """Label position arrays BULLISH/BEARISH/NEUTRAL in one pass.
+
+    commodities is either one name applied to every row or an array with a
+    name per row. Returns (labels, bullish_hit, bearish_hit); as in the
+    original scalar rules a bearish hit takes precedence over a bullish one.
+    Where COT index/z-score ranges are configured, a hit also needs
+    cot_index and z_score inside them (missing statistics never pass).
+    """
+    short_pct = np.asarray(short_pct, dtype=float)
+    long_pct = np.asarray(long_pct, dtype=float)
+    bounds = thresholds.bounds[thresholds.rows(commodities)]
+    bounds = np.broadcast_to(bounds, short_pct.shape + (len(BOUND_COLUMNS),))
+
+    bullish_hit = (short_pct >= bounds[..., 0]) & (short_pct <= bounds[..., 1])
+    bearish_hit = (long_pct >= bounds[..., 2]) & (long_pct <= bounds[..., 3])
+    if thresholds.uses_statistics:
+        missing = np.full(short_pct.shape, np.nan)
+        bullish_ok, bearish_ok = statistic_filter(
+            thresholds, commodities,
+            missing if cot_index is None else np.broadcast_to(np.asarray(cot_index, dtype=float), short_pct.shape),
+            missing if z_score is None else np.broadcast_to(np.asarray(z_score, dtype=float), short_pct.shape),
+        )
+        bullish_hit &= bullish_ok
+        bearish_hit &= bearish_ok
+
+    codes = np.where(bearish_hit, 2, np.where(bullish_hit, 1, 0))
+    return SIGNAL_LABELS[codes], bullish_hit, bearish_hit
+
+
+def describe_signals(short_pct, long_pct, bullish_hit, bearish_hit):
+    """Reason strings for evaluated rows; only rows that triggered are formatted"""
+    short_pct = np.asarray(short_pct, dtype=float)
+    long_pct = np.asarray(long_pct, dtype=float)
+
+    bullish_text = np.full(short_pct.shape, '', dtype=object)
+    bullish_text[bullish_hit] = [f'Short {value:.1f}% in bullish range' for value in short_pct[bullish_hit]]
+    bearish_text = np.full(long_pct.shape, '', dtype=object)
+    bearish_text[bearish_hit] = [f'Long {value:.1f}% in bearish range' for value in long_pct[bearish_hit]]
+
+    joined = np.where(bullish_hit & bearish_hit, bullish_text + ', ' + bearish_text, bullish_text + bearish_text)
+    return np.where(bullish_hit | bearish_hit, joined, NO_TRIGGER)
+
+
+def _parse_ranges(values, column):
+    parts = values.astype(str).str.extract(RANGE_PATTERN).astype(float)
+    invalid = parts[0].isna()
+    if invalid.any():
+        raise SignalConfigError(f"{column} values are not ranges: {list(values[invalid])}")
+    # A lone number is a lower bound: "70" means 70% or more
+    return parts[0], parts[1].fillna(100.0)
+
+
+def normalize_signal_ranges(raw):
+    """Validate a signal table in either layout and map it to canonical markets.
+
+    Accepts the Bearish_Range/Bullish_Range strings keyed by commodity name
+    or numeric min/max columns keyed by name or Yahoo symbol. Inverted
+    ranges such as "30-24" are reordered. An optional Category column picks
+    the trader category each row's ranges apply to (default Merchant).
+    """
+    if 'Commodity' not in raw.columns:
+        raise SignalConfigError("Signal file has no Commodity column")
+
+    if set(RANGE_COLUMNS) <= set(raw.columns):
+        bearish_low, bearish_high = _parse_ranges(raw['Bearish_Range'], 'Bearish_Range')
+        bullish_low, bullish_high = _parse_ranges(raw['Bullish_Range'], 'Bullish_Range')
+    elif set(BOUND_COLUMNS) <= set(raw.columns):
+        numeric = raw[BOUND_COLUMNS].apply(pd.to_numeric, errors='coerce')
+        invalid = numeric.isna().any(axis=1)
+        if invalid.any():
+            raise SignalConfigError(f"Non-numeric signal bounds for {list(raw.loc[invalid, 'Commodity'])}")
+        bullish_low, bullish_high, bearish_low, bearish_high = (numeric[column] for column in BOUND_COLUMNS)
+    else:
+        raise SignalConfigError(f"Signal file needs {RANGE_COLUMNS} or {BOUND_COLUMNS} columns")
+
+    commodities = raw['Commodity'].map(canonical_commodity)
+    if commodities.isna().any():
+        raise SignalConfigError(f"Unknown commodities in signal file: {list(raw.loc[commodities.isna(), 'Commodity'])}")
+    categories = pd.Series(DEFAULT_CATEGORY, index=raw.index)
+    if 'Category' in raw.columns:
+        named = raw['Category'].notna() & (raw['Category'].astype(str).str.strip() != '')
+        categories[named] = raw.loc[named, 'Category'].map(canonical_category)
+        if categories.isna().any():
+            raise SignalConfigError(f"Unknown trader categories in signal file: "
+                                    f"{list(raw.loc[categories.isna(), 'Category'])}; "
+                                    f"expected one of {list(TRADER_CATEGORIES)}")
+    duplicated = commodities[commodities.duplicated()]
+    if not duplicated.empty:
+        raise SignalConfigError(f"Commodities configured more than once: {sorted(set(duplicated))}")
+
+    signals_df = pd.DataFrame({
+        'Commodity': commodities,
+        'Market_ID': commodities.map(market_ids),
+        'Category': categories,
+        'Bullish_Min': np.minimum(bullish_low, bullish_high),
+        'Bullish_Max': np.maximum(bullish_low, bullish_high),
+        'Bearish_Min': np.minimum(bearish_low, bearish_high),
+        'Bearish_Max': np.maximum(bearish_low, bearish_high),
+    }).reset_index(drop=True)
+
+    out_of_range = ((signals_df[BOUND_COLUMNS] < 0) | (signals_df[BOUND_COLUMNS] > 100)).any(axis=1)
+    if out_of_range.any():
+        raise SignalConfigError(f"Signal bounds outside 0-100% for {list(signals_df.loc[out_of_range, 'Commodity'])}")
+
+    statistic_columns = [column for column in STATISTIC_COLUMNS if column in raw.columns]
+    if statistic_columns:
+        given = raw[statistic_columns].notna() & (raw[statistic_columns].astype(str) != '')
+        numeric = raw[statistic_columns].apply(pd.to_numeric, errors='coerce')
+        invalid = (given & numeric.isna()).any(axis=1).to_numpy()
+        if invalid.any():
+            raise SignalConfigError(f"Non-numeric COT index/z-score bounds for "
+                                    f"{list(signals_df.loc[invalid, 'Commodity'])}")
+        numeric = numeric.reindex(columns=STATISTIC_COLUMNS).reset_index(drop=True)
+        for low, high in zip(STATISTIC_COLUMNS[::2], STATISTIC_COLUMNS[1::2]):
+            # Reorder inverted ranges; a range with one bound set is left open on the other side
+            inverted = numeric[low] > numeric[high]
+            signals_df[low] = numeric[low].where(~inverted, numeric[high])
+            signals_df[high] = numeric[high].where(~inverted, numeric[low])
+        cot_index = signals_df[[column for column in STATISTIC_COLUMNS if '_COT_Index_' in column]]
+        out_of_range = ((cot_index < 0) | (cot_index > 100)).any(axis=1)
+        if out_of_range.any():
+            raise SignalConfigError(f"COT index bounds outside 0-100 for "
+                                    f"{list(signals_df.loc[out_of_range, 'Commodity'])}")
+    return signals_df
+
+
+def load_cot_signals(path=DEFAULT_SIGNALS_PATH):
+    """Read and validate a signal range file in either supported layout"""
+    return normalize_signal_ranges(pd.read_csv(path))
+
+
+def label_positions(positions, thresholds, commodities):
+    """Signal table for a positions frame, read from each commodity's configured trader category"""
+    short_pct, long_pct = category_percentages(positions, thresholds, commodities)
+    cot_index, z_score = category_statistics(positions, thresholds, commodities)
+    labels, bullish_hit, bearish_hit = evaluate_signals(short_pct, long_pct, thresholds, commodities,
+                                                        cot_index, z_score)
+
+    return pd.DataFrame({
+        'Signal': labels,
+        'Short_Pct': short_pct,
+        'Long_Pct': long_pct,
+        'Bullish_Hit': bullish_hit,
+        'Bearish_Hit': bearish_hit,
+    }, index=positions.index)
+
+
+def cot_statistics(positions, thresholds, commodity):
+    """COT_Index and Z_Score columns of the commodity's configured category, where positions carry them"""
+    category = thresholds.category(commodity)
+    return pd.DataFrame({
+        statistic: positions[f'{category}_{statistic}']
+        for statistic in COT_STATISTICS if f'{category}_{statistic}' in positions
+    }, index=positions.index)
+
+
+def weekly_signal_history(merchant_positions, thresholds, commodity):
+    """Signal, positioning, COT index/z-score and reasons for every week of a commodity's reports"""
+    weekly_positions = merchant_positions.set_index('Date').resample('W').last()
+    signal_history = label_positions(weekly_positions, thresholds, commodity)
+    signal_history = signal_history.join(cot_statistics(weekly_positions, thresholds, commodity))
+
+    signal_history['Reasons'] = describe_signals(
+        signal_history['Short_Pct'], signal_history['Long_Pct'],
+        signal_history['Bullish_Hit'].to_numpy(), signal_history['Bearish_Hit'].to_numpy()
+    )
+    return signal_history.drop(columns=['Bullish_Hit', 'Bearish_Hit']).rename_axis('Date').reset_index()
+
+
+def get_position_signal(short_pct, long_pct, signals_df, commodity, cot_index=np.nan, z_score=np.nan):
+    """Signal and reasons for a single reading; scalar wrapper around evaluate_signals"""
+    thresholds = ThresholdTable(signals_df)
+    if commodity not in thresholds:
+        return 'NEUTRAL', []
+
+    labels, bullish_hit, bearish_hit = evaluate_signals([short_pct], [long_pct], thresholds, commodity,
+                                                        [cot_index], [z_score])
+    reasons = describe_signals([short_pct], [long_pct], bullish_hit, bearish_hit)[0]
+    return labels[0], ([] if reasons == NO_TRIGGER else reasons.split(', '))
+
+
+@timed()
+def maintain_signal_history(merchant_positions, signals_df, selected_commodity):
+    """Maintain a history of weekly signals"""
+    return weekly_signal_history(merchant_positions, ThresholdTable(signals_df), selected_commodity)
@@ -0,0 +1,245 @@
+"""Persistent Parquet store for CFTC disaggregated COT history.
+
+Reports are kept on disk partitioned by report year and CFTC contract market
+code (``Year=2024/CFTC_Contract_Market_Code=067651/*.parquet``), so a restarted
+process or another container sharing the volume can read the history back
+without downloading and parsing the yearly zip archives again. The trader
+category table derived from the reports is cached next to them and extended
+a week at a time as new reports are appended.
+"""
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from commodity_charter.cftc import MARKET_CODE_COLUMN
+from commodity_charter.derived import DerivedStore
+from commodity_charter.markets import COT_INDEX_WEEKS, category_positions
+from commodity_charter.metrics import timed
+from commodity_charter.rolling import STATE_FILE, RollingStats
+
+DEFAULT_STORE_DIR = os.path.join('data', 'cot_store')
+METADATA_FILE = '_metadata.json'
+# Dataset scans skip '_'-prefixed paths, so derived tables can live in the store
+POSITIONS_DIR = '_positions'
+
+# Bumped whenever the stored columns or dtypes change; older stores are rebuilt
+FORMAT_VERSION = 3
+
+# CFTC publishes the COT report on Fridays at 3:30 p.m. Eastern with
+# positions as of the preceding Tuesday
+RELEASE_TZ = 'America/New_York'
+RELEASE_WEEKDAY = 4
+RELEASE_TIME = timedelta(hours=15, minutes=30)
+REPORT_LAG = timedelta(days=3)
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('Year', pa.int16()), (MARKET_CODE_COLUMN, pa.string())]),
+    flavor='hive'
+)
+
+
+def latest_published_report(now=None):
+    """Return the report date of the most recent scheduled COT release"""
+    now = pd.Timestamp.now(tz=RELEASE_TZ) if now is None else pd.Timestamp(now)
+    now = now.tz_localize(RELEASE_TZ) if now.tzinfo is None else now.tz_convert(RELEASE_TZ)
+
+    days_since_release = (now.weekday() - RELEASE_WEEKDAY) % 7
+    release = (now - pd.Timedelta(days=days_since_release)).normalize() + RELEASE_TIME
+    if release > now:
+        release -= pd.Timedelta(days=7)
+
+    return (release - REPORT_LAG).normalize().tz_localize(None)
+
+
+class COTStore:
+    """Year/market partitioned Parquet copy of the COT history"""
+
+    def __init__(self, root=None, recheck_interval=timedelta(hours=1)):
+        self.root = root or os.environ.get('COT_STORE_DIR', DEFAULT_STORE_DIR)
+        self.recheck_interval = recheck_interval
+
+    @property
+    def metadata_path(self):
+        return os.path.join(self.root, METADATA_FILE)
+
+    def metadata(self):
+        try:
+            with open(self.metadata_path) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return metadata if metadata.get('version') == FORMAT_VERSION else {}
+
+    def _write_metadata(self, **updates):
+        metadata = self.metadata()
+        metadata.update(updates, version=FORMAT_VERSION)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, self.metadata_path)
+
+    def years(self):
+        return sorted(self.metadata().get('years', []))
+
+    def exists(self):
+        return bool(self.years())
+
+    def latest_report(self):
+        latest = self.metadata().get('latest_report')
+        return pd.Timestamp(latest) if latest else None
+
+    def revision(self):
+        """Number of times stored years were rewritten; appending new weeks leaves it unchanged"""
+        return self.metadata().get('revision', 0)
+
+    def needs_refresh(self, now=None):
+        """True when CFTC has published a report newer than the stored history"""
+        latest = self.latest_report()
+        if latest is None:
+            return True
+        if latest >= latest_published_report(now):
+            return False
+
+        # A release can slip (holidays); don't hammer CFTC while waiting for it
+        checked_at = self.metadata().get('checked_at')
+        if checked_at is None:
+            return True
+        now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+        now = now.tz_localize('UTC') if now.tzinfo is None else now
+        return now - pd.Timestamp(checked_at) >= self.recheck_interval
+
+    def mark_checked(self, now=None):
+        os.makedirs(self.root, exist_ok=True)
+        now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+        now = now.tz_localize('UTC') if now.tzinfo is None else now.tz_convert('UTC')
+        self._write_metadata(checked_at=now.isoformat())
+
+    def _prepare(self, cot_df):
+        os.makedirs(self.root, exist_ok=True)
+        cot_df = cot_df.dropna(subset=[MARKET_CODE_COLUMN])
+
+        # Arrow needs homogeneous columns; raw CSV object columns can mix types
+        object_columns = cot_df.select_dtypes(include='object').columns
+        return cot_df.astype({column: 'string' for column in object_columns})
+
+    def _record(self, cot_df, now=None, **updates):
+        years = set(self.years()) | set(int(y) for y in cot_df['Date'].dt.year.unique())
+        latest = max(cot_df['Date'].max(), self.latest_report() or cot_df['Date'].max())
+        self._write_metadata(years=sorted(years), latest_report=latest.strftime('%Y-%m-%d'), **updates)
+        self.mark_checked(now)
+
+    def write(self, cot_df, now=None):
+        """Replace the stored partitions for every report year present in cot_df"""
+        if cot_df.empty:
+            return
+
+        cot_df = self._prepare(cot_df)
+        for year, year_df in cot_df.groupby(cot_df['Date'].dt.year):
+            self._replace_year(int(year), year_df)
+        self._record(cot_df, now, revision=self.revision() + 1)
+
+    def append(self, cot_df, now=None):
+        """Add new report weeks next to the existing files of their partitions"""
+        if cot_df.empty:
+            return
+
+        cot_df = self._prepare(cot_df)
+        for year, year_df in cot_df.groupby(cot_df['Date'].dt.year):
+            self._append_year(int(year), year_df)
+        self._record(cot_df, now)
+
+    def _replace_year(self, year, year_df):
+        # Write into a hidden directory first so readers never see half a year
+        final_dir = os.path.join(self.root, f'Year={year}')
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.root)
+        year_df.to_parquet(tmp_dir, partition_cols=[MARKET_CODE_COLUMN], index=False)
+
+        old_dir = None
+        if os.path.exists(final_dir):
+            old_dir = tempfile.mkdtemp(prefix='.old-', dir=self.root)
+            os.rename(final_dir, os.path.join(old_dir, 'data'))
+        os.rename(tmp_dir, final_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    def _append_year(self, year, year_df):
+        final_dir = os.path.join(self.root, f'Year={year}')
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.root)
+        year_df.to_parquet(tmp_dir, partition_cols=[MARKET_CODE_COLUMN], index=False)
+
+        # Move each new file into place; a rename never exposes a partial file
+        for partition in os.listdir(tmp_dir):
+            os.makedirs(os.path.join(final_dir, partition), exist_ok=True)
+            for filename in os.listdir(os.path.join(tmp_dir, partition)):
+                os.rename(os.path.join(tmp_dir, partition, filename),
+                          os.path.join(final_dir, partition, filename))
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @timed('cot_store_read')
+    def read(self, columns=None, years=None, markets=None):
+        """Load stored reports, optionally pruned to columns, years and market codes"""
+        if not self.exists():
+            return pd.DataFrame()
+
+        dataset = ds.dataset(self.root, format='parquet', partitioning=PARTITIONING)
+        filters = []
+        if years is not None:
+            filters.append(ds.field('Year').isin(list(years)))
+        if markets is not None:
+            filters.append(ds.field(MARKET_CODE_COLUMN).isin(list(markets)))
+
+        expression = None
+        for condition in filters:
+            expression = condition if expression is None else expression & condition
+
+        table = dataset.to_table(columns=columns, filter=expression)
+        cot_df = table.to_pandas().drop(columns=['Year'], errors='ignore')
+        if MARKET_CODE_COLUMN in cot_df:
+            cot_df[MARKET_CODE_COLUMN] = cot_df[MARKET_CODE_COLUMN].astype('category')
+        return cot_df
+
+    def category_positions(self, window=COT_INDEX_WEEKS):
+        """Trader category positions of every market (see markets.category_positions).
+
+        Cached under the store per report version and COT index window, so
+        other processes sharing it reuse the table. When only new weeks were
+        appended since the cached table, just those reports are read and the
+        rolling statistics are extended from the saved window state instead
+        of recomputed over the whole history.
+        """
+        latest = self.latest_report()
+        if latest is None:
+            return pd.DataFrame()
+
+        base = f"{FORMAT_VERSION}/{self.revision()}/{window}"
+        version = f"{base}/{latest:%Y-%m-%d}"
+        cache = DerivedStore(os.path.join(self.root, POSITIONS_DIR))
+        cached_version = cache.versions().get('category_positions', '')
+        positions = cache.read('category_positions') if cached_version.startswith(f"{base}/") else None
+        if positions is not None and cached_version == version:
+            return positions
+
+        state_path = os.path.join(self.root, POSITIONS_DIR, STATE_FILE)
+        if positions is not None and not positions.empty:
+            since = pd.Timestamp(cached_version.rsplit('/', 1)[1])
+            state = RollingStats.load(state_path)
+            if state is None or state.window != window or state.latest != positions['Date'].max():
+                state = RollingStats.from_positions(positions, window)
+            new_reports = self.read(years=range(since.year, latest.year + 1))
+            new = state.extend(category_positions(new_reports[new_reports['Date'] > since], window=None))
+            if not new.empty:
+                positions = pd.concat([positions, new[positions.columns]], ignore_index=True)
+                positions = positions.sort_values(['Commodity', 'Date'], kind='stable', ignore_index=True)
+        else:
+            positions = category_positions(self.read(), window=window)
+            state = RollingStats.from_positions(positions, window)
+
+        cache.write('category_positions', positions, version)
+        state.save(state_path)
+        return positions
@@ -0,0 +1,82 @@
+"""Memoized per-view results for the chart page.
+
+Every widget change reruns the Streamlit script. The derived frames only
+depend on the commodity, the date range, its signal ranges and the data
+behind them, and the figure additionally on the chart type and rendering
+mode, so both are kept in bounded LRU caches. Toggling the chart type then reuses the derived
+frames and only rebuilds the figure around a different price trace.
+"""
+import os
+
+import pandas as pd
+
+from commodity_charter.analysis import align_positions_with_returns, analyze_trend_changes, correct_positions
+from commodity_charter.charts import build_price_figure
+from commodity_charter.memo import LRUCache
+from commodity_charter.metrics import record_size, register_cache, span
+from commodity_charter.markets import TRADER_CATEGORIES
+from commodity_charter.signals import ThresholdTable, cot_statistics, maintain_signal_history
+
+VIEW_CACHE_SIZE = int(os.environ.get('VIEW_CACHE_SIZE', '32'))
+
+DERIVED_CACHE = LRUCache(VIEW_CACHE_SIZE)
+FIGURE_CACHE = LRUCache(VIEW_CACHE_SIZE)
+register_cache('chart_view', DERIVED_CACHE)
+register_cache('chart_figure', FIGURE_CACHE)
+
+
+def price_version(price_data):
+    """Cheap fingerprint of a price frame; changes when a bar is added or the live bar moves"""
+    if price_data.empty:
+        return (0, None, None)
+    return (len(price_data), price_data.index[-1].isoformat(), float(price_data['Close'].iloc[-1]))
+
+
+def signals_version(signals_df, commodity=None):
+    """Fingerprint of the signal ranges configured for commodity (or all); changes when its rows are edited"""
+    rows = signals_df if commodity is None else signals_df[signals_df['Commodity'] == commodity]
+    return (len(rows), int(pd.util.hash_pandas_object(rows, index=False).sum()))
+
+
+def view_key(commodity, date_range, data_version, price_data, signals_df):
+    """Cache key of one chart view: commodity, date range and the versions of its inputs"""
+    start, end = (pd.Timestamp(value).strftime('%Y-%m-%d') for value in date_range)
+    return (commodity, start, end, data_version, price_version(price_data), signals_version(signals_df, commodity))
+
+
+def chart_view(key, price_data, merchant_positions, signals_df, lookback=365):
+    """Trend, signal history, COT statistics and merchant alignment for one view, computed once per key"""
+    def compute():
+        commodity = key[0]
+        thresholds = ThresholdTable(signals_df)
+        price_trend, oi_weekly = analyze_trend_changes(
+            price_data,
+            merchant_positions['Open_Interest'],
+            merchant_positions['Date']
+        )
+        merchant_alignment = align_positions_with_returns(price_data, merchant_positions, lookback=lookback)
+        return {
+            'price_trend': price_trend,
+            'oi_weekly': oi_weekly,
+            'signal_history': maintain_signal_history(merchant_positions, signals_df, commodity),
+            'merchant_alignment': merchant_alignment,
+            'merchant_analysis': correct_positions(merchant_alignment),
+            'cot_stats': cot_statistics(merchant_positions.set_index('Date'), thresholds, commodity),
+            'cot_label': TRADER_CATEGORIES[thresholds.category(commodity)]['label'],
+        }
+    return DERIVED_CACHE.get_or_compute(key, compute)
+
+
+def chart_figure_json(key, view, price_data, chart_type='Candlestick', render_mode='webgl'):
+    """Serialized figure for a view, rebuilt only when the key, chart type or mode change"""
+    def compute():
+        with span('build_price_figure'):
+            fig = build_price_figure(
+                price_data, view['price_trend'], view['oi_weekly'], key[0], chart_type, render_mode=render_mode,
+                cot_stats=view['cot_stats'] if len(view['cot_stats'].columns) else None, cot_label=view['cot_label']
+            )
+        with span('figure_serialize'):
+            figure_json = fig.to_json()
+        record_size('figure_json', len(figure_json))
+        return figure_json
+    return FIGURE_CACHE.get_or_compute(key + (chart_type, render_mode), compute)
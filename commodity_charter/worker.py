@@ -0,0 +1,164 @@
+"""Background refresh worker that keeps the local data stores warm.
+
+Runs outside the Streamlit request path: COT archives are ingested once CFTC
+publishes the weekly report, daily and intraday prices are pulled on a timer,
+and the derived screener and signal tables are rebuilt whenever their inputs
+change, so page renders only read from disk.
+
+    python -m commodity_charter.worker            # run forever
+    python -m commodity_charter.worker --once     # single refresh pass
+"""
+import argparse
+import logging
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+from commodity_charter.archives import fetch_cot_archive
+from commodity_charter.derived import DerivedStore
+from commodity_charter.ingest import FIRST_ARCHIVE_YEAR, ingest_cot_history
+from commodity_charter.markets import MarketIndex, commodity_symbols
+from commodity_charter.prices import PriceCache
+from commodity_charter.screener import commodity_closes, screen_markets
+from commodity_charter.signals import (
+    DEFAULT_SIGNALS_PATH, ThresholdTable, load_cot_signals, weekly_signal_history
+)
+from commodity_charter.store import COTStore
+
+logger = logging.getLogger(__name__)
+
+# Yahoo only serves hourly bars for recent history
+INTRADAY_INTERVAL = '60m'
+INTRADAY_DAYS = 30
+HISTORY_DAYS = 365
+
+
+def build_derived_tables(cot_data, signals_df, price_frames, now=None, positions=None):
+    """Screener and all-market weekly signal history from the shared inputs.
+
+    positions is an already computed category_positions table, e.g. the one
+    cached by COTStore.category_positions().
+    """
+    thresholds = ThresholdTable(signals_df)
+    market_index = MarketIndex(cot_data, positions=positions)
+    closes = commodity_closes(price_frames)
+
+    screener = screen_markets(cot_data, thresholds, closes, now=now)
+    histories = [
+        weekly_signal_history(market_index.positions(commodity), thresholds, commodity).assign(Commodity=commodity)
+        for commodity in market_index.commodities()
+    ]
+    signal_history = pd.concat(histories, ignore_index=True) if histories else pd.DataFrame()
+    return {'screener': screener, 'signal_history': signal_history}
+
+
+class RefreshWorker:
+    """Refreshes each data source when it is due"""
+
+    def __init__(self, store=None, prices=None, intraday_prices=None, derived=None,
+                 signals_path=DEFAULT_SIGNALS_PATH, symbols=None,
+                 fetch_archive=fetch_cot_archive, first_year=FIRST_ARCHIVE_YEAR,
+                 price_interval=timedelta(minutes=15), intraday_interval=timedelta(minutes=5)):
+        self.store = store or COTStore()
+        self.prices = prices or PriceCache(refresh_interval=price_interval)
+        self.intraday_prices = intraday_prices or PriceCache(interval=INTRADAY_INTERVAL,
+                                                             refresh_interval=intraday_interval)
+        self.derived = derived or DerivedStore()
+        self.fetch_archive = fetch_archive
+        self.first_year = first_year
+        self.signals_path = signals_path
+        self.symbols = list(symbols or commodity_symbols.values())
+        self.price_interval = price_interval
+        self.intraday_interval = intraday_interval
+        self._last_prices = None
+        self._last_intraday = None
+        self._derived_inputs = None
+
+    def refresh_cot(self, now=None):
+        if not self.store.needs_refresh(now):
+            return False
+        added = ingest_cot_history(self.store, self.fetch_archive, first_year=self.first_year, now=now)
+        logger.info("COT refresh added %d report rows", added)
+        return added > 0
+
+    def refresh_prices(self, now):
+        if self._last_prices is not None and now - self._last_prices < self.price_interval:
+            return False
+        self.prices.get_many(self.symbols, now - pd.Timedelta(days=HISTORY_DAYS), now, now=now)
+        self._last_prices = now
+        logger.info("Daily prices refreshed for %d symbols", len(self.symbols))
+        return True
+
+    def refresh_intraday(self, now):
+        if self._last_intraday is not None and now - self._last_intraday < self.intraday_interval:
+            return False
+        self.intraday_prices.get_many(self.symbols, now - pd.Timedelta(days=INTRADAY_DAYS), now, now=now)
+        self._last_intraday = now
+        return True
+
+    def refresh_derived(self, now):
+        version = self.store.latest_report()
+        if version is None:
+            return False
+        version = version.strftime('%Y-%m-%d')
+
+        cot_data = self.store.read()
+        price_frames = self.prices.get_many(self.symbols, now - pd.Timedelta(days=HISTORY_DAYS), now, now=now)
+        tables = build_derived_tables(cot_data, load_cot_signals(self.signals_path), price_frames, now=now,
+                                      positions=self.store.category_positions())
+        for name, table in tables.items():
+            self.derived.write(name, table, version)
+        logger.info("Derived tables rebuilt for COT version %s", version)
+        return True
+
+    def run_once(self, now=None):
+        """One pass over every source; failures are logged and retried next pass"""
+        now = pd.Timestamp.now(tz='America/New_York') if now is None else now
+        refreshed = {}
+        for name, task in [('COT', self.refresh_cot), ('prices', self.refresh_prices),
+                           ('intraday prices', self.refresh_intraday)]:
+            try:
+                refreshed[name] = task(now)
+            except Exception:
+                logger.exception("Refreshing %s failed", name)
+
+        # Intraday bars don't feed the derived tables
+        inputs_changed = refreshed.get('COT') or refreshed.get('prices')
+        if inputs_changed or self._derived_inputs != self.store.latest_report():
+            try:
+                self.refresh_derived(now)
+                self._derived_inputs = self.store.latest_report()
+            except Exception:
+                logger.exception("Rebuilding derived tables failed")
+
+    def run_forever(self, stop_event=None, tick=60):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self.run_once()
+            stop_event.wait(tick)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep the Commodity Charter data stores warm")
+    parser.add_argument('--once', action='store_true', help='run a single refresh pass and exit')
+    parser.add_argument('--tick', type=int, default=60, help='seconds between refresh passes')
+    parser.add_argument('--price-minutes', type=int, default=15, help='daily price refresh interval')
+    parser.add_argument('--intraday-minutes', type=int, default=5, help='intraday price refresh interval')
+    parser.add_argument('--signals', default=DEFAULT_SIGNALS_PATH, help='signal range file')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    worker = RefreshWorker(
+        signals_path=args.signals,
+        price_interval=timedelta(minutes=args.price_minutes),
+        intraday_interval=timedelta(minutes=args.intraday_minutes)
+    )
+    if args.once:
+        worker.run_once()
+    else:
+        worker.run_forever(tick=args.tick)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from commodity_charter.cftc import parse_cot_archive
+from commodity_charter.screener import weekly_closes
+
+# Markets used by the offline fixture archives
+FIXTURE_MARKETS = {
+    '088691': 'GOLD - COMMODITY EXCHANGE INC.',
+    '088695': 'MICRO GOLD - COMMODITY EXCHANGE INC.',
+    '002602': 'CORN - CHICAGO BOARD OF TRADE',
+    '067651': 'WTI-PHYSICAL - NEW YORK MERCANTILE EXCHANGE',
+}
+
+# Years written by the cot_archive_dir fixture
+FIXTURE_YEARS = (2022, 2023, 2024)
+
+# Trader categories as named in the disaggregated report (note the CFTC's
+# double underscore in some swap dealer columns)
+POSITION_COLUMNS = [
+    'Prod_Merc_Positions_Long_All', 'Prod_Merc_Positions_Short_All',
+    'Swap_Positions_Long_All', 'Swap__Positions_Short_All', 'Swap__Positions_Spread_All',
+    'M_Money_Positions_Long_All', 'M_Money_Positions_Short_All', 'M_Money_Positions_Spread_All',
+    'Other_Rept_Positions_Long_All', 'Other_Rept_Positions_Short_All', 'Other_Rept_Positions_Spread_All',
+    'NonRept_Positions_Long_All', 'NonRept_Positions_Short_All',
+]
+
+
+def make_cot_report(dates, markets=FIXTURE_MARKETS, seed=0):
+    """Build a disaggregated COT report frame shaped like the CFTC text files"""
+    rng = np.random.RandomState(seed)
+    rows = []
+    for code, name in markets.items():
+        for date in pd.to_datetime(dates):
+            open_interest = int(rng.randint(100000, 1000000))
+            row = {
+                'Market_and_Exchange_Names': name,
+                'As_of_Date_In_Form_YYMMDD': date.strftime('%y%m%d'),
+                'Report_Date_as_YYYY-MM-DD': date.strftime('%Y-%m-%d'),
+                'CFTC_Contract_Market_Code': code,
+                'CFTC_Market_Code': 'CMX',
+                'CFTC_Region_Code': 0,
+                'CFTC_Commodity_Code': int(code[:3]),
+                'Open_Interest_All': open_interest,
+            }
+            for column in POSITION_COLUMNS:
+                row[column] = int(open_interest * rng.uniform(0.02, 0.6))
+            row['Change_in_Open_Interest_All'] = int(rng.randint(-5000, 5000))
+            row['Pct_of_OI_Prod_Merc_Long_All'] = round(row['Prod_Merc_Positions_Long_All'] / open_interest * 100, 1)
+            row['Pct_of_OI_Prod_Merc_Short_All'] = round(row['Prod_Merc_Positions_Short_All'] / open_interest * 100, 1)
+            row['Traders_Tot_All'] = int(rng.randint(50, 400))
+            row['Contract_Units'] = '(CONTRACTS OF 100 TROY OUNCES)'
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def write_cot_archive(path, report_df):
+    """Zip a report frame the way CFTC ships its yearly archives"""
+    buffer = io.StringIO()
+    report_df.to_csv(buffer, index=False)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('f_year.txt', buffer.getvalue())
+
+
+def read_cot_archives(archive_dir, years=FIXTURE_YEARS):
+    """Parse the fixture archives of the given years into one report frame"""
+    frames = []
+    for year in years:
+        with open(archive_dir / f'fut_disagg_txt_{year}.zip', 'rb') as f:
+            frames.append(parse_cot_archive(f.read()))
+    return pd.concat(frames, ignore_index=True)
+
+
+class FakeProvider:
+    """Offline provider producing one bar per business day and logging requests"""
+
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self, symbols, start, end, interval='1d'):
+        self.calls.append((tuple(symbols), pd.Timestamp(start), pd.Timestamp(end)))
+        index = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), tz='America/New_York')
+        frames = {}
+        for symbol in symbols:
+            close = np.arange(len(index), dtype=float) + 100
+            frames[symbol] = pd.DataFrame({
+                'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                'Volume': np.full(len(index), 1000)
+            }, index=index)
+        return frames
+
+
+@pytest.fixture
+def cot_archive_dir(tmp_path):
+    """Yearly fixture archives for 2022-2024, one report every Tuesday"""
+    archive_dir = tmp_path / 'archives'
+    archive_dir.mkdir()
+    for year in FIXTURE_YEARS:
+        dates = pd.date_range(f'{year}-01-01', f'{year}-12-31', freq='W-TUE')
+        write_cot_archive(archive_dir / f'fut_disagg_txt_{year}.zip', make_cot_report(dates, seed=year))
+    return archive_dir
+
+
+@pytest.fixture
+def cot_history(cot_archive_dir):
+    """Every fixture archive parsed into one report frame"""
+    return read_cot_archives(cot_archive_dir)
+
+
+@pytest.fixture
+def cot_2024(cot_archive_dir):
+    """The 2024 fixture archive parsed"""
+    return read_cot_archives(cot_archive_dir, years=(2024,))
+
+
+@pytest.fixture
+def weekly_close_panel():
+    """Random-walk weekly closes for the charted fixture markets over the archive years"""
+    index = pd.bdate_range(f'{FIXTURE_YEARS[0]}-01-03', f'{FIXTURE_YEARS[-1]}-12-31', tz='America/New_York')
+    rng = np.random.RandomState(3)
+    return weekly_closes({
+        commodity: pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))}, index=index)
+        for commodity in ['Gold', 'Corn', 'Crude Oil']
+    })
+
+
+@pytest.fixture
+def fetched_years():
+    return []
+
+
+@pytest.fixture
+def fetch_archive(cot_archive_dir, fetched_years):
+    """Offline stand-in for archives.fetch_cot_archive reading the fixture zips"""
+    def fetch(year):
+        fetched_years.append(year)
+        with open(cot_archive_dir / f'fut_disagg_txt_{year}.zip', 'rb') as f:
+            return parse_cot_archive(f.read())
+    return fetch
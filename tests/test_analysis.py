@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.analysis import (
+    align_positions_with_returns, analyze_trend_changes, correct_positions, merchant_hit_rate
+)
+
+@pytest.fixture
+def price_data():
+    """Three years of business-day closes, tz-aware like yfinance"""
+    index = pd.bdate_range('2021-01-04', '2023-12-29', tz='America/New_York')
+    rng = np.random.RandomState(1)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    return pd.DataFrame({'Close': close}, index=index)
+
+@pytest.fixture
+def merchant_positions():
+    dates = pd.date_range('2021-01-05', '2023-12-26', freq='W-TUE')
+    rng = np.random.RandomState(2)
+    return pd.DataFrame({
+        'Date': dates,
+        'Merchant_Long_Pct': rng.uniform(10, 60, len(dates)),
+        'Merchant_Short_Pct': rng.uniform(10, 60, len(dates))
+    })
+
+def reference_correct_positions(price_data, merchant_positions):
+    """The original per-week loop from analyze_merchant_behavior, without a cutoff"""
+    price_weekly_pct = price_data['Close'].resample('W').last().pct_change()
+    merchant_positions = merchant_positions.copy()
+    merchant_positions['Date'] = merchant_positions['Date'].dt.tz_localize('America/New_York')
+    merchant_weekly = merchant_positions.set_index('Date').resample('W').last()
+
+    correct = []
+    for date in merchant_weekly.index:
+        if date in price_weekly_pct.index:
+            change = price_weekly_pct[date]
+            short_pct = merchant_weekly.loc[date, 'Merchant_Short_Pct']
+            long_pct = merchant_weekly.loc[date, 'Merchant_Long_Pct']
+            if change < 0 and short_pct > long_pct:
+                correct.append({'Date': date, 'Price_Change': change * 100, 'Position': 'Short',
+                                'Short_Pct': short_pct, 'Long_Pct': long_pct})
+            elif change > 0 and long_pct > short_pct:
+                correct.append({'Date': date, 'Price_Change': change * 100, 'Position': 'Long',
+                                'Short_Pct': short_pct, 'Long_Pct': long_pct})
+    return pd.DataFrame(correct)
+
+def test_matches_weekly_loop(price_data, merchant_positions):
+    """The vectorized join finds exactly the weeks the original loop did"""
+    aligned = align_positions_with_returns(price_data, merchant_positions)
+    pd.testing.assert_frame_equal(
+        correct_positions(aligned),
+        reference_correct_positions(price_data, merchant_positions),
+        check_freq=False
+    )
+    assert merchant_hit_rate(aligned) == pytest.approx(aligned['Correct'].sum() / len(aligned))
+
+def test_lookback_and_frequency(price_data, merchant_positions):
+    """Any lookback window and resampling rule can be analysed"""
+    now = pd.Timestamp('2023-12-31', tz='America/New_York')
+    last_year = align_positions_with_returns(price_data, merchant_positions, lookback=365, now=now)
+    assert last_year.index.min() >= now - pd.Timedelta(days=365)
+
+    monthly = align_positions_with_returns(price_data, merchant_positions, lookback='730D', freq='M', now=now)
+    assert len(monthly) <= 24
+    assert monthly.index.min() >= now - pd.Timedelta(days=730)
+
+def test_empty_inputs(price_data):
+    """No positions means nothing to score"""
+    aligned = align_positions_with_returns(price_data, pd.DataFrame())
+    assert aligned.empty
+    assert np.isnan(merchant_hit_rate(aligned))
+    assert correct_positions(aligned).empty
+
+def test_trend_matches_daily_forward_fill(price_data, merchant_positions):
+    """Trading-day MA and Trend equal the old calendar-daily forward-filled version"""
+    # Drop a few sessions so holiday gaps are covered too
+    price_data = price_data.drop(price_data.index[[10, 11, 200, 201, 202, 500]])
+    open_interest = np.arange(len(merchant_positions)) * 1000 + 50000
+
+    price_trend, oi_weekly = analyze_trend_changes(price_data, open_interest, merchant_positions['Date'])
+
+    legacy = price_data.resample('D').last().ffill()
+    legacy['MA'] = legacy['Close'].rolling(window=50).mean()
+    legacy['Trend'] = np.where(legacy['Close'] > legacy['MA'], 'Up', 'Down')
+    legacy = legacy.loc[price_data.index]
+
+    assert len(price_trend) == len(price_data)
+    np.testing.assert_allclose(price_trend['MA'], legacy['MA'], rtol=1e-9)
+    assert (price_trend['Trend'] == legacy['Trend']).all()
+
+    # OI stays weekly; each bar carries the latest report on or before it
+    assert len(oi_weekly) == len(merchant_positions)
+    bar = price_data.index[300]
+    latest_report = merchant_positions['Date'][merchant_positions['Date'] <= bar.tz_localize(None)].iloc[-1]
+    assert price_trend.loc[bar, 'Open_Interest'] == oi_weekly.loc[latest_report, 'Open_Interest']
@@ -0,0 +1,92 @@
+import gzip
+import json
+import pytest
+import pandas as pd
+import sys
+import os
+from wsgiref.util import setup_testing_defaults
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.api import SignalAPI
+from commodity_charter.derived import DerivedStore
+from commodity_charter.ingest import ingest_cot_history
+from commodity_charter.prices import PriceCache
+from commodity_charter.store import COTStore
+from tests.conftest import FakeProvider
+
+@pytest.fixture
+def api(tmp_path, fetch_archive):
+    store = COTStore(root=str(tmp_path / 'store'))
+    ingest_cot_history(store, fetch_archive, first_year=2024, now=pd.Timestamp('2025-01-03 18:00', tz='America/New_York'))
+    return SignalAPI(store=store, derived=DerivedStore(root=str(tmp_path / 'derived')),
+                     prices=PriceCache(root=str(tmp_path / 'prices'), provider=FakeProvider()))
+
+def request(app, path, **headers):
+    """Call the WSGI app in-process and return (status, headers, body)"""
+    environ = {'PATH_INFO': path}
+    environ.update({f'HTTP_{name.upper()}': value for name, value in headers.items()})
+    setup_testing_defaults(environ)
+    captured = {}
+
+    def start_response(status, response_headers):
+        captured['status'], captured['headers'] = status, dict(response_headers)
+
+    body = b''.join(app(environ, start_response))
+    return captured['status'], captured['headers'], body
+
+def test_endpoints(api):
+    status, _, body = request(api, '/commodities')
+    assert status == '200 OK'
+    payload = json.loads(body)
+    assert payload['data_version'] == '2024-12-31'
+    assert {row['Commodity'] for row in payload['commodities']} == {'Gold', 'Corn', 'Crude Oil'}
+
+    # Names, slugs and symbols all resolve
+    for path in ('/commodities/Gold/signal', '/commodities/gold/signal', '/commodities/GC%3DF/signal'):
+        status, _, body = request(api, path)
+        assert status == '200 OK'
+        assert json.loads(body)['Commodity'] == 'Gold'
+
+    history = json.loads(request(api, '/commodities/crude-oil/history')[2])['history']
+    assert history[-1]['Date'] == '2025-01-05'  # week ending the Sunday after the 2024-12-31 report
+    positions = json.loads(request(api, '/commodities/corn/positions')[2])['positions']
+    assert positions[-1]['Date'] == '2024-12-31' and positions[-1]['Open_Interest'] > 0
+
+    assert request(api, '/commodities/unobtainium/signal')[0] == '404 Not Found'
+
+def test_etag_and_gzip(api):
+    status, headers, body = request(api, '/commodities/gold/history', accept_encoding='gzip, deflate')
+    assert headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(body))['commodity'] == 'Gold'
+
+    status, headers, body = request(api, '/commodities/gold/history', if_none_match=headers['ETag'])
+    assert status == '304 Not Modified' and body == b''
+
+    status, headers, _ = request(api, '/commodities/gold/history', accept_encoding='gzip;q=0')
+    assert status == '200 OK' and 'Content-Encoding' not in headers
+
+def test_responses_rebuilt_for_new_report(api, fetch_archive):
+    """A newer report in the store changes the data version and the ETags"""
+    etag = request(api, '/commodities')[1]['ETag']
+    assert request(api, '/commodities', if_none_match=etag)[0] == '304 Not Modified'
+
+    ingest_cot_history(api.store, lambda year: fetch_archive(2024).assign(
+        Date=lambda df: df['Date'] + pd.Timedelta(days=7),
+        **{'Report_Date_as_YYYY-MM-DD': lambda df: (df['Date'] + pd.Timedelta(days=7)).dt.strftime('%Y-%m-%d')}
+    ) if year == 2025 else fetch_archive(year), first_year=2024,
+        now=pd.Timestamp('2025-01-10 18:00', tz='America/New_York'))
+    api.refresh(force=True)
+
+    assert api.version == '2025-01-07'
+    assert request(api, '/commodities', if_none_match=etag)[0] == '200 OK'
+
+def test_metrics_endpoint(api):
+    request(api, '/commodities/gold/signal')
+    status, headers, body = request(api, '/metrics')
+    assert status == '200 OK' and headers['Content-Type'].startswith('text/plain')
+    text = body.decode()
+    # The registry is process-wide, so other tests' calls are counted too
+    assert 'commodity_charter_stage_seconds_count{stage="api_build_responses"}' in text
+    assert 'commodity_charter_stage_seconds_sum{stage="cot_store_read"}' in text
@@ -11,7 +11,9 @@ warnings.filterwarnings("ignore")
 # Add the parent directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import get_price_data, load_cot_signals, get_position_signal
+from commodity_charter import prices
+from commodity_charter.prices import get_price_data
+from commodity_charter.signals import load_cot_signals, get_position_signal
 
 @pytest.fixture
 def mock_cot_data():
@@ -55,8 +57,11 @@ def test_get_position_signal():
     signal, reasons = get_position_signal(50.0, 50.0, signals_df, 'TEST')
     assert signal == 'NEUTRAL'
 
-def test_get_price_data():
+def test_get_price_data(tmp_path, monkeypatch):
     """Test price data retrieval"""
+    # Keep the shared cache (and its coverage file) out of data/price_cache
+    monkeypatch.setenv('PRICE_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(prices, '_default_cache', None)
     end_date = pd.Timestamp.now(tz='America/New_York')
     start_date = end_date - pd.Timedelta(days=30)
     
@@ -0,0 +1,135 @@
+import threading
+import pytest
+import pandas as pd
+import sys
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.archives import ArchiveFetchError, ArchiveFetcher
+from commodity_charter.ingest import ingest_cot_history
+from commodity_charter.store import COTStore
+
+class CFTCStandIn(BaseHTTPRequestHandler):
+    """Serves the fixture archives with an ETag; `failures` queues scripted bad responses"""
+    archive_dir = None
+    failures = []
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        path = os.path.join(self.archive_dir, os.path.basename(self.path))
+        if not os.path.exists(path):
+            self.send_error(404)
+            return
+        with open(path, 'rb') as f:
+            content = f.read()
+        etag = f'"{len(content)}-{int(os.path.getmtime(path))}"'
+
+        failure = self.failures.pop(0) if self.failures else None
+        if failure == 503:
+            self.send_error(503)
+            return
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        # A truncated transfer stops half way and drops the connection
+        self.wfile.write(content[:len(content) // 2] if failure == 'truncate' else content)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def cftc_server(cot_archive_dir):
+    CFTCStandIn.archive_dir = str(cot_archive_dir)
+    CFTCStandIn.failures, CFTCStandIn.requests = [], []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CFTCStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/fut_disagg_txt_{{year}}.zip'
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def fetcher(tmp_path, cftc_server):
+    return ArchiveFetcher(root=str(tmp_path / 'local'), url_template=cftc_server, backoff=0.01, timeout=5)
+
+def test_conditional_refetch_skips_unchanged_archives(fetcher, tmp_path):
+    store = COTStore(root=str(tmp_path / 'store'))
+    now = pd.Timestamp('2024-12-31 18:00', tz='America/New_York')
+    added = ingest_cot_history(store, fetcher, first_year=2023, now=now)
+    assert added == len(store.read()) and store.years() == [2023, 2024]
+    assert [etag for _, etag in CFTCStandIn.requests] == [None, None]
+
+    # The current year is revalidated with its ETag; a 304 is neither downloaded nor parsed
+    assert fetcher(2024).empty
+    assert CFTCStandIn.requests[-1][1] == fetcher.metadata()['2024']['etag']
+    assert fetcher.fetch(2024) == (fetcher.path(2024), False)
+
+def test_retries_transient_failures(fetcher):
+    CFTCStandIn.failures = [503, 'truncate']
+    path, changed = fetcher.fetch(2024)
+    assert changed and len(CFTCStandIn.requests) == 3
+    assert len(fetcher(2024)) > 0
+    # Nothing but the archive and its metadata is left behind
+    assert sorted(os.listdir(fetcher.root)) == ['_archives.json', 'fut_disagg_txt_2024.zip']
+
+def test_falls_back_to_local_snapshot(fetcher):
+    fetcher.fetch(2024)
+    snapshot = open(fetcher.path(2024), 'rb').read()
+
+    # Touch the served file so the local ETag is stale, then fail every attempt
+    os.utime(os.path.join(CFTCStandIn.archive_dir, 'fut_disagg_txt_2024.zip'), (0, 0))
+    CFTCStandIn.failures = ['truncate'] * (fetcher.retries + 1)
+    assert fetcher.fetch(2024) == (fetcher.path(2024), False)
+    assert open(fetcher.path(2024), 'rb').read() == snapshot
+
+    # Without a snapshot the failure surfaces; client errors aren't retried
+    requests_before = len(CFTCStandIn.requests)
+    with pytest.raises(ArchiveFetchError):
+        fetcher.fetch(1999)
+    assert len(CFTCStandIn.requests) == requests_before + 1
+
+def test_backfill_skips_missing_year(fetcher, tmp_path):
+    """A year the server answers with 404 doesn't stop the rest of the backfill"""
+    store = COTStore(root=str(tmp_path / 'store'))
+    now = pd.Timestamp('2024-12-31 18:00', tz='America/New_York')
+    added = ingest_cot_history(store, fetcher, first_year=2021, now=now)
+    assert store.years() == [2022, 2023, 2024] and added == len(store.read())
+    assert [path for path, _ in CFTCStandIn.requests][0].endswith('_2021.zip')
+    assert not store.needs_refresh(now=now)
+
+    # A current year that can't be fetched is still reported, once the rest is stored
+    os.remove(os.path.join(CFTCStandIn.archive_dir, 'fut_disagg_txt_2024.zip'))
+    store = COTStore(root=str(tmp_path / 'fresh'))
+    with pytest.raises(ArchiveFetchError, match='2024'):
+        ingest_cot_history(store, ArchiveFetcher(root=str(tmp_path / 'empty'), url_template=fetcher.url_template),
+                           first_year=2022, now=now)
+    assert store.years() == [2022, 2023]
+
+class FakeTransport:
+    """Injected transport that never connects"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        self.calls += 1
+        raise ConnectionError(f"offline: {url}")
+
+def test_injected_transport(tmp_path):
+    transport, delays = FakeTransport(), []
+    fetcher = ArchiveFetcher(root=str(tmp_path), session=transport, retries=2, backoff=1, sleep=delays.append)
+    with pytest.raises(ArchiveFetchError):
+        fetcher.fetch(2024)
+    assert transport.calls == 3 and delays == [1, 2]
@@ -0,0 +1,69 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.analysis import to_market_tz
+from commodity_charter.backtest import backtest_grid, backtest_signals, position_panel, threshold_grid
+from commodity_charter.markets import category_positions
+from commodity_charter.signals import get_position_signal
+
+@pytest.fixture
+def signals_df():
+    return pd.DataFrame({
+        'Commodity': ['Gold', 'Corn', 'Crude Oil'],
+        'Bullish_Min': [20, 30, 0], 'Bullish_Max': [40, 50, 100],
+        'Bearish_Min': [25, 10, 0], 'Bearish_Max': [35, 30, 0]
+    })
+
+@pytest.mark.parametrize('statistic_ranges', [{}, {'Bullish_COT_Index_Min': 30, 'Bearish_Z_Score_Max': 0.5}])
+def test_backtest_matches_scalar_replay(cot_history, weekly_close_panel, signals_df, statistic_ranges):
+    """Vectorized metrics equal a report-by-report replay of get_position_signal entered the week after release"""
+    signals_df = signals_df.assign(**statistic_ranges)
+    report = backtest_signals(cot_history, signals_df, weekly_close_panel, horizon=4).set_index('Commodity')
+    positions = category_positions(cot_history)
+    returns = weekly_close_panel.shift(-4) / weekly_close_panel - 1
+
+    for commodity in ['Gold', 'Corn', 'Crude Oil']:
+        trades = []
+        for _, row in positions[positions['Commodity'] == commodity].iterrows():
+            signal, _ = get_position_signal(row['Merchant_Short_Pct'], row['Merchant_Long_Pct'], signals_df,
+                                             commodity, row['Merchant_COT_Index'], row['Merchant_Z_Score'])
+            # Published Friday after the close of the report's week: enter at the next week's close
+            entry = to_market_tz([row['Date']])[0] + pd.offsets.Week(weekday=6) + pd.DateOffset(weeks=1)
+            forward = returns[commodity].get(entry, np.nan)
+            if signal != 'NEUTRAL' and not np.isnan(forward):
+                trades.append(forward if signal == 'BULLISH' else -forward)
+        trades = np.array(trades)
+        equity = np.cumsum(trades)
+        drawdown = (np.maximum.accumulate(np.maximum(equity, 0)) - equity).max()
+
+        row = report.loc[commodity]
+        assert row['Signals'] == len(trades)
+        assert row['Hit_Rate'] == pytest.approx((trades > 0).mean() * 100)
+        assert row['Avg_Return'] == pytest.approx(trades.mean() * 100)
+        assert row['Max_Drawdown'] == pytest.approx(drawdown * 100)
+
+def test_report_is_not_traded_in_its_own_week(cot_history):
+    short_pct, _ = position_panel(cot_history)
+    first_report = to_market_tz(category_positions(cot_history, window=None)['Date']).min()
+    assert short_pct.index[0] >= first_report
+    assert short_pct.iloc[0].isna().all() and short_pct.iloc[1].notna().all()
+
+def test_grid_matches_single_runs(cot_history, weekly_close_panel):
+    """Each grid combination scores the same as backtesting those ranges alone"""
+    grid = threshold_grid([10, 20, 30], [40, 50], [10, 30], [20, 60])
+    assert len(grid) == 3 * 2 * 2 * 2 - 3 * 2  # (30, 20) bearish ranges are dropped
+    results = backtest_grid(cot_history, weekly_close_panel, grid, chunk_size=5)
+    assert len(results) == len(grid) * 3
+
+    for combination in (0, 7, len(grid) - 1):
+        bounds = grid.iloc[combination]
+        signals_df = pd.DataFrame([{'Commodity': c, **bounds} for c in ['Corn', 'Crude Oil', 'Gold']])
+        single = backtest_signals(cot_history, signals_df, weekly_close_panel).set_index('Commodity')
+        rows = results[results['Combination'] == combination].set_index('Commodity')
+        pd.testing.assert_frame_equal(rows[single.columns], single, check_dtype=False)
@@ -0,0 +1,35 @@
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+import bench_pipeline
+
+def test_pipeline_stages_run_offline(tmp_path):
+    """Every stage runs on synthetic data, including markets beyond the charted ones"""
+    stages, rows = bench_pipeline.build_stages(1, 20, str(tmp_path))
+    assert rows == 52 * 20
+    assert len(stages['cot_store_read']()) == rows
+    positions = stages['merchant_positions']()
+    assert len(positions) == 20 and all(len(frame) == 52 for frame in positions)
+    for name in ('signal_history', 'merchant_behavior', 'trend_changes'):
+        assert len(stages[name]()) == 20
+
+def test_check_flags_regressions():
+    baseline = {'calibration_s': 0.1, 'results': {
+        'trend_changes|20|10': {'seconds': 0.5, 'peak_mb': 10.0},
+        'signal_history|20|10': {'seconds': 0.5, 'peak_mb': 10.0},
+    }}
+    results = pd.DataFrame([
+        {'stage': 'trend_changes', 'years': 20, 'markets': 10, 'seconds': 1.5, 'peak_mb': 10.0},
+        {'stage': 'signal_history', 'years': 20, 'markets': 10, 'seconds': 0.6, 'peak_mb': 20.0},
+        {'stage': 'merchant_behavior', 'years': 20, 'markets': 10, 'seconds': 9.0, 'peak_mb': 99.0},
+    ])
+    failures = bench_pipeline.check(results, baseline, calibration=0.1)
+    assert len(failures) == 2
+    assert failures[0].startswith('trend_changes|20|10') and 's >' in failures[0]
+    assert failures[1].startswith('signal_history|20|10') and 'MB >' in failures[1]
+    # A machine half as fast gets twice the time budget
+    assert bench_pipeline.check(results.iloc[:1], baseline, calibration=0.2) == []
@@ -0,0 +1,35 @@
+import pytest
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.cftc import COT_SCHEMA, parse_cot_archive
+
+@pytest.fixture
+def archive_bytes(cot_archive_dir):
+    with open(cot_archive_dir / 'fut_disagg_txt_2024.zip', 'rb') as f:
+        return f.read()
+
+@pytest.mark.parametrize('engine', ['c', 'pyarrow'])
+def test_parse_prunes_and_types_columns(archive_bytes, engine):
+    """Only the schema columns are parsed, with compact dtypes"""
+    cot_df = parse_cot_archive(archive_bytes, engine=engine)
+
+    assert list(cot_df.columns) == list(COT_SCHEMA) + ['Date']
+    assert cot_df['Market_and_Exchange_Names'].dtype == 'category'
+    assert cot_df['Open_Interest_All'].dtype == 'int32'
+    assert cot_df['Pct_of_OI_Prod_Merc_Short_All'].dtype == 'float32'
+    assert pd.api.types.is_datetime64_any_dtype(cot_df['Date'])
+
+    # Market codes keep their leading zeros
+    assert '002602' in set(cot_df['CFTC_Contract_Market_Code'])
+
+def test_engines_agree(archive_bytes):
+    """The pyarrow engine parses the same frame as the C engine"""
+    pd.testing.assert_frame_equal(
+        parse_cot_archive(archive_bytes, engine='c'),
+        parse_cot_archive(archive_bytes, engine='pyarrow')
+    )
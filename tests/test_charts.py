@@ -0,0 +1,88 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.analysis import analyze_trend_changes
+from commodity_charter.charts import build_price_figure
+
+def make_prices():
+    index = pd.bdate_range('2024-01-01', periods=120, tz='America/New_York')
+    close = np.linspace(100, 130, len(index))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': 1000}, index=index)
+
+def test_build_price_figure():
+    """Price, moving average and open interest traces in the two panels"""
+    price_data = make_prices()
+    dates = pd.date_range('2024-01-02', periods=17, freq='W-TUE')
+    price_trend, oi_weekly = analyze_trend_changes(price_data, np.arange(17) * 1000, dates)
+
+    fig = build_price_figure(price_data, price_trend, oi_weekly, 'Gold', 'Candlestick')
+    assert [trace.type for trace in fig.data] == ['candlestick', 'scattergl', 'scattergl']
+    assert fig.layout.title.text == 'Gold Analysis'
+
+    fig = build_price_figure(price_data, price_trend, oi_weekly, 'Gold', 'Line')
+    assert fig.data[0].type == 'scattergl'
+
+    # COT index and z-score get a third panel with the z-score on its own axis
+    cot_stats = pd.DataFrame({'COT_Index': np.linspace(0, 100, 17), 'Z_Score': np.linspace(-2, 2, 17)},
+                             index=dates.tz_localize(None))
+    fig = build_price_figure(price_data, price_trend, oi_weekly, 'Gold', cot_stats=cot_stats,
+                             cot_label='Managed Money')
+    assert [trace.name for trace in fig.data[3:]] == ['Managed Money COT Index', 'Managed Money Z-Score']
+    assert fig.data[3].yaxis == 'y3' and fig.data[4].yaxis == 'y4'
+
+    # Without enough history for the statistics the panel is left out
+    fig = build_price_figure(price_data, price_trend, oi_weekly, 'Gold', cot_stats=cot_stats * np.nan)
+    assert len(fig.data) == 3
+
+def test_lttb_keeps_endpoints_and_extremes():
+    """LTTB returns the requested number of points, including ends and a spike"""
+    from commodity_charter.charts import lttb_indices
+    x = np.arange(10000)
+    y = np.sin(x / 500.0)
+    y[5000] = 10
+    keep = lttb_indices(x, y, 200)
+    assert len(keep) == 200
+    assert keep[0] == 0 and keep[-1] == 9999
+    assert 5000 in keep
+    assert np.all(np.diff(keep) > 0)
+
+def test_minmax_keeps_bucket_extremes():
+    from commodity_charter.charts import minmax_indices
+    y = np.random.RandomState(0).normal(size=10000)
+    keep = minmax_indices(y, 100)
+    assert len(keep) <= 102
+    assert y.argmax() in keep and y.argmin() in keep
+
+def test_long_history_is_bounded():
+    """Multi-year ranges aggregate candles and downsample lines to the limits"""
+    from commodity_charter.charts import MAX_CANDLES, MAX_POINTS, candle_rule
+    index = pd.bdate_range('2000-01-03', '2024-12-31', tz='America/New_York')
+    close = np.linspace(20, 120, len(index))
+    price_data = pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                               'Volume': 1000}, index=index)
+    dates = pd.date_range('2000-01-04', '2024-12-31', freq='W-TUE')
+    price_trend, oi_weekly = analyze_trend_changes(price_data, np.arange(len(dates)), dates)
+
+    assert candle_rule(price_data) == 'M'
+    fig = build_price_figure(price_data, price_trend, oi_weekly, 'Gold', 'Candlestick')
+    candles = fig.data[0]
+    assert len(candles.x) <= MAX_CANDLES
+    assert candles.high[0] == price_data.loc['2000-01', 'High'].max()
+    assert [trace.type for trace in fig.data[1:]] == ['scattergl', 'scattergl']
+    assert all(len(trace.x) <= MAX_POINTS for trace in fig.data[1:])
+
+    fig = build_price_figure(price_data, price_trend, oi_weekly, 'Gold', 'Candlestick', render_mode='full')
+    assert len(fig.data[0].x) == len(price_data)
+    assert fig.data[1].type == 'scatter'
+
+    # A narrow date range small enough to fit is drawn at full resolution
+    window = slice('2024-06-01', '2024-12-31')
+    fig = build_price_figure(price_data.loc[window], price_trend.loc[window], oi_weekly.loc[window],
+                             'Gold', 'Candlestick')
+    assert len(fig.data[0].x) == len(price_data.loc['2024-06-01':'2024-12-31'])
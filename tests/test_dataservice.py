@@ -0,0 +1,77 @@
+import threading
+import time
+import pandas as pd
+import pytest
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.dataservice import DataService
+from commodity_charter.metrics import payload_bytes
+
+def frame(rows):
+    return pd.DataFrame({'x': range(rows)}, dtype='int64')
+
+def test_concurrent_misses_share_one_load():
+    """Sessions missing the same key at once wait for a single load and get the same frame"""
+    service = DataService()
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    @service.cached('get_cftc_data')
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return frame(100)
+
+    with ThreadPoolExecutor(8) as pool:
+        first = pool.submit(load)
+        started.wait(5)
+        rest = [pool.submit(load) for _ in range(7)]
+        while service.coalesced < 7:
+            time.sleep(0.01)
+        release.set()
+        results = [first.result()] + [future.result() for future in rest]
+
+    assert len(calls) == 1 and service.misses == 1 and service.hits == 7
+    assert all(result is results[0] for result in results)
+    assert load() is results[0]
+
+def test_failed_load_reaches_waiters_and_is_retried():
+    service = DataService()
+    attempts = []
+
+    def load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("CFTC unreachable")
+        return frame(10)
+
+    with pytest.raises(ConnectionError):
+        service.get('cftc', load)
+    assert len(service) == 0
+    assert len(service.get('cftc', load)) == 10 and len(attempts) == 2
+
+def test_memory_budget_evicts_least_recently_used():
+    size = payload_bytes(frame(1000))
+    now = [0.0]
+    service = DataService(budget_bytes=int(size * 2.5), clock=lambda: now[0])
+
+    for key in ['a', 'b']:
+        service.get(key, lambda: frame(1000))
+    service.get('a', pytest.fail)
+    service.get('c', lambda: frame(1000))
+    assert 'b' not in service and 'a' in service and 'c' in service
+    assert service.resident_bytes == 2 * size <= service.budget_bytes and service.evictions == 1
+
+    # Results larger than the whole budget are returned but never held
+    assert len(service.get('huge', lambda: frame(10000))) == 10000
+    assert 'huge' not in service and service.resident_bytes == 2 * size
+
+    # Expired entries are reloaded
+    service.get('d', lambda: frame(10), ttl=60)
+    now[0] = 61
+    assert len(service.get('d', lambda: frame(20), ttl=60)) == 20
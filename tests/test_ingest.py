@@ -0,0 +1,78 @@
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.cftc import HISTORY_ARCHIVE
+from commodity_charter.ingest import ingest_cot_history
+from commodity_charter.store import COTStore
+from tests.conftest import make_cot_report, write_cot_archive
+
+def test_backfill_all_years(tmp_path, fetch_archive, fetched_years):
+    """Every yearly archive is loaded into the store"""
+    store = COTStore(root=str(tmp_path / 'store'))
+    added = ingest_cot_history(store, fetch_archive, first_year=2022,
+                               now=pd.Timestamp('2024-12-31', tz='America/New_York'))
+
+    assert fetched_years == [2022, 2023, 2024]
+    assert store.years() == [2022, 2023, 2024]
+    assert added == len(store.read())
+    assert store.latest_report() == pd.Timestamp('2024-12-31')
+
+def test_incremental_append(tmp_path, cot_archive_dir, fetch_archive, fetched_years):
+    """A refresh only adds the report weeks published since the last run"""
+    dates = pd.date_range('2024-01-01', '2024-12-31', freq='W-TUE')
+    full_year = make_cot_report(dates, seed=2024)
+    write_cot_archive(cot_archive_dir / 'fut_disagg_txt_2024.zip',
+                      full_year[full_year['Report_Date_as_YYYY-MM-DD'] <= '2024-06-25'])
+
+    store = COTStore(root=str(tmp_path / 'store'))
+    ingest_cot_history(store, fetch_archive, first_year=2022,
+                       now=pd.Timestamp('2024-06-29', tz='America/New_York'))
+    rows_before = len(store.read())
+
+    # CFTC republishes the 2024 archive with two more weeks
+    write_cot_archive(cot_archive_dir / 'fut_disagg_txt_2024.zip',
+                      full_year[full_year['Report_Date_as_YYYY-MM-DD'] <= '2024-07-09'])
+    del fetched_years[:]
+    added = ingest_cot_history(store, fetch_archive, first_year=2022,
+                               now=pd.Timestamp('2024-07-13', tz='America/New_York'))
+
+    assert fetched_years == [2024]
+    assert added == 2 * 4
+    stored = store.read()
+    assert len(stored) == rows_before + added
+    assert not stored.duplicated(['CFTC_Contract_Market_Code', 'Date']).any()
+    assert store.latest_report() == pd.Timestamp('2024-07-09')
+
+def test_year_rollover(tmp_path, fetch_archive, fetched_years):
+    """The first report of a new year starts a new year partition"""
+    store = COTStore(root=str(tmp_path / 'store'))
+    ingest_cot_history(store, fetch_archive, first_year=2022,
+                       now=pd.Timestamp('2023-12-31', tz='America/New_York'))
+    assert store.years() == [2022, 2023]
+
+    del fetched_years[:]
+    ingest_cot_history(store, fetch_archive, first_year=2022,
+                       now=pd.Timestamp('2024-01-06', tz='America/New_York'))
+    assert fetched_years == [2023, 2024]
+    assert store.years() == [2022, 2023, 2024]
+
+def test_backfill_before_yearly_archives(tmp_path, cot_archive_dir, fetch_archive, fetched_years):
+    """Years CFTC only ships in the combined history archive are split out of it, fetched once"""
+    write_cot_archive(cot_archive_dir / f'fut_disagg_txt_{HISTORY_ARCHIVE}.zip',
+                      make_cot_report(pd.date_range('2014-01-01', '2016-12-31', freq='W-TUE')))
+    write_cot_archive(cot_archive_dir / 'fut_disagg_txt_2017.zip',
+                      make_cot_report(pd.date_range('2017-01-01', '2017-12-31', freq='W-TUE')))
+
+    store = COTStore(root=str(tmp_path / 'store'))
+    now = pd.Timestamp('2017-12-31', tz='America/New_York')
+    ingest_cot_history(store, fetch_archive, first_year=2015, now=now)
+    assert fetched_years == [HISTORY_ARCHIVE, 2017]
+    assert store.years() == [2015, 2016, 2017]
+
+    del fetched_years[:]
+    ingest_cot_history(store, fetch_archive, first_year=2015, now=now)
+    assert fetched_years == [2017]
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.markets import (
+    MERCHANT_COLUMNS, TRADER_CATEGORIES, MarketIndex, canonical_category, category_positions,
+    commodity_market_codes, commodity_symbols
+)
+from commodity_charter.metrics import payload_bytes
+
+@pytest.fixture
+def cot_data(cot_2024):
+    # Shuffle so the index has to restore date order itself
+    return cot_2024.sample(frac=1, random_state=0)
+
+def test_every_charted_commodity_is_mapped():
+    """Each selectable commodity has CFTC market codes"""
+    assert set(commodity_symbols) <= set(commodity_market_codes)
+
+def test_market_index_exact_match(cot_data):
+    """Gold resolves to the COMEX gold contract only, not MICRO GOLD"""
+    index = MarketIndex(cot_data)
+    gold = index.positions('Gold')
+
+    expected = cot_data[cot_data['CFTC_Contract_Market_Code'] == '088691']
+    assert len(gold) == len(expected)
+    assert gold['Date'].is_monotonic_increasing
+    assert list(gold.columns[:6]) == MERCHANT_COLUMNS
+    assert {'Managed_Money_Net', 'Swap_Spread', 'Non_Reportable_COT_Index'} <= set(gold.columns)
+    # Sized like a frame when cached by the data service
+    assert payload_bytes(index) == sum(payload_bytes(index.positions(c)) for c in index.commodities()) > 0
+
+def test_market_index_missing_commodity(cot_data):
+    """Commodities without reports give an empty frame"""
+    index = MarketIndex(cot_data)
+    assert 'Corn' in index
+    assert 'Silver' not in index
+    assert index.positions('Silver').empty
+    assert MarketIndex(pd.DataFrame()).positions('Gold').empty
+
+def test_category_positions(cot_history):
+    """Net, weekly change and COT index of every category match a per-market recomputation"""
+    cot_data = cot_history.sample(frac=1, random_state=1)
+    positions = category_positions(cot_data, window=52)
+
+    assert set(positions['Commodity']) == {'Gold', 'Corn', 'Crude Oil'}
+    for commodity, market in positions.groupby('Commodity'):
+        reports = cot_data[cot_data['CFTC_Contract_Market_Code'].isin(commodity_market_codes[commodity])]
+        reports = reports.sort_values('Date')
+        assert market['Date'].tolist() == reports['Date'].tolist()
+        for category, info in TRADER_CATEGORIES.items():
+            net = (reports[info['long']].astype(float) - reports[info['short']]).reset_index(drop=True)
+            market_net = market[f'{category}_Net'].reset_index(drop=True)
+            pd.testing.assert_series_equal(market_net, net, check_names=False)
+            pd.testing.assert_series_equal(market[f'{category}_Net_Change'].reset_index(drop=True),
+                                           net.diff(), check_names=False)
+            expected_index = net.rolling(52, min_periods=52).apply(lambda w: (w <= w[-1]).mean() * 100, raw=True)
+            pd.testing.assert_series_equal(market[f'{category}_COT_Index'].reset_index(drop=True),
+                                           expected_index, check_names=False)
+        short_pct = reports['M_Money_Positions_Short_All'] / reports['Open_Interest_All'] * 100
+        assert np.allclose(market['Managed_Money_Short_Pct'], short_pct)
+
+def test_canonical_category():
+    assert canonical_category('Managed Money') == 'Managed_Money'
+    assert canonical_category('m_money') == 'Managed_Money'
+    assert canonical_category('Producer/Merchant') == 'Merchant'
+    assert canonical_category('speculators') is None
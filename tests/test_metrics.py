@@ -0,0 +1,80 @@
+import functools
+import pandas as pd
+import pytest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.memo import LRUCache
+from commodity_charter.metrics import Metrics, payload_bytes
+
+def test_spans_record_calls_and_failures():
+    metrics = Metrics()
+
+    @metrics.timed()
+    def work(fail=False):
+        if fail:
+            raise ValueError
+        return 1
+
+    work()
+    with pytest.raises(ValueError):
+        work(fail=True)
+    with metrics.span('parse'):
+        pass
+
+    spans = {row['Stage']: row for row in metrics.snapshot()['spans']}
+    assert spans['work']['Calls'] == 2 and spans['parse']['Calls'] == 1
+    assert spans['work']['Max_ms'] >= spans['work']['Last_ms'] >= 0
+
+def test_instrumented_cache_counts_hits_misses_and_sizes():
+    metrics = Metrics()
+    calls = []
+
+    @metrics.instrument_cache('frames', functools.lru_cache(maxsize=4))
+    def load(n):
+        calls.append(n)
+        return pd.DataFrame({'x': range(n)})
+
+    load(10), load(10), load(20), load(10)
+    assert calls == [10, 20]
+    assert metrics.snapshot()['caches'] == [{'Cache': 'frames', 'Hits': 2, 'Misses': 2, 'Hit_Rate': 50.0}]
+    sizes = metrics.snapshot()['payloads'][0]
+    assert sizes['Bytes'] == payload_bytes(pd.DataFrame({'x': range(20)})) == sizes['Max_Bytes']
+    assert load.__name__ == 'load'
+
+    # Existing caches are exported as they count
+    lru = LRUCache(2)
+    metrics.register_cache('views', lru)
+    lru.get_or_compute('a', lambda: 1), lru.get_or_compute('a', lambda: 1)
+    assert {'Cache': 'views', 'Hits': 1, 'Misses': 1, 'Hit_Rate': 50.0} in metrics.snapshot()['caches']
+
+def test_prometheus_text():
+    metrics = Metrics()
+    metrics.observe('cot_parse', 0.25)
+    metrics.observe('cot_parse', 0.75)
+    metrics.count_cache('get_cftc_data', hit=True)
+    metrics.record_size('figure "json"', 1500)
+
+    lines = metrics.prometheus_text().splitlines()
+    assert '# TYPE commodity_charter_stage_seconds summary' in lines
+    assert 'commodity_charter_stage_seconds_sum{stage="cot_parse"} 1.0' in lines
+    assert 'commodity_charter_stage_seconds_count{stage="cot_parse"} 2' in lines
+    assert 'commodity_charter_stage_seconds_max{stage="cot_parse"} 0.75' in lines
+    assert 'commodity_charter_cache_requests_total{cache="get_cftc_data",result="hit"} 1' in lines
+    assert 'commodity_charter_cache_requests_total{cache="get_cftc_data",result="miss"} 0' in lines
+    assert 'commodity_charter_payload_bytes{payload="figure \\"json\\""} 1500' in lines
+
+    # Large counters and sizes are exported exactly, not rounded to 6 digits
+    lru = LRUCache()
+    lru.hits, lru.misses = 1234567, 3
+    metrics.register_cache('get_cftc_data', lru)
+    metrics.record_size('cot_history', 123456789)
+    metrics.observe('cot_parse', 1234567.125)
+    lines = metrics.prometheus_text().splitlines()
+    assert 'commodity_charter_cache_requests_total{cache="get_cftc_data",result="hit"} 1234567' in lines
+    assert 'commodity_charter_cache_requests_total{cache="get_cftc_data",result="miss"} 3' in lines
+    assert 'commodity_charter_payload_bytes{payload="cot_history"} 123456789' in lines
+    assert 'commodity_charter_stage_seconds_sum{stage="cot_parse"} 1234568.125' in lines
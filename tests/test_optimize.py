@@ -0,0 +1,31 @@
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.backtest import backtest_grid, threshold_grid
+from commodity_charter.optimize import format_signal_ranges, optimize_ranges
+from commodity_charter.signals import load_cot_signals
+
+def test_optimizer_picks_best_grid_row(cot_history, weekly_close_panel, tmp_path):
+    """Pool workers on the shared panel find the same optimum as the in-process grid backtest"""
+    grid = threshold_grid([0, 10, 20], [30, 60], [0, 15, 30], [45, 60])
+
+    optimized = optimize_ranges(cot_history, weekly_close_panel, grid, workers=2, min_signals=5, chunk_size=7)
+    assert list(optimized['Commodity']) == ['Corn', 'Crude Oil', 'Gold']
+    assert optimized.equals(optimize_ranges(cot_history, weekly_close_panel, grid, workers=1, min_signals=5, chunk_size=7))
+
+    results = backtest_grid(cot_history, weekly_close_panel, grid)
+    for row in optimized.itertuples():
+        candidates = results[(results['Commodity'] == row.Commodity) & (results['Signals'] >= 5)]
+        assert row.Hit_Rate == candidates['Hit_Rate'].max()
+
+    # The candidate file loads like the hand-tuned one
+    path = tmp_path / 'cot_signals.candidate.csv'
+    format_signal_ranges(optimized).to_csv(path, index=False)
+    loaded = load_cot_signals(path)
+    np.testing.assert_allclose(loaded['Bullish_Min'], optimized['Bullish_Min'])
+    np.testing.assert_allclose(loaded['Bearish_Max'], optimized['Bearish_Max'])
+    assert set(loaded['Category']) == {'Merchant'}
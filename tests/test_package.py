@@ -0,0 +1,21 @@
+import subprocess
+import sys
+import os
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CORE_MODULES = [
+    'commodity_charter.analysis', 'commodity_charter.charts', 'commodity_charter.markets',
+    'commodity_charter.prices', 'commodity_charter.screener', 'commodity_charter.signals',
+    'commodity_charter.store', 'commodity_charter.views', 'commodity_charter.worker',
+]
+
+def test_core_imports_without_ui_dependencies():
+    """Importing the core pulls in neither Streamlit nor plotly/yfinance/requests"""
+    script = (
+        "import sys\n"
+        + "".join(f"import {module}\n" for module in CORE_MODULES)
+        + "print(','.join(m for m in ('streamlit', 'plotly', 'yfinance', 'requests') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
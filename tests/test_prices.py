@@ -0,0 +1,143 @@
+import threading
+import pytest
+import pandas as pd
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.prices import PriceCache, missing_ranges
+from tests.conftest import FakeProvider
+
+@pytest.fixture
+def provider():
+    return FakeProvider()
+
+NOW = pd.Timestamp('2024-03-15 12:00', tz='America/New_York')
+
+def test_missing_ranges():
+    day = pd.Timestamp
+    covered = [(day('2024-01-10'), day('2024-01-20'))]
+    assert missing_ranges(covered, day('2024-01-01'), day('2024-01-31')) == [
+        (day('2024-01-01'), day('2024-01-10')), (day('2024-01-20'), day('2024-01-31'))
+    ]
+    assert missing_ranges(covered, day('2024-01-12'), day('2024-01-15')) == []
+
+def test_repeat_request_hits_cache(tmp_path, provider):
+    """A range that was fetched once is served from the cache"""
+    cache = PriceCache(root=str(tmp_path), provider=provider)
+    first = cache.get('CL=F', '2024-01-01', '2024-02-01', now=NOW)
+    second = cache.get('CL=F', '2024-01-01', '2024-02-01', now=NOW)
+
+    assert len(provider.calls) == 1
+    assert not first.empty
+    pd.testing.assert_frame_equal(first, second)
+    assert list(first.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def test_only_gaps_are_fetched(tmp_path, provider):
+    """Widening the range fetches just the days not seen before"""
+    cache = PriceCache(root=str(tmp_path), provider=provider)
+    cache.get('CL=F', '2024-01-10', '2024-02-01', now=NOW)
+    prices = cache.get('CL=F', '2024-01-01', '2024-02-15', now=NOW)
+
+    assert provider.calls[1:] == [
+        (('CL=F',), pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-10')),
+        (('CL=F',), pd.Timestamp('2024-02-01'), pd.Timestamp('2024-02-15')),
+    ]
+    assert prices.index.min() >= pd.Timestamp('2024-01-01', tz='America/New_York')
+    assert prices.index.is_unique
+
+def test_symbols_are_batched(tmp_path, provider):
+    """Symbols missing the same days go out in one request"""
+    cache = PriceCache(root=str(tmp_path), provider=provider)
+    prices = cache.get_many(['CL=F', 'GC=F', 'ZC=F'], '2024-01-01', '2024-02-01', now=NOW)
+
+    assert len(provider.calls) == 1
+    assert set(provider.calls[0][0]) == {'CL=F', 'GC=F', 'ZC=F'}
+    assert all(not df.empty for df in prices.values())
+
+def test_cache_persists_and_refreshes_live_day(tmp_path, provider):
+    """A new cache instance reuses the files; today's bar is refetched after the refresh interval"""
+    PriceCache(root=str(tmp_path), provider=provider).get('CL=F', '2024-03-01', NOW, now=NOW)
+    cache = PriceCache(root=str(tmp_path), provider=provider)
+
+    cache.get('CL=F', '2024-03-01', NOW, now=NOW + pd.Timedelta(minutes=5))
+    assert len(provider.calls) == 1
+
+    cache.get('CL=F', '2024-03-01', NOW, now=NOW + pd.Timedelta(hours=1))
+    assert provider.calls[-1][1:] == (pd.Timestamp('2024-03-15'), pd.Timestamp('2024-03-16'))
+
+def test_sees_bars_written_by_another_process(tmp_path, provider):
+    """Bars another instance adds to the shared files are served without a refetch"""
+    app = PriceCache(root=str(tmp_path), provider=provider)
+    assert app.get('CL=F', '2024-01-01', '2024-01-10', now=NOW).index.max().day == 9
+
+    worker = PriceCache(root=str(tmp_path), provider=provider)
+    worker.get('CL=F', '2024-01-01', '2024-01-20', now=NOW)
+    calls = len(provider.calls)
+
+    prices = app.get('CL=F', '2024-01-01', '2024-01-20', now=NOW)
+    assert len(provider.calls) == calls
+    assert prices.index.max() == pd.Timestamp('2024-01-19', tz='America/New_York')
+
+class FlakyProvider(FakeProvider):
+    """Returns nothing, as yfinance does on a network error, until `failures` runs out"""
+
+    def __init__(self, failures=1):
+        super().__init__()
+        self.failures = failures
+
+    def fetch(self, symbols, start, end, interval='1d'):
+        if self.failures:
+            self.failures -= 1
+            self.calls.append((tuple(symbols), pd.Timestamp(start), pd.Timestamp(end)))
+            return {}
+        return super().fetch(symbols, start, end, interval)
+
+def test_failed_fetch_is_not_marked_covered(tmp_path):
+    """Days a failed download returned no bars for are requested again"""
+    provider = FlakyProvider()
+    cache = PriceCache(root=str(tmp_path), provider=provider)
+    assert cache.get('CL=F', '2024-01-01', '2024-02-01', now=NOW).empty
+
+    prices = PriceCache(root=str(tmp_path), provider=provider).get('CL=F', '2024-01-01', '2024-02-01', now=NOW)
+    assert len(provider.calls) == 2 and not prices.empty
+
+    # A weekend holds no bars to wait for
+    cache.get('CL=F', '2024-02-03', '2024-02-05', now=NOW)
+    cache.get('CL=F', '2024-02-03', '2024-02-05', now=NOW)
+    assert len(provider.calls) == 3
+
+class BlockingProvider(FakeProvider):
+    """Holds downloads of `blocked` symbols until `release` is set"""
+
+    def __init__(self, blocked):
+        super().__init__()
+        self.blocked = blocked
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def fetch(self, symbols, start, end, interval='1d'):
+        if self.blocked & set(symbols):
+            self.started.set()
+            self.release.wait(5)
+        return super().fetch(symbols, start, end, interval)
+
+def test_downloads_do_not_hold_the_cache(tmp_path):
+    """A slow download neither blocks other symbols nor is repeated by callers missing the same days"""
+    provider = BlockingProvider({'CL=F'})
+    cache = PriceCache(root=str(tmp_path), provider=provider)
+
+    with ThreadPoolExecutor(3) as pool:
+        slow = pool.submit(cache.get, 'CL=F', '2024-01-01', '2024-02-01', now=NOW)
+        provider.started.wait(5)
+        waiting = pool.submit(cache.get, 'CL=F', '2024-01-01', '2024-02-01', now=NOW)
+        # Unrelated symbols are served while CL=F is still downloading
+        assert not pool.submit(cache.get, 'GC=F', '2024-01-01', '2024-02-01', now=NOW).result(5).empty
+        assert not slow.done() and not waiting.done()
+        provider.release.set()
+        pd.testing.assert_frame_equal(slow.result(5), waiting.result(5))
+
+    assert sorted(call[0] for call in provider.calls) == [('CL=F',), ('GC=F',)]
@@ -0,0 +1,35 @@
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter import markets, report
+from commodity_charter.markets import commodity_symbols
+from commodity_charter.report import write_reports
+from commodity_charter.signals import load_cot_signals
+from tests.conftest import FakeProvider
+
+def test_write_reports(cot_2024, tmp_path, monkeypatch):
+    """Tables in every format plus one standalone chart per priced market"""
+    # Category positions are computed once and shared by the tables and the charts
+    computed, compute = [], markets.category_positions
+    monkeypatch.setattr(report, 'category_positions', lambda *args: computed.append(1) or compute(*args))
+    monkeypatch.setattr(markets, 'category_positions', None)
+    now = pd.Timestamp('2024-12-31 12:00', tz='America/New_York')
+    price_frames = FakeProvider().fetch(list(commodity_symbols.values()), '2024-01-01', '2024-12-31')
+    output_dir = tmp_path / 'report'
+
+    paths = write_reports(cot_2024, load_cot_signals(), price_frames, str(output_dir), workers=2, now=now)
+
+    for name in ('screener', 'signal_history'):
+        assert len(pd.read_csv(output_dir / f'{name}.csv')) == len(pd.read_parquet(output_dir / f'{name}.parquet'))
+    screener = pd.read_parquet(output_dir / 'screener.parquet')
+    assert set(screener['Commodity']) == {'Gold', 'Corn', 'Crude Oil'}
+
+    charts = sorted(os.listdir(output_dir / 'charts'))
+    assert charts == ['corn.html', 'crude_oil.html', 'gold.html', 'plotly.min.js']
+    assert len(paths) == 4 + 3
+    assert len(computed) == 1
+    assert 'plotly.min.js' in (output_dir / 'charts' / 'gold.html').read_text()
@@ -0,0 +1,47 @@
+import pytest
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.markets import category_positions
+from commodity_charter.rolling import RollingStats
+from tests.conftest import make_cot_report
+
+@pytest.fixture
+def reports():
+    dates = pd.date_range('2023-01-03', periods=30, freq='7D')
+    report = make_cot_report(dates)
+    report['Date'] = pd.to_datetime(report['Report_Date_as_YYYY-MM-DD'])
+    return report
+
+def test_extend_matches_full_recompute(reports, tmp_path):
+    """Adding weeks to saved state gives the same statistics as recomputing the whole history"""
+    dates = sorted(reports['Date'].unique())
+    full = category_positions(reports, window=8)
+    state = RollingStats.from_positions(category_positions(reports[reports['Date'] < dates[20]], window=8), 8)
+
+    path = str(tmp_path / 'state.npz')
+    for date in dates[20:]:
+        state.save(path)
+        state = RollingStats.load(path)
+        new = state.extend(category_positions(reports[reports['Date'] == date], window=None))
+        expected = full[full['Date'] == date].reset_index(drop=True)
+        pd.testing.assert_frame_equal(new[expected.columns].reset_index(drop=True), expected,
+                                      check_exact=False, rtol=1e-9)
+    assert state.latest == dates[-1] and len(state) == 3
+
+    # Several weeks at once are pushed in report order
+    batched = RollingStats.from_positions(category_positions(reports[reports['Date'] < dates[20]], window=8), 8)
+    new = batched.extend(category_positions(reports[reports['Date'] >= dates[20]], window=None))
+    pd.testing.assert_frame_equal(new[full.columns].reset_index(drop=True),
+                                  full[full['Date'] >= dates[20]].reset_index(drop=True),
+                                  check_exact=False, rtol=1e-9)
+
+def test_rejects_reports_already_seen(reports):
+    state = RollingStats.from_positions(category_positions(reports, window=8), 8)
+    with pytest.raises(ValueError):
+        state.extend(category_positions(reports[reports['Date'] == reports['Date'].max()], window=None))
+    assert RollingStats.load('missing.npz') is None
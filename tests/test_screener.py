@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.analysis import align_positions_with_returns, merchant_hit_rate
+from commodity_charter.markets import MarketIndex
+from commodity_charter.screener import screen_markets, weekly_closes
+from commodity_charter.signals import ThresholdTable
+
+@pytest.fixture
+def price_frames():
+    index = pd.bdate_range('2024-01-01', '2024-12-31', tz='America/New_York')
+    frames = {}
+    for seed, commodity in enumerate(['Gold', 'Corn']):
+        rng = np.random.RandomState(seed)
+        frames[commodity] = pd.DataFrame({'Close': 100 + np.cumsum(rng.normal(0, 1, len(index)))}, index=index)
+    return frames
+
+thresholds_df = pd.DataFrame({
+    'Commodity': ['Gold', 'Corn'],
+    'Bullish_Min': [0, 0],
+    'Bullish_Max': [100, 0],
+    'Bearish_Min': [0, 0],
+    'Bearish_Max': [0, 0]
+})
+
+@pytest.fixture
+def thresholds():
+    return ThresholdTable(thresholds_df)
+
+def test_screen_latest_rows(cot_2024, thresholds):
+    """One row per mapped market with its latest report and OI change"""
+    screen = screen_markets(cot_2024, thresholds)
+    assert list(screen['Commodity']) == ['Corn', 'Crude Oil', 'Gold']
+
+    gold = MarketIndex(cot_2024).positions('Gold')
+    row = screen.set_index('Commodity').loc['Gold']
+    assert row['Date'] == gold['Date'].iloc[-1]
+    assert row['Open_Interest'] == gold['Open_Interest'].iloc[-1]
+    assert row['OI_Change'] == gold['Open_Interest'].iloc[-1] - gold['Open_Interest'].iloc[-2]
+    assert row['Signal'] == 'BULLISH'
+    assert screen.set_index('Commodity').loc['Corn', 'Signal'] == 'NEUTRAL'
+
+    # A COT index range on the bullish side gates the signal on the latest index
+    latest_index = gold['Merchant_COT_Index'].iloc[-1]
+    for low, signal in ((latest_index, 'BULLISH'), (latest_index + 1, 'NEUTRAL')):
+        gated = ThresholdTable(thresholds_df.assign(Bullish_COT_Index_Min=[low, np.nan]))
+        assert screen_markets(cot_2024, gated).set_index('Commodity').loc['Gold', 'Signal'] == signal
+
+def test_screen_hit_rates_match_single_market(cot_2024, thresholds, price_frames):
+    """Batched hit rates agree with the per-commodity analysis"""
+    now = pd.Timestamp('2024-12-31', tz='America/New_York')
+    screen = screen_markets(cot_2024, thresholds, weekly_closes(price_frames), now=now).set_index('Commodity')
+
+    index = MarketIndex(cot_2024)
+    for commodity, price_data in price_frames.items():
+        aligned = align_positions_with_returns(price_data, index.positions(commodity), lookback=365, now=now)
+        assert screen.loc[commodity, 'Hit_Rate'] == pytest.approx(merchant_hit_rate(aligned) * 100)
+
+    # No prices, no hit rate
+    assert np.isnan(screen.loc['Crude Oil', 'Hit_Rate'])
@@ -0,0 +1,159 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.markets import market_ids
+from commodity_charter.signals import (
+    NO_TRIGGER, SignalConfigError, ThresholdTable, evaluate_signals, label_positions, describe_signals,
+    load_cot_signals, weekly_signal_history
+)
+
+@pytest.fixture
+def thresholds():
+    return ThresholdTable(pd.DataFrame({
+        'Commodity': ['TEST', 'OTHER'],
+        'Bullish_Min': [30, 10],
+        'Bullish_Max': [40, 20],
+        'Bearish_Min': [60, 50],
+        'Bearish_Max': [70, 55]
+    }))
+
+def test_evaluate_series(thresholds):
+    """A whole position series is labelled in one call"""
+    labels, bullish_hit, bearish_hit = evaluate_signals(
+        [35.0, 20.0, 50.0, 35.0, np.nan], [20.0, 65.0, 50.0, 65.0, 65.0], thresholds, 'TEST'
+    )
+    # Bearish wins when both ranges trigger; missing data stays neutral
+    assert list(labels) == ['BULLISH', 'BEARISH', 'NEUTRAL', 'BEARISH', 'BEARISH']
+    assert list(bullish_hit) == [True, False, False, True, False]
+
+def test_evaluate_many_commodities(thresholds):
+    """Each row is checked against its own commodity's ranges"""
+    labels, _, _ = evaluate_signals([15.0, 15.0, 15.0], [52.0, 52.0, 52.0], thresholds,
+                                    np.array(['OTHER', 'TEST', 'UNKNOWN']))
+    assert list(labels) == ['BEARISH', 'NEUTRAL', 'NEUTRAL']
+
+def test_describe_signals(thresholds):
+    """Reasons match the strings of the scalar signal rules"""
+    short_pct, long_pct = np.array([35.0, 50.0, 35.0]), np.array([20.0, 50.0, 65.0])
+    _, bullish_hit, bearish_hit = evaluate_signals(short_pct, long_pct, thresholds, 'TEST')
+    reasons = describe_signals(short_pct, long_pct, bullish_hit, bearish_hit)
+    assert list(reasons) == [
+        'Short 35.0% in bullish range',
+        NO_TRIGGER,
+        'Short 35.0% in bullish range, Long 65.0% in bearish range'
+    ]
+
+def test_label_positions(thresholds):
+    """Position frames keep their index and gain a Signal column"""
+    positions = pd.DataFrame({
+        'Merchant_Short_Pct': [35.0, 20.0],
+        'Merchant_Long_Pct': [20.0, 65.0]
+    }, index=pd.to_datetime(['2024-01-07', '2024-01-14']))
+    labelled = label_positions(positions, thresholds, 'TEST')
+    assert list(labelled.index) == list(positions.index)
+    assert list(labelled['Signal']) == ['BULLISH', 'BEARISH']
+
+def test_category_signals(tmp_path):
+    """A Category column points a market's ranges at another trader category"""
+    path = tmp_path / 'signals.csv'
+    path.write_text("Commodity,Category,Bearish_Range,Bullish_Range\n"
+                    "Gold,managed money,60-70,30-40\nCotton,,40-35,75-80\n")
+    thresholds = ThresholdTable(load_cot_signals(path))
+    assert thresholds.category('Gold') == 'Managed_Money'
+    assert thresholds.category('Cotton') == thresholds.category('Corn') == 'Merchant'
+
+    positions = pd.DataFrame({
+        'Merchant_Short_Pct': [35.0, 35.0],
+        'Merchant_Long_Pct': [20.0, 20.0],
+        'Managed_Money_Short_Pct': [65.0, 10.0],
+        'Managed_Money_Long_Pct': [10.0, 65.0],
+    })
+    labelled = label_positions(positions, thresholds, np.array(['Gold', 'Gold']))
+    assert list(labelled['Signal']) == ['NEUTRAL', 'BEARISH']
+    assert list(labelled['Short_Pct']) == [65.0, 10.0]
+
+    # Signal history carries the COT index and z-score of the same category
+    positions['Date'] = pd.to_datetime(['2024-01-02', '2024-01-09'])
+    positions['Managed_Money_COT_Index'] = [50.0, 100.0]
+    positions['Managed_Money_Z_Score'] = [0.1, 2.5]
+    history = weekly_signal_history(positions, thresholds, 'Gold')
+    assert list(history.columns) == ['Date', 'Signal', 'Short_Pct', 'Long_Pct', 'COT_Index', 'Z_Score', 'Reasons']
+    assert list(history['Z_Score']) == [0.1, 2.5]
+
+    path.write_text("Commodity,Category,Bearish_Range,Bullish_Range\nGold,Speculators,60-70,30-40\n")
+    with pytest.raises(SignalConfigError, match='trader categories'):
+        load_cot_signals(path)
+
+def test_statistic_ranges(tmp_path):
+    """Optional COT index/z-score ranges gate each side's signals; blank bounds leave it open"""
+    path = tmp_path / 'signals.csv'
+    path.write_text("Commodity,Bearish_Range,Bullish_Range,Bullish_COT_Index_Min,Bearish_COT_Index_Max,"
+                    "Bearish_Z_Score_Min,Bearish_Z_Score_Max\n"
+                    "Gold,60-70,30-40,80,20,,\nCorn,60-70,30-40,,,2,-1\n")
+    signals_df = load_cot_signals(path)
+    assert signals_df.loc[1, ['Bearish_Z_Score_Min', 'Bearish_Z_Score_Max']].tolist() == [-1, 2]
+    thresholds = ThresholdTable(signals_df)
+    assert thresholds.uses_statistics and not ThresholdTable(load_cot_signals()).uses_statistics
+
+    short_pct, long_pct = [35.0, 35.0, 35.0, 10.0, 10.0], [10.0, 10.0, 10.0, 65.0, 65.0]
+    cot_index = [90.0, 50.0, np.nan, 10.0, 50.0]
+    labels, _, _ = evaluate_signals(short_pct, long_pct, thresholds, 'Gold', cot_index, np.zeros(5))
+    assert list(labels) == ['BULLISH', 'NEUTRAL', 'NEUTRAL', 'BEARISH', 'NEUTRAL']
+    # Without statistics a gated side can't trigger; ungated markets are unaffected
+    assert list(evaluate_signals(short_pct, long_pct, thresholds, 'Gold')[0]) == ['NEUTRAL'] * 5
+    labels, _, _ = evaluate_signals(short_pct, long_pct, thresholds, 'Corn', z_score=[0, 0, 0, 0, 3])
+    assert list(labels) == ['BULLISH', 'BULLISH', 'BULLISH', 'BEARISH', 'NEUTRAL']
+
+    positions = pd.DataFrame({'Merchant_Short_Pct': [35.0, 35.0], 'Merchant_Long_Pct': [10.0, 10.0],
+                              'Merchant_COT_Index': [90.0, 50.0], 'Merchant_Z_Score': [1.0, 1.0]})
+    assert list(label_positions(positions, thresholds, 'Gold')['Signal']) == ['BULLISH', 'NEUTRAL']
+
+def test_load_range_strings(tmp_path):
+    """Inverted ranges are reordered and aliases map to the charted markets"""
+    path = tmp_path / 'signals.csv'
+    path.write_text("Commodity,Bearish_Range,Bullish_Range\n"
+                    "Baumwolle,40-35,75-80\nSugar N0.11,40-50,70\n soymeal ,42-40,75-78\n")
+    signals_df = load_cot_signals(path)
+    assert list(signals_df['Commodity']) == ['Cotton', 'Sugar No. 11', 'Soybean Meal']
+    assert list(signals_df['Market_ID']) == [market_ids[c] for c in signals_df['Commodity']]
+    assert signals_df.loc[0, ['Bearish_Min', 'Bearish_Max']].tolist() == [35, 40]
+    assert signals_df.loc[1, ['Bullish_Min', 'Bullish_Max']].tolist() == [70, 100]
+
+def test_load_numeric_by_symbol():
+    """The min/max layout keyed by Yahoo symbol loads into the same schema"""
+    signals_df = load_cot_signals(os.path.join(os.path.dirname(__file__), '..', 'data', 'cot_signals.csv'))
+    assert signals_df.loc[0, 'Commodity'] == 'Crude Oil'
+    assert list(signals_df.columns) == list(load_cot_signals().columns)
+
+@pytest.mark.parametrize('content', [
+    "Commodity,Bearish_Range,Bullish_Range\nUnobtainium,10-20,30-40\n",
+    "Commodity,Bearish_Range,Bullish_Range\nGold,10-20,lots\n",
+    "Commodity,Bearish_Range,Bullish_Range\nGold,10-20,30-40\nGC=F,10-20,30-40\n",
+    "Commodity,Bullish_Min,Bullish_Max,Bearish_Min,Bearish_Max\nGold,30,140,60,70\n",
+    "Commodity,Low,High\nGold,30,40\n",
+    "Commodity,Bearish_Range,Bullish_Range,Bullish_COT_Index_Min\nGold,10-20,30-40,high\n",
+    "Commodity,Bearish_Range,Bullish_Range,Bearish_COT_Index_Max\nGold,10-20,30-40,120\n",
+])
+def test_invalid_signal_files(tmp_path, content):
+    path = tmp_path / 'signals.csv'
+    path.write_text(content)
+    with pytest.raises(SignalConfigError):
+        load_cot_signals(path)
+
+def test_threshold_rows_by_market_id():
+    """Bounds rows line up with market IDs, whatever name the file used"""
+    thresholds = ThresholdTable(load_cot_signals())
+    cotton = market_ids['Cotton']
+    assert thresholds.rows('Cotton') == thresholds.rows('Baumwolle') == thresholds.rows('CT=F') == cotton
+    assert 'Baumwolle' in thresholds and 'Crude Oil' not in thresholds
+    assert thresholds.bounds[cotton].tolist() == [75, 80, 35, 40]
+
+    by_id, _, _ = evaluate_signals([76.0, 76.0], [20.0, 20.0], thresholds, np.array([cotton, market_ids['Crude Oil']]))
+    by_name, _, _ = evaluate_signals([76.0, 76.0], [20.0, 20.0], thresholds, np.array(['Cotton', 'Crude Oil']))
+    assert list(by_id) == list(by_name) == ['BULLISH', 'NEUTRAL']
@@ -0,0 +1,119 @@
+import pytest
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.store import POSITIONS_DIR, COTStore, latest_published_report
+from tests.conftest import make_cot_report
+
+@pytest.fixture
+def cot_frame():
+    """Two markets over the turn of a year"""
+    dates = pd.to_datetime(['2023-12-26', '2024-01-02', '2024-01-09'])
+    return pd.DataFrame({
+        'Market_and_Exchange_Names': ['GOLD - COMMODITY EXCHANGE INC.'] * 3 + ['CORN - CHICAGO BOARD OF TRADE'] * 3,
+        'Report_Date_as_YYYY-MM-DD': list(dates.strftime('%Y-%m-%d')) * 2,
+        'CFTC_Contract_Market_Code': ['088691'] * 3 + ['002602'] * 3,
+        'Open_Interest_All': [500000, 510000, 520000, 1500000, 1510000, 1520000],
+        'Date': list(dates) * 2
+    })
+
+def test_latest_published_report():
+    """Report dates follow the Friday 3:30pm ET release of Tuesday positions"""
+    # Friday before the release still points at the previous week's report
+    assert latest_published_report(pd.Timestamp('2024-01-12 12:00', tz='America/New_York')) == pd.Timestamp('2024-01-02')
+    assert latest_published_report(pd.Timestamp('2024-01-12 16:00', tz='America/New_York')) == pd.Timestamp('2024-01-09')
+    assert latest_published_report(pd.Timestamp('2024-01-16 09:00', tz='America/New_York')) == pd.Timestamp('2024-01-09')
+
+def test_write_and_read_partitions(tmp_path, cot_frame):
+    """Reports round-trip through year/market partitions"""
+    store = COTStore(root=str(tmp_path))
+    assert not store.exists()
+    assert store.read().empty
+
+    store.write(cot_frame)
+    assert store.years() == [2023, 2024]
+    assert (tmp_path / 'Year=2024' / 'CFTC_Contract_Market_Code=088691').is_dir()
+
+    stored = store.read()
+    assert len(stored) == len(cot_frame)
+    assert set(stored['CFTC_Contract_Market_Code']) == {'088691', '002602'}
+
+    gold_2024 = store.read(years=[2024], markets=['088691'])
+    assert len(gold_2024) == 2
+    assert sorted(gold_2024['Open_Interest_All'].tolist()) == [510000, 520000]
+
+def test_write_replaces_year(tmp_path, cot_frame):
+    """Rewriting a year replaces its partitions instead of duplicating rows"""
+    store = COTStore(root=str(tmp_path))
+    store.write(cot_frame)
+    store.write(cot_frame[cot_frame['Date'].dt.year == 2024])
+
+    assert len(store.read()) == len(cot_frame)
+    assert store.latest_report() == pd.Timestamp('2024-01-09')
+
+def test_needs_refresh(tmp_path, cot_frame):
+    """Refresh only once a newer weekly report has been published"""
+    store = COTStore(root=str(tmp_path))
+    assert store.needs_refresh()
+
+    store.write(cot_frame, now=pd.Timestamp('2024-01-12 21:00', tz='UTC'))
+    assert not store.needs_refresh(now=pd.Timestamp('2024-01-18 12:00', tz='America/New_York'))
+
+    # Next report is out, but a check just happened
+    store.mark_checked(now=pd.Timestamp('2024-01-19 21:00', tz='UTC'))
+    assert not store.needs_refresh(now=pd.Timestamp('2024-01-19 16:30', tz='America/New_York'))
+    assert store.needs_refresh(now=pd.Timestamp('2024-01-19 18:00', tz='America/New_York'))
+
+def test_category_positions_cached(tmp_path, monkeypatch):
+    """Trader category tables are computed once per stored report"""
+    report = make_cot_report(pd.date_range('2024-01-02', periods=3, freq='7D'))
+    report['Date'] = pd.to_datetime(report['Report_Date_as_YYYY-MM-DD'])
+    store = COTStore(root=str(tmp_path))
+    store.write(report)
+
+    positions = store.category_positions()
+    assert len(positions) == 9 and 'Managed_Money_Net_Change' in positions
+    assert (tmp_path / POSITIONS_DIR).is_dir()
+
+    import commodity_charter.store as store_module
+    monkeypatch.setattr(store_module, 'category_positions', lambda *args, **kwargs: pytest.fail("recomputed"))
+    pd.testing.assert_frame_equal(store.category_positions(), positions)
+
+    # A new report invalidates the cached table
+    monkeypatch.undo()
+    newer = make_cot_report(['2024-01-23'])
+    newer['Date'] = pd.to_datetime(newer['Report_Date_as_YYYY-MM-DD'])
+    store.write(pd.concat([report, newer], ignore_index=True))
+    assert store.category_positions()['Date'].max() == pd.Timestamp('2024-01-23')
+
+def test_category_positions_extended_incrementally(tmp_path, monkeypatch):
+    """Appended weeks extend the cached table and rolling state instead of recomputing it"""
+    import commodity_charter.store as store_module
+    from commodity_charter.markets import category_positions
+    from commodity_charter.rolling import STATE_FILE
+
+    dates = pd.date_range('2023-01-03', periods=12, freq='7D')
+    report = make_cot_report(dates)
+    report['Date'] = pd.to_datetime(report['Report_Date_as_YYYY-MM-DD'])
+    store = COTStore(root=str(tmp_path))
+    store.write(report[report['Date'] < dates[10]])
+    store.category_positions(window=4)
+    assert (tmp_path / POSITIONS_DIR / STATE_FILE).exists()
+
+    computed = []
+    def spy(reports, *args, **kwargs):
+        computed.append(len(reports))
+        return category_positions(reports, *args, **kwargs)
+    monkeypatch.setattr(store_module, 'category_positions', spy)
+
+    for date in dates[10:]:
+        store.append(report[report['Date'] == date])
+        extended = store.category_positions(window=4)
+    # Only the appended reports were turned into positions, one week at a time
+    assert computed == [4, 4]
+    expected = category_positions(report, window=4)
+    pd.testing.assert_frame_equal(extended, expected, check_exact=False, rtol=1e-9)
@@ -0,0 +1,69 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter import views
+from commodity_charter.memo import LRUCache
+from commodity_charter.signals import load_cot_signals
+
+def make_inputs():
+    index = pd.bdate_range('2024-01-01', periods=200, tz='America/New_York')
+    close = np.linspace(100, 130, len(index))
+    price_data = pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                               'Volume': 1000}, index=index)
+    dates = pd.date_range('2024-01-02', periods=40, freq='W-TUE')
+    merchant_positions = pd.DataFrame({
+        'Date': dates, 'Merchant_Long': 1000, 'Merchant_Short': 2000,
+        'Merchant_Long_Pct': np.linspace(10, 30, 40), 'Merchant_Short_Pct': np.linspace(40, 20, 40),
+        'Open_Interest': np.arange(40) * 100 + 5000,
+    })
+    return price_data, merchant_positions
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_chart_type_toggle_reuses_derived_frames(monkeypatch):
+    """Switching candles/line rebuilds only the figure; a new data version recomputes"""
+    monkeypatch.setattr(views, 'DERIVED_CACHE', LRUCache(4))
+    monkeypatch.setattr(views, 'FIGURE_CACHE', LRUCache(4))
+    price_data, merchant_positions = make_inputs()
+    signals_df = load_cot_signals()
+    date_range = (price_data.index[0].date(), price_data.index[-1].date())
+
+    key = views.view_key('Gold', date_range, '2024-10-01', price_data, signals_df)
+    first = views.chart_view(key, price_data, merchant_positions, signals_df)
+    candles = views.chart_figure_json(key, first, price_data, 'Candlestick')
+
+    again = views.chart_view(key, price_data, merchant_positions, signals_df)
+    line = views.chart_figure_json(key, again, price_data, 'Line')
+    assert again is first
+    assert views.DERIVED_CACHE.misses == 1 and views.DERIVED_CACHE.hits == 1
+    assert candles != line
+    assert views.chart_figure_json(key, again, price_data, 'Candlestick') is candles
+
+    newer = views.view_key('Gold', date_range, '2024-10-08', price_data, signals_df)
+    assert views.chart_view(newer, price_data, merchant_positions, signals_df) is not first
+
+    # A moving live bar changes the key as well
+    moved = price_data.copy()
+    moved.iloc[-1, moved.columns.get_loc('Close')] += 1
+    assert views.view_key('Gold', date_range, '2024-10-01', moved, signals_df) != key
+
+    # So does editing the commodity's signal ranges, but not another commodity's
+    edited = signals_df.copy()
+    edited.loc[edited['Commodity'] == 'Gold', 'Bullish_Max'] += 5
+    assert views.view_key('Gold', date_range, '2024-10-01', price_data, edited) != key
+    edited = signals_df.copy()
+    edited.loc[edited['Commodity'] != 'Gold', 'Bullish_Max'] += 5
+    assert views.view_key('Gold', date_range, '2024-10-01', price_data, edited) == key
@@ -0,0 +1,51 @@
+import pytest
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_charter.derived import DerivedStore
+from commodity_charter.prices import PriceCache
+from commodity_charter.store import COTStore
+from commodity_charter.worker import RefreshWorker
+from tests.conftest import FakeProvider
+
+SIGNALS_CSV = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'cot_signals.csv'))
+
+@pytest.fixture
+def worker(tmp_path, fetch_archive):
+    provider = FakeProvider()
+    return RefreshWorker(
+        store=COTStore(root=str(tmp_path / 'store')),
+        prices=PriceCache(root=str(tmp_path / 'prices'), provider=provider),
+        intraday_prices=PriceCache(root=str(tmp_path / 'prices'), provider=provider, interval='60m'),
+        derived=DerivedStore(root=str(tmp_path / 'derived')),
+        signals_path=SIGNALS_CSV,
+        fetch_archive=fetch_archive,
+        first_year=2022
+    )
+
+def test_run_once_warms_every_store(worker):
+    """One pass fills the COT store, both price caches and the derived tables"""
+    now = pd.Timestamp('2024-12-31 12:00', tz='America/New_York')
+    worker.run_once(now)
+
+    assert worker.store.years() == [2022, 2023, 2024]
+    assert worker.prices.provider.calls
+    screener = worker.derived.read('screener', '2024-12-31')
+    assert set(screener['Commodity']) == {'Gold', 'Corn', 'Crude Oil'}
+    history = worker.derived.read('signal_history', '2024-12-31')
+    assert set(history['Commodity']) == {'Gold', 'Corn', 'Crude Oil'}
+
+def test_sources_refresh_only_when_due(worker, fetched_years):
+    """Later passes skip COT until the next release and prices until their interval"""
+    now = pd.Timestamp('2024-12-31 12:00', tz='America/New_York')
+    worker.run_once(now)
+    calls = len(worker.prices.provider.calls)
+    del fetched_years[:]
+
+    worker.run_once(now + pd.Timedelta(minutes=1))
+    assert fetched_years == []
+    assert len(worker.prices.provider.calls) == calls